@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Per-ticker return attribution for the AI Shocks Portfolio Monitor
+
+A ticker's contribution on a day is its portfolio weight that day times its
+return, so each day's contributions add up to the portfolio's daily
+return. Contributions for every day and ticker are one array product:
+
+    daily = contributions(returns, weights)        # days x tickers
+    total = cumulative_contributions(daily, portfolio_returns)
+    tickers, values = top_contributors(daily, n=5)
+
+Cumulative contributions are scaled by the portfolio's value before each
+day, so they compound the way the portfolio does: on any day they add up
+to the portfolio's cumulative return since the base date.
+"""
+
+import numpy as np
+import pandas as pd
+
+TOP_N = 5
+
+
+def contributions(returns, weights):
+    """
+    Weight x return for every day and ticker
+
+    Args:
+        returns (ndarray): Daily returns, days x tickers (NaN = no return)
+        weights (ndarray): Constant weights (one per ticker) or daily
+            weights (days x tickers)
+
+    Returns:
+        ndarray: Contributions, days x tickers
+    """
+    returns = np.asarray(returns, dtype=float)
+    return np.where(np.isnan(returns), 0.0, returns) * np.asarray(weights, dtype=float)
+
+
+def cumulative_contributions(daily, portfolio_returns):
+    """
+    Each ticker's share of the portfolio's cumulative return
+
+    Args:
+        daily (ndarray): Output of contributions, days x tickers
+        portfolio_returns (ndarray): Portfolio daily returns (the row sums of daily)
+
+    Returns:
+        ndarray: Running contributions, days x tickers; row t adds up to the
+            portfolio's cumulative return through day t
+    """
+    wealth = np.cumprod(1 + np.nan_to_num(np.asarray(portfolio_returns, dtype=float)))
+    previous = np.concatenate([[1.0], wealth[:-1]])
+    return np.cumsum(daily * previous[:, None], axis=0)
+
+
+def top_contributors(daily, n=TOP_N):
+    """
+    The n largest contributions by size on each day
+
+    Args:
+        daily (ndarray): Contributions, days x tickers
+        n (int): Contributors to keep per day
+
+    Returns:
+        tuple: (column indices, contributions), both days x n, largest
+            absolute contribution first
+    """
+    n = min(n, daily.shape[1])
+    size = -np.abs(daily)
+    candidates = np.argpartition(size, n - 1, axis=1)[:, :n]
+    order = np.argsort(np.take_along_axis(size, candidates, axis=1), axis=1, kind='stable')
+    columns = np.take_along_axis(candidates, order, axis=1)
+    return columns, np.take_along_axis(daily, columns, axis=1)
+
+
+def attribution_tables(dates, tickers, returns, portfolios, n=TOP_N):
+    """
+    Daily and cumulative contributions plus top contributors for several portfolios
+
+    Args:
+        dates (Index): Dates of the rows
+        tickers (list): Ticker of each column
+        returns (ndarray): Daily returns, days x tickers
+        portfolios (dict): Name -> (weights, portfolio daily returns), weights
+            as accepted by contributions
+        n (int): Top contributors to list per day
+
+    Returns:
+        tuple: (DataFrame with date, series and one column per ticker, where
+            series is each portfolio name and '{name}_cumulative';
+            dict date -> portfolio name -> [[ticker, contribution], ...])
+    """
+    dates = pd.DatetimeIndex(dates)
+    frames = []
+    top = {date: {} for date in dates.strftime('%Y-%m-%d')}
+    for name, (weights, portfolio_returns) in portfolios.items():
+        daily = contributions(returns, weights)
+        cumulative = cumulative_contributions(daily, portfolio_returns)
+        for series, values in ((name, daily), (f'{name}_cumulative', cumulative)):
+            frame = pd.DataFrame(values, columns=tickers)
+            frame.insert(0, 'series', series)
+            frame.insert(0, 'date', dates)
+            frames.append(frame)
+
+        columns, values = top_contributors(daily, n)
+        names = np.asarray(tickers, dtype=object)[columns]
+        for date, row_names, row_values in zip(top, names, values.round(6)):
+            top[date][name] = [[ticker, float(value)] for ticker, value in zip(row_names, row_values)]
+
+    matrix = pd.concat(frames, ignore_index=True).sort_values(['date', 'series'], kind='stable')
+    return matrix.reset_index(drop=True), top
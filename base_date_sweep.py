@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+base_date_sweep.py — Base-date sensitivity of the fixed-weight AI portfolio.
+
+The monitor weights the portfolio by market cap on a single base date
+(2022-10-25). This sweep repeats the fixed-weight calculation for every
+trading day in a range as the base date and records the distribution of
+outcomes: cumulative and annualized return to the last date, maximum
+drawdown, and the excess over SPY for the same holding period.
+
+All base dates are scored together from one shared price panel: weights
+form a (base dates x tickers) matrix, daily portfolio returns are one
+matrix product, and compounding is a masked cumulative sum. Chunks of base
+dates are spread over a process pool; each worker receives the panel once.
+
+    python base_date_sweep.py                              # 2022-01-01 .. today
+    python base_date_sweep.py --start 2023-01-01 --workers 4
+    python base_date_sweep.py --provider local             # offline, from files/
+
+Prices come from the monitor's price cache (files/price_cache.csv) and
+shares outstanding from the base snapshot, so a warm run makes no network
+requests. The sweep works on scratch copies of both and never writes the
+committed files. --provider local rebuilds both from the committed dataset.
+Returns are screened with data_quality.screen_prices, as in the monitor.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from data_quality import screen_prices
+
+TRADING_DAYS_PER_YEAR = 252
+PERCENTILES = (1, 5, 10, 25, 50, 75, 90, 95, 99)
+
+# Set once per worker process by _init_worker
+_panel = {}
+
+
+def _init_worker(inputs):
+    _panel.update(inputs)
+
+
+def score_base_dates(returns, prices, shares, positions):
+    """
+    Outcomes of the fixed-weight portfolio for a set of base dates
+
+    Args:
+        returns (ndarray): Daily returns, days x tickers (NaN = no return)
+        prices (ndarray): Prices, days x tickers, aligned with returns
+        shares (ndarray): Shares outstanding per ticker
+        positions (ndarray): Row positions of the base dates
+
+    Returns:
+        dict: Arrays (one value per base date) of cumulative_return,
+            max_drawdown and stocks (tickers with a base-date price)
+    """
+    # Base-date market-cap weights, one row per base date
+    caps = prices[positions] * shares
+    caps = np.where(np.isnan(caps), 0.0, caps)
+    total = caps.sum(axis=1, keepdims=True)
+    # A base date with no priced ticker holds nothing (zero weights)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        weights = np.where(total > 0, caps / total, 0.0)
+
+    # Daily returns of every candidate portfolio: days x base dates
+    daily = np.where(np.isnan(returns), 0.0, returns) @ weights.T
+
+    # Compound only the days after each base date
+    held = np.arange(len(returns))[:, None] > positions[None, :]
+    wealth = np.exp(np.cumsum(np.where(held, np.log1p(daily), 0.0), axis=0))
+    drawdown = wealth / np.maximum.accumulate(wealth, axis=0) - 1
+
+    return {
+        'cumulative_return': wealth[-1] - 1,
+        'max_drawdown': drawdown.min(axis=0),
+        'stocks': (caps > 0).sum(axis=1)
+    }
+
+
+def _score_chunk(positions):
+    return score_base_dates(_panel['returns'], _panel['prices'], _panel['shares'], positions)
+
+
+def sweep_base_dates(prices, shares, start_date, end_date=None, benchmark='SPY',
+                     workers=None, chunk_size=64):
+    """
+    Score every trading day in [start_date, end_date] as the base date
+
+    Args:
+        prices (DataFrame): Daily prices from start_date to the evaluation end,
+            one column per ticker plus the benchmark
+        shares (dict): Ticker -> shares outstanding
+        start_date (str): First candidate base date (YYYY-MM-DD)
+        end_date (str): Last candidate base date (defaults to the day before
+            the last price)
+        benchmark (str): Benchmark column for excess returns
+        workers (int): Worker processes (1 runs in this process; None uses
+            every core)
+        chunk_size (int): Base dates per task
+
+    Returns:
+        DataFrame: One row per base date
+    """
+    tickers = [t for t in shares if t in prices.columns]
+    panel = prices.sort_index()
+    dates = panel.index
+
+    candidates = dates[(dates >= pd.to_datetime(start_date)) & (dates < dates[-1])]
+    if end_date is not None:
+        candidates = candidates[candidates <= pd.to_datetime(end_date)]
+    if candidates.empty:
+        return pd.DataFrame()
+    positions = dates.get_indexer(candidates)
+
+    # Screened like the monitor's own returns: bad prints masked, gaps kept as NaN
+    screened = screen_prices(panel[tickers])
+    inputs = {
+        'returns': screened['returns'].reindex(dates).to_numpy(dtype=float),
+        'prices': screened['prices'].to_numpy(dtype=float),
+        'shares': np.array([shares[t] for t in tickers], dtype=float)
+    }
+
+    chunks = [positions[i:i + chunk_size] for i in range(0, len(positions), chunk_size)]
+    if workers == 1 or len(chunks) == 1:
+        _init_worker(inputs)
+        results = [_score_chunk(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(inputs,)) as executor:
+            results = list(executor.map(_score_chunk, chunks))
+
+    sweep = pd.DataFrame({
+        key: np.concatenate([r[key] for r in results]) for key in results[0]
+    })
+    sweep.insert(0, 'base_date', candidates)
+    sweep.insert(1, 'days_held', len(dates) - 1 - positions)
+
+    years = sweep['days_held'] / TRADING_DAYS_PER_YEAR
+    sweep['annualized_return'] = (1 + sweep['cumulative_return']) ** (1 / years) - 1
+    if benchmark in panel.columns:
+        spy = panel[benchmark].to_numpy(dtype=float)
+        sweep['benchmark_return'] = spy[-1] / spy[positions] - 1
+        sweep['excess_return'] = sweep['cumulative_return'] - sweep['benchmark_return']
+
+    return sweep[['base_date', 'days_held', 'stocks', 'cumulative_return', 'annualized_return',
+                  'max_drawdown'] + [c for c in ('benchmark_return', 'excess_return') if c in sweep]]
+
+
+def summarize(sweep, reference_date=None):
+    """
+    Distribution of sweep outcomes
+
+    Args:
+        sweep (DataFrame): Output of sweep_base_dates
+        reference_date (str): Base date to locate within the distribution
+
+    Returns:
+        dict: Percentiles per outcome, plus the reference date's values and
+            percentile ranks when it is in the sweep
+    """
+    outcomes = [c for c in sweep.columns if c not in ('base_date', 'days_held', 'stocks')]
+    summary = {
+        'base_dates': len(sweep),
+        'first_base_date': sweep['base_date'].iloc[0].strftime('%Y-%m-%d'),
+        'last_base_date': sweep['base_date'].iloc[-1].strftime('%Y-%m-%d'),
+        'percentiles': {
+            column: {f'p{p}': float(np.nanpercentile(sweep[column], p)) for p in PERCENTILES}
+            for column in outcomes
+        }
+    }
+
+    if reference_date is not None:
+        match = sweep[sweep['base_date'] == pd.to_datetime(reference_date)]
+        if not match.empty:
+            row = match.iloc[0]
+            summary['reference'] = {
+                'base_date': reference_date,
+                'values': {column: float(row[column]) for column in outcomes},
+                'percentile_rank': {
+                    column: float((sweep[column] < row[column]).mean() * 100) for column in outcomes
+                }
+            }
+    return summary
+
+
+def load_inputs(monitor, start_date):
+    """
+    Shares outstanding and the price panel the monitor would use
+
+    Runs the monitor's ticker, market-cap and weight steps (served from the
+    base snapshot when it is current) and reads prices through its cache.
+
+    Returns:
+        tuple: (prices DataFrame, shares dict), or (None, None) on failure
+    """
+    if not monitor.load_ticker_list() or not monitor.get_market_caps_base_date():
+        return None, None
+    monitor.calculate_weights()
+
+    shares = {t: data['market_cap'] / data['price'] for t, data in monitor.market_caps.items()}
+    first = min(pd.to_datetime(start_date), pd.to_datetime(monitor.base_date)).strftime('%Y-%m-%d')
+    prices = monitor.load_price_history(list(shares) + ['SPY'], first, datetime.now().strftime('%Y-%m-%d'))
+    return prices, shares
+
+
+def _scratch_copy(path, workdir):
+    """Copy path into workdir (if it exists) and return the copy's path"""
+    copy = os.path.join(workdir, os.path.basename(path))
+    if os.path.exists(path):
+        shutil.copyfile(path, copy)
+    return copy
+
+
+def sweep_monitor(provider, workdir):
+    """
+    PortfolioMonitor for the sweep, writing only inside workdir
+
+    The price cache and base snapshot are read from scratch copies, so
+    cache rebuilds (e.g. --start before the cache begins) and the snapshot
+    calculate_weights saves never touch the committed files.
+
+    Args:
+        provider (str): 'yfinance' or 'local' (rebuilt from files/ai_portfolio_data.csv)
+        workdir (str): Scratch directory owned by the caller
+
+    Returns:
+        PortfolioMonitor
+    """
+    from portfolio_monitor import PortfolioMonitor
+
+    if provider == 'local':
+        from market_data import LocalProvider
+        local = LocalProvider.from_dataset('files/ai_portfolio_data.csv')
+        return PortfolioMonitor(provider=local, price_cache=None, base_snapshot=None,
+                                metadata_cache=None, requests_per_second=None, overlap_fetch=False)
+    return PortfolioMonitor(price_cache=_scratch_copy('files/price_cache.csv', workdir),
+                            base_snapshot=_scratch_copy('files/base_snapshot.json', workdir),
+                            metadata_cache=None, overlap_fetch=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--start', default='2022-01-01', help='First candidate base date')
+    parser.add_argument('--end', help='Last candidate base date (default: second-to-last trading day)')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: all cores)')
+    parser.add_argument('--provider', choices=['yfinance', 'local'], default='yfinance',
+                        help="'local' rebuilds prices and shares from files/ai_portfolio_data.csv")
+    parser.add_argument('-o', '--output', default='ai_portfolio_base_date_sweep.csv',
+                        help='Per-base-date results (a _summary.json is written next to it)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        monitor = sweep_monitor(args.provider, workdir)
+        prices, shares = load_inputs(monitor, args.start)
+    if prices is None or prices.empty:
+        print("Error: No price data available")
+        return
+
+    print(f"Sweeping base dates from {args.start} over {len(shares)} tickers...")
+    start = datetime.now()
+    sweep = sweep_base_dates(prices, shares, args.start, args.end, workers=args.workers)
+    if sweep.empty:
+        print("Error: No trading days in the requested base-date range")
+        return
+    elapsed = (datetime.now() - start).total_seconds()
+
+    summary = summarize(sweep, reference_date=monitor.base_date)
+    sweep.to_csv(args.output, index=False, date_format='%Y-%m-%d')
+    summary_file = args.output.replace('.csv', '_summary.json')
+    with open(summary_file, 'w') as f:
+        json.dump(summary, f, indent=2)
+
+    cumulative = summary['percentiles']['cumulative_return']
+    print(f"Scored {len(sweep)} base dates in {elapsed:.2f}s")
+    print(f"  Cumulative return: p5 {cumulative['p5']:.1%}  median {cumulative['p50']:.1%}  "
+          f"p95 {cumulative['p95']:.1%}")
+    if 'reference' in summary:
+        reference = summary['reference']
+        print(f"  Base date {reference['base_date']}: {reference['values']['cumulative_return']:.1%} "
+              f"(percentile {reference['percentile_rank']['cumulative_return']:.0f})")
+    print(f"Results saved to {args.output} and {summary_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+benchmark_portfolio.py — Scaling benchmarks for the PortfolioMonitor pipeline.
+
+Runs each pipeline stage on synthetic, offline universes and records wall
+time and peak memory per stage:
+
+    load_ticker_list, get_market_caps_base_date, calculate_weights,
+    fetch_portfolio_data, save_dataset, create_interactive_chart, save_feed
+
+No network is used: prices and fundamentals come from a LocalProvider built
+over market_data.synthetic_panel(). Results are written as JSON tagged with
+the git commit, so two runs can be compared:
+
+    python benchmark_portfolio.py                       # standard scenarios
+    python benchmark_portfolio.py --tickers 38 500 5000 --years 1 4 20
+    python benchmark_portfolio.py -o new.json --compare old.json
+
+The "current" scenario (38 tickers x 950 days) mirrors today's live run.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from market_data import LocalProvider, synthetic_panel
+from portfolio_monitor import PortfolioMonitor
+from run_report import peak_rss_mb
+
+TRADING_DAYS_PER_YEAR = 252
+
+# (name, tickers, days)
+STANDARD_SCENARIOS = [
+    ('current', 38, 950),
+    ('current-20y', 38, 20 * TRADING_DAYS_PER_YEAR),
+    ('sp500-4y', 500, 4 * TRADING_DAYS_PER_YEAR),
+    ('1000-10y', 1000, 10 * TRADING_DAYS_PER_YEAR),
+    ('5000-1y', 5000, TRADING_DAYS_PER_YEAR),
+]
+
+STAGES = [
+    'load_ticker_list',
+    'get_market_caps_base_date',
+    'calculate_weights',
+    'fetch_portfolio_data',
+    'save_dataset',
+    'create_interactive_chart',
+    'save_feed',
+]
+
+
+def git_commit():
+    """Short hash of the checked-out commit, or 'unknown'"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except Exception:
+        return 'unknown'
+
+
+def run_scenario(name, n_tickers, n_days, stages=STAGES, seed=0, trace_memory=True):
+    """
+    Run every pipeline stage once on a synthetic universe
+
+    Args:
+        name (str): Scenario label
+        n_tickers (int): Number of tickers
+        n_days (int): Number of daily bars
+        stages (list): Stage names to run, in pipeline order
+        seed (int): Random seed for the synthetic panel
+        trace_memory (bool): Record per-stage peak allocations with tracemalloc
+
+    Returns:
+        list: One result dict per stage
+    """
+    prices, fundamentals = synthetic_panel(n_tickers, n_days, seed=seed)
+    base_date = prices.index[0].strftime('%Y-%m-%d')
+    end_date = (prices.index[-1] + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+
+    with tempfile.TemporaryDirectory() as workdir:
+        ticker_file = os.path.join(workdir, 'tickerlist.txt')
+        fundamentals[['ticker', 'company_name']].to_csv(ticker_file, sep='\t', header=False, index=False)
+
+        monitor = PortfolioMonitor(
+            ticker_file=ticker_file,
+            base_date=base_date,
+            price_cache=None,
+            dataset_file=os.path.join(workdir, 'ai_portfolio_data.csv'),
+            requests_per_second=None,
+            base_snapshot=None,
+            metadata_cache=None,
+            provider=LocalProvider.from_frames(prices, fundamentals)
+        )
+
+        calls = {
+            'load_ticker_list': lambda: monitor.load_ticker_list(),
+            'get_market_caps_base_date': lambda: monitor.get_market_caps_base_date(),
+            'calculate_weights': lambda: monitor.calculate_weights(),
+            'fetch_portfolio_data': lambda: monitor.fetch_portfolio_data(end_date=end_date),
+            'save_dataset': lambda: monitor.save_dataset(os.path.join(workdir, 'ai_portfolio_data.csv')),
+            'create_interactive_chart': lambda: monitor.create_interactive_chart(
+                os.path.join(workdir, 'ai_portfolio_chart.html')
+            ),
+            'save_feed': lambda: monitor.save_feed(os.path.join(workdir, 'ai_portfolio_feed.json')),
+        }
+
+        results = []
+        for stage in stages:
+            # Stage output is progress chatter; keep the benchmark log readable
+            stdout = sys.stdout
+            sys.stdout = open(os.devnull, 'w')
+            try:
+                if trace_memory:
+                    tracemalloc.start()
+                start_wall = time.perf_counter()
+                start_cpu = time.process_time()
+                calls[stage]()
+                wall = time.perf_counter() - start_wall
+                cpu = time.process_time() - start_cpu
+                peak_alloc = tracemalloc.get_traced_memory()[1] / (1024 * 1024) if trace_memory else None
+            finally:
+                if trace_memory:
+                    tracemalloc.stop()
+                sys.stdout.close()
+                sys.stdout = stdout
+
+            rows = len(monitor.portfolio_data) if monitor.portfolio_data is not None else 0
+            rss = peak_rss_mb()
+            results.append({
+                'scenario': name,
+                'tickers': n_tickers,
+                'days': n_days,
+                'stage': stage,
+                'wall_seconds': round(wall, 6),
+                'cpu_seconds': round(cpu, 6),
+                'peak_alloc_mb': round(peak_alloc, 3) if peak_alloc is not None else None,
+                'process_peak_rss_mb': round(rss, 1) if rss is not None else None,
+                'rows': rows,
+            })
+            print(f"  {name:<14} {stage:<28} {wall:9.3f}s"
+                  + (f" {peak_alloc:10.1f} MB" if peak_alloc is not None else ""))
+    return results
+
+
+def compare(results, baseline_file):
+    """Print wall-time ratios against a previous results file"""
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+    before = {(r['scenario'], r['stage']): r for r in baseline['results']}
+
+    print(f"\nComparison with {baseline_file} (commit {baseline.get('commit', '?')}):")
+    for r in results:
+        old = before.get((r['scenario'], r['stage']))
+        if old is None or not old['wall_seconds']:
+            continue
+        ratio = r['wall_seconds'] / old['wall_seconds']
+        flag = '  <-- slower' if ratio > 1.2 else ''
+        print(f"  {r['scenario']:<14} {r['stage']:<28} {old['wall_seconds']:9.3f}s -> "
+              f"{r['wall_seconds']:9.3f}s  x{ratio:.2f}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--tickers', type=int, nargs='+',
+                        help='Universe sizes for a custom grid (with --years)')
+    parser.add_argument('--years', type=float, nargs='+',
+                        help='History lengths in years for a custom grid (with --tickers)')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES,
+                        help='Stages to run (earlier stages always run first)')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='Skip tracemalloc (faster, no per-stage peak memory)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', default='benchmark_results.json',
+                        help='Results file (default: benchmark_results.json)')
+    parser.add_argument('--compare', help='Previous results file to compare against')
+    args = parser.parse_args()
+
+    if args.tickers or args.years:
+        tickers = args.tickers or [38]
+        years = args.years or [950 / TRADING_DAYS_PER_YEAR]
+        scenarios = [
+            (f'{n}x{y:g}y', n, max(2, int(round(y * TRADING_DAYS_PER_YEAR))))
+            for n in tickers for y in years
+        ]
+    else:
+        scenarios = STANDARD_SCENARIOS
+
+    # A stage needs the ones before it, so run the pipeline up to the last requested stage
+    last = max(STAGES.index(s) for s in args.stages)
+    stages = STAGES[:last + 1]
+
+    results = []
+    for name, n_tickers, n_days in scenarios:
+        print(f"Scenario {name}: {n_tickers} tickers x {n_days} days")
+        scenario_results = run_scenario(name, n_tickers, n_days, stages, args.seed, not args.no_memory)
+        results.extend(r for r in scenario_results if r['stage'] in args.stages)
+
+    report = {
+        'commit': git_commit(),
+        'generated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
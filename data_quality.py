@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Data-quality screening for the AI Shocks Portfolio Monitor
+
+Runs between the price download and portfolio aggregation. Problems are
+handled per ticker and per day with NaN masks; whole dates are never
+dropped because one ticker misbehaves. Missing returns contribute nothing
+to the portfolio on that day, as elsewhere in the monitor.
+
+Flags:
+
+  gap      missing price inside a ticker's trading history (days before its
+           first or after its last price, e.g. a late IPO, are not gaps)
+  stale    price unchanged from the day before on stale_days or more days
+           in a row (stale_days + 1 identical prices); the zero returns of
+           the whole run are masked
+  split    large one-day move matching a common split ratio (2:1, 3:1,
+           1:10, ...), i.e. an unadjusted split; that day's return is masked
+  spike    bad print: a move beyond max_abs_return that reverses the next
+           day; the price itself is masked, so neither return counts
+  extreme  any other move beyond max_abs_return; that day's return is masked
+
+Every check is a handful of column-wise numpy passes, so screening is
+linear in the size of the price panel.
+
+    screened = screen_prices(prices)
+    returns = screened['returns']
+    report = quality_report(screened)
+
+Incremental runs screen the new days together with lookback_rows() days
+of history before them, so stale runs and spike reversals that straddle
+the last stored day are still recognised, and merge the new days' report
+into the stored one with merge_reports.
+"""
+
+import numpy as np
+import pandas as pd
+
+FLAGS = ('gap', 'stale', 'split', 'spike', 'extreme')
+MAX_ABS_RETURN = 0.5
+STALE_DAYS = 5
+SPLIT_RATIOS = (2, 3, 4, 5, 8, 10, 20)
+SPLIT_TOLERANCE = 0.03
+
+
+def lookback_rows(stale_days=STALE_DAYS):
+    """Rows of history before the first new day that screening needs for context"""
+    # A stale run needs stale_days unchanged moves; a spike needs the day before it
+    return max(stale_days, 2)
+
+
+def _run_lengths(flags):
+    """Length of the run of consecutive True values ending at each row"""
+    counts = np.cumsum(flags, axis=0)
+    resets = np.maximum.accumulate(np.where(flags, 0, counts), axis=0)
+    return counts - resets
+
+
+def screen_prices(prices, max_abs_return=MAX_ABS_RETURN, stale_days=STALE_DAYS,
+                  split_ratios=SPLIT_RATIOS, split_tolerance=SPLIT_TOLERANCE):
+    """
+    Flag and mask bad prices and returns
+
+    Args:
+        prices (DataFrame): Daily prices, one column per ticker
+        max_abs_return (float): Daily moves beyond this are spikes or extremes;
+            split-like moves must be at least this large in either direction
+        stale_days (int): Consecutive zero-return days that count as stale,
+            i.e. stale_days + 1 identical prices (0 disables the check)
+        split_ratios (tuple): Split factors to recognise, in both directions
+        split_tolerance (float): Relative tolerance for matching a split factor
+            (only large moves are compared against split factors)
+
+    Returns:
+        dict: 'prices' (spikes masked), 'returns' (daily returns with flagged
+            days masked, first row dropped), 'flags' (name -> boolean
+            DataFrame aligned with prices) and 'raw_prices' (the input)
+    """
+    values = prices.to_numpy(dtype=float)
+    present = ~np.isnan(values)
+
+    # Inside each ticker's history: after its first and before its last price
+    started = np.maximum.accumulate(present, axis=0)
+    not_ended = np.maximum.accumulate(present[::-1], axis=0)[::-1]
+    gap = started & not_ended & ~present
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = np.vstack([np.full((1, values.shape[1]), np.nan), values[1:] / values[:-1]])
+        move = ratio - 1
+        next_move = np.vstack([move[1:], np.full((1, values.shape[1]), np.nan)])
+
+        log_ratio = np.abs(np.log(ratio))
+        split = np.zeros_like(present)
+        for factor in split_ratios:
+            split |= np.abs(log_ratio - np.log(factor)) < np.log1p(split_tolerance)
+
+    big = np.abs(move) > max_abs_return
+    # Split factors go both ways, so their size is measured on the log ratio:
+    # a 2:1 split (-50%) is as large a move as a 1:2 reverse split (+100%)
+    split &= log_ratio > np.log1p(max_abs_return)
+    spike = big & (np.abs(next_move) > max_abs_return / 2) & (np.sign(move) == -np.sign(next_move))
+    # The day after a spike is its reversal, already handled by masking the price
+    reversal = np.vstack([np.zeros((1, values.shape[1]), dtype=bool), spike[:-1]])
+    split &= ~spike & ~reversal
+    extreme = big & ~split & ~spike & ~reversal
+
+    stale = np.zeros_like(present)
+    if stale_days:
+        unchanged = move == 0
+        # Every day of a long enough run, not just those past the threshold
+        run = _run_lengths(unchanged) + _run_lengths(unchanged[::-1])[::-1] - 1
+        stale = unchanged & (run >= stale_days)
+
+    clean_prices = prices.mask(spike)
+    returns = clean_prices.pct_change(fill_method=None)
+    returns = returns.mask(split | extreme | stale).iloc[1:]
+
+    flags = {
+        name: pd.DataFrame(mask, index=prices.index, columns=prices.columns)
+        for name, mask in zip(FLAGS, (gap, stale, split, spike, extreme))
+    }
+    return {'prices': clean_prices, 'returns': returns, 'flags': flags, 'raw_prices': prices}
+
+
+def quality_report(screened, max_events=500, since=None):
+    """
+    Summarise a screening run
+
+    Args:
+        screened (dict): Output of screen_prices
+        max_events (int): Largest number of individual events to list (the
+            most recent are kept)
+        since (Timestamp): Only report days after this one; earlier rows were
+            screened as lookback context
+
+    Returns:
+        dict: Panel size, totals per flag, per-ticker counts (tickers with
+            any flag) and the flagged events (date, ticker, flag, price, move)
+    """
+    prices = screened['raw_prices']
+    flags = screened['flags']
+    move = prices.pct_change(fill_method=None)
+    if since is not None:
+        keep = prices.index > since
+        prices, move = prices[keep], move[keep]
+        flags = {name: mask[keep] for name, mask in flags.items()}
+
+    per_ticker = pd.DataFrame({name: mask.sum() for name, mask in flags.items()})
+    per_ticker = per_ticker[per_ticker.sum(axis=1) > 0]
+
+    # Flagged cells in date order, only the last max_events materialised
+    cells = [np.nonzero(mask.to_numpy()) + (i,) for i, mask in enumerate(flags.values())]
+    rows = np.concatenate([c[0] for c in cells])
+    cols = np.concatenate([c[1] for c in cells])
+    kinds = np.concatenate([np.full(len(c[0]), c[2]) for c in cells])
+    order = np.lexsort((kinds, cols, rows))
+    names = list(flags)
+    move = move.to_numpy()
+    values = prices.to_numpy(dtype=float)
+
+    events = []
+    for k in order[max(0, len(order) - max_events):]:
+        row, col = rows[k], cols[k]
+        events.append({
+            'date': prices.index[row].strftime('%Y-%m-%d'),
+            'ticker': prices.columns[col],
+            'flag': names[kinds[k]],
+            'price': None if np.isnan(values[row, col]) else float(values[row, col]),
+            'move': None if np.isnan(move[row, col]) else round(float(move[row, col]), 6)
+        })
+
+    return {
+        'days': len(prices),
+        'tickers': len(prices.columns),
+        'totals': {name: int(mask.to_numpy().sum()) for name, mask in flags.items()},
+        'by_ticker': {
+            ticker: {name: int(count) for name, count in counts.items() if count}
+            for ticker, counts in per_ticker.iterrows()
+        },
+        'events': events,
+        'events_truncated': len(order) > max_events
+    }
+
+
+def merge_reports(previous, update, max_events=500):
+    """
+    Extend a stored report with the report on the days after it
+
+    Args:
+        previous (dict): Report covering the stored days
+        update (dict): Report on the new days only (quality_report with since)
+        max_events (int): Largest number of events to keep (the most recent)
+
+    Returns:
+        dict: Report covering both
+    """
+    by_ticker = {ticker: dict(counts) for ticker, counts in previous['by_ticker'].items()}
+    for ticker, counts in update['by_ticker'].items():
+        merged = by_ticker.setdefault(ticker, {})
+        for name, count in counts.items():
+            merged[name] = merged.get(name, 0) + count
+    events = previous['events'] + update['events']
+
+    return {
+        'days': previous['days'] + update['days'],
+        'tickers': update['tickers'],
+        'totals': {name: previous['totals'].get(name, 0) + update['totals'].get(name, 0)
+                   for name in FLAGS},
+        'by_ticker': {ticker: {name: counts[name] for name in FLAGS if counts.get(name)}
+                      for ticker, counts in sorted(by_ticker.items())},
+        'events': events[max(0, len(events) - max_events):],
+        'events_truncated': (previous['events_truncated'] or update['events_truncated']
+                             or len(events) > max_events)
+    }
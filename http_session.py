@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Managed HTTP session for the AI Shocks Portfolio Monitor
+
+All live market data requests go through one shared session:
+
+  - keep-alive connection pooling: one session for every request instead
+    of a fresh connection per yf.Ticker call
+  - a token-bucket rate limiter: bursts up to `burst` requests, then a
+    steady requests_per_second
+  - a circuit breaker per endpoint (host plus the first three path
+    segments, e.g. query2.finance.yahoo.com/v10/finance/quoteSummary):
+    after failure_threshold consecutive failures (connection errors,
+    timeouts, HTTP 429 and 5xx) the endpoint fails fast with
+    CircuitOpenError for reset_timeout seconds, then one trial request
+    decides whether it closes again
+  - per-endpoint counters of requests, failures, rejected requests,
+    response bytes and latencies
+
+    session = create_session(requests_per_second=10)
+    yf.download(tickers, session=session)
+    session.stats.summary()
+
+The session class is built on curl_cffi when it is installed (yfinance
+0.2.54+ requires it for Yahoo) and on requests otherwise, so any URL,
+including a local stub server, can be used for testing.
+
+One session is shared by every worker thread. The limiter, breakers and
+counters are lock-protected; requests' connection pool is thread-safe,
+and the curl_cffi session keeps one curl handle per thread.
+"""
+
+import importlib.util
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to an endpoint whose circuit is open"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket: bursts of up to capacity, refilled at rate per second"""
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        """
+        Args:
+            rate (float): Tokens added per second (None or 0 disables limiting)
+            capacity (int): Largest burst (defaults to one second of tokens)
+            clock (callable): Monotonic time source
+        """
+        self.rate = rate or 0.0
+        self.capacity = float(capacity if capacity is not None else max(1.0, self.rate))
+        self.clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, blocking until it is available"""
+        if not self.rate:
+            return
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Reserve the token now; a negative balance is the wait of later callers
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures -> half-open trial -> closed"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=60.0, clock=time.monotonic):
+        """
+        Args:
+            failure_threshold (int): Consecutive failures that open the circuit
+            reset_timeout (float): Seconds the circuit stays open before a trial request
+            clock (callable): Monotonic time source
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = 'closed'
+        self.failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        """Raise CircuitOpenError unless a request may be sent now"""
+        with self._lock:
+            if self.state == 'open' and self.clock() - self._opened_at >= self.reset_timeout:
+                # Let exactly one trial request through
+                self.state = 'half_open'
+                return
+            if self.state != 'closed':
+                raise CircuitOpenError('circuit open')
+
+    def record(self, success):
+        """Record the outcome of a request that was let through"""
+        with self._lock:
+            if success:
+                self.state = 'closed'
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self._opened_at = self.clock()
+
+
+class SessionStats:
+    """Thread-safe per-endpoint request counters and latencies"""
+
+    def __init__(self, network_stats=None):
+        """
+        Args:
+            network_stats (NetworkStats): Run-wide counters to also update
+                (http_requests, http_failures, circuit_rejections, bytes_received)
+        """
+        self.network_stats = network_stats
+        self.endpoints = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, endpoint):
+        return self.endpoints.setdefault(endpoint, {
+            'requests': 0, 'failures': 0, 'rejected': 0, 'bytes': 0, 'latencies': []
+        })
+
+    def record(self, endpoint, latency, success, received=0):
+        """
+        Count one request that was sent
+
+        Args:
+            endpoint (str): Endpoint key (see endpoint_of)
+            latency (float): Seconds until the response (or error)
+            success (bool): False for errors, HTTP 429 and 5xx
+            received (int): Response body bytes
+        """
+        with self._lock:
+            entry = self._entry(endpoint)
+            entry['requests'] += 1
+            entry['failures'] += not success
+            entry['bytes'] += received
+            entry['latencies'].append(latency)
+        if self.network_stats is not None:
+            self.network_stats.add('http_requests')
+            self.network_stats.add('bytes_received', received)
+            if not success:
+                self.network_stats.add('http_failures')
+
+    def reject(self, endpoint):
+        with self._lock:
+            self._entry(endpoint)['rejected'] += 1
+        if self.network_stats is not None:
+            self.network_stats.add('circuit_rejections')
+
+    def summary(self):
+        """
+        Counters and latency percentiles per endpoint
+
+        Returns:
+            dict: Endpoint -> requests, failures, rejected, bytes and latency
+                mean/p50/p95/max in milliseconds
+        """
+        with self._lock:
+            endpoints = {name: dict(entry, latencies=sorted(entry['latencies']))
+                         for name, entry in self.endpoints.items()}
+
+        def percentile(values, p):
+            return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+        summary = {}
+        for name, entry in sorted(endpoints.items()):
+            latencies = entry.pop('latencies')
+            if latencies:
+                entry.update({
+                    'latency_mean_ms': round(1000 * sum(latencies) / len(latencies), 1),
+                    'latency_p50_ms': round(1000 * percentile(latencies, 50), 1),
+                    'latency_p95_ms': round(1000 * percentile(latencies, 95), 1),
+                    'latency_max_ms': round(1000 * latencies[-1], 1)
+                })
+            summary[name] = entry
+        return summary
+
+
+def endpoint_of(url):
+    """Circuit-breaker key for a URL: host plus the first three path segments"""
+    parts = urlsplit(url)
+    segments = [s for s in parts.path.split('/') if s][:3]
+    return parts.netloc + ('/' + '/'.join(segments) if segments else '')
+
+
+class ManagedSessionMixin:
+    """Rate limiting, circuit breaking and counters around Session.request"""
+
+    def _setup(self, bucket, stats, failure_threshold, reset_timeout, timeout):
+        self.bucket = bucket
+        self.stats = stats
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.default_timeout = timeout
+        self.breakers = {}
+        self._breakers_lock = threading.Lock()
+
+    def breaker(self, endpoint):
+        """The circuit breaker for an endpoint, created on first use"""
+        with self._breakers_lock:
+            if endpoint not in self.breakers:
+                self.breakers[endpoint] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self.breakers[endpoint]
+
+    def request(self, method, url, *args, **kwargs):
+        endpoint = endpoint_of(url)
+        breaker = self.breaker(endpoint)
+        try:
+            breaker.before_request()
+        except CircuitOpenError:
+            self.stats.reject(endpoint)
+            raise CircuitOpenError(f"Circuit open for {endpoint} after repeated failures")
+
+        self.bucket.acquire()
+        if self.default_timeout is not None and kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.default_timeout
+        start = time.perf_counter()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except Exception:
+            self.stats.record(endpoint, time.perf_counter() - start, False)
+            breaker.record(False)
+            raise
+
+        # Not-found and similar client errors are answers; throttling and
+        # server errors mean the endpoint is struggling
+        success = response.status_code < 500 and response.status_code != 429
+        self.stats.record(endpoint, time.perf_counter() - start, success, len(response.content))
+        breaker.record(success)
+        return response
+
+
+def create_session(requests_per_second=10, burst=None, failure_threshold=5, reset_timeout=60.0,
+                   timeout=30.0, pool_size=16, network_stats=None, backend=None):
+    """
+    Build a managed session
+
+    Args:
+        requests_per_second (float): Steady request rate (None disables limiting)
+        burst (int): Requests allowed back to back before the rate applies
+            (defaults to one second's worth)
+        failure_threshold (int): Consecutive failures that open an endpoint's circuit
+        reset_timeout (float): Seconds before an open circuit allows a trial request
+        timeout (float): Default per-request timeout in seconds
+        pool_size (int): Keep-alive connections kept per host (requests backend)
+        network_stats (NetworkStats): Run-wide counters to update as well
+        backend (str): 'curl_cffi' or 'requests' (defaults to curl_cffi when
+            installed)
+
+    Returns:
+        Session: A curl_cffi or requests session with the managed request()
+    """
+    if backend is None:
+        backend = 'curl_cffi' if importlib.util.find_spec('curl_cffi') else 'requests'
+
+    if backend == 'curl_cffi':
+        from curl_cffi import requests as curl_requests
+        session_class = type('ManagedSession', (ManagedSessionMixin, curl_requests.Session), {})
+        # Browser impersonation is what lets Yahoo accept the session. A curl
+        # handle must not be used by two threads at once, so each worker
+        # thread gets its own, kept alive with its connections
+        session = session_class(impersonate='chrome', use_thread_local_curl=True)
+    else:
+        import requests
+        from requests.adapters import HTTPAdapter
+        session_class = type('ManagedSession', (ManagedSessionMixin, requests.Session), {})
+        session = session_class()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
+    session._setup(TokenBucket(requests_per_second, burst), SessionStats(network_stats),
+                   failure_threshold, reset_timeout, timeout)
+    return session
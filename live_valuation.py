@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+live_valuation.py — Intraday valuation of the AI portfolio.
+
+The daily run values the portfolio at the close. This long-running mode
+polls the latest quotes for the portfolio's tickers and SPY on an interval
+and values the fixed-weight and daily market-cap weighted portfolios
+intraday, compounding from the previous close without touching history.
+
+Everything it needs comes from the baseline file the daily run saves next
+to the dataset (files/ai_portfolio_data_live_baseline.json): tickers,
+base-date weights, shares outstanding, previous closes and the cumulative
+values at the previous close. Each poll updates the intraday returns in
+place for the tickers that were quoted, so a poll costs O(tickers) however
+long the history is. A rolling snapshot of the latest valuations is
+written to ai_portfolio_live.json after every poll.
+
+    python live_valuation.py                          # Yahoo Finance, every 60s
+    python live_valuation.py --interval 15 --polls 40
+    python live_valuation.py --source simulated --interval 0 --polls 10000
+
+Quote sources are pluggable: anything with get_quotes(tickers) returning
+{ticker: price} works. SimulatedQuoteSource random-walks from the previous
+close and needs no network, for tests and benchmarks.
+"""
+
+import argparse
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+BENCHMARK = 'SPY'
+
+
+def build_baseline(weights, market_caps, last_row, last_close):
+    """
+    Everything the intraday valuation needs from the daily run
+
+    Args:
+        weights (dict): Ticker -> base-date weight
+        market_caps (dict): Ticker -> base-date market cap info
+        last_row (Series): Last dataset row (date and cumulative values)
+        last_close (Series): Last closing price per ticker, including SPY
+
+    Returns:
+        dict: JSON-serialisable baseline
+    """
+    tickers = list(weights.keys())
+
+    def price(ticker):
+        value = last_close.get(ticker, np.nan)
+        return None if pd.isna(value) else float(value)
+
+    return {
+        'as_of': pd.to_datetime(last_row['date']).strftime('%Y-%m-%d'),
+        'tickers': tickers,
+        'weights': [float(weights[t]) for t in tickers],
+        # Shares outstanding implied by the base-date snapshot, as in
+        # market_cap_weighted_returns
+        'shares': [
+            float(market_caps[t]['market_cap'] / market_caps[t]['price']) if t in market_caps else 1_000_000.0
+            for t in tickers
+        ],
+        'prev_close': {t: price(t) for t in tickers + [BENCHMARK]},
+        'start_values': {
+            'portfolio': float(last_row['cumulative_return']),
+            'daily_weighted': float(last_row['daily_weighted_cumulative']),
+            'spy': float(last_row['spy_cumulative_return'])
+        }
+    }
+
+
+class QuoteSource(ABC):
+    """Interface for latest-price feeds"""
+
+    name = 'base'
+
+    @abstractmethod
+    def get_quotes(self, tickers):
+        """
+        Latest trade price for each ticker
+
+        Args:
+            tickers (list): Ticker symbols
+
+        Returns:
+            dict: Ticker -> price, for the tickers quoted
+        """
+
+
+class YFinanceQuoteSource(QuoteSource):
+    """Latest one-minute bars from Yahoo Finance, through the managed HTTP session"""
+
+    name = 'yfinance'
+
+    def __init__(self, session=None, **session_options):
+        # Imported here so simulated runs never need yfinance installed
+        import yfinance
+        from http_session import create_session
+        self.yf = yfinance
+        self.session = session if session is not None else create_session(**session_options)
+
+    def get_quotes(self, tickers):
+        data = self.yf.download(list(tickers), period='1d', interval='1m', progress=False,
+                                session=self.session)
+        if data.empty:
+            return {}
+        closes = data['Close']
+        if isinstance(closes, pd.Series):
+            closes = closes.to_frame(tickers[0])
+        latest = closes.ffill().iloc[-1].dropna()
+        return {ticker: float(price) for ticker, price in latest.items()}
+
+
+class SimulatedQuoteSource(QuoteSource):
+    """Geometric random walk from given starting prices, one step per poll"""
+
+    name = 'simulated'
+
+    def __init__(self, start_prices, volatility=0.0005, seed=None):
+        """
+        Args:
+            start_prices (dict): Ticker -> starting price (e.g. previous closes)
+            volatility (float): Standard deviation of each step's log return
+            seed (int): Random seed for a reproducible feed
+        """
+        self.tickers = [t for t, p in start_prices.items() if p is not None]
+        self.prices = np.array([start_prices[t] for t in self.tickers], dtype=float)
+        self.volatility = volatility
+        self.rng = np.random.default_rng(seed)
+
+    def get_quotes(self, tickers):
+        self.prices *= np.exp(self.rng.normal(0, self.volatility, len(self.prices)))
+        wanted = set(tickers)
+        return {t: p for t, p in zip(self.tickers, self.prices.tolist()) if t in wanted}
+
+
+class LiveValuation:
+    """Intraday portfolio values compounded from the previous close"""
+
+    def __init__(self, baseline, history=390):
+        """
+        Args:
+            baseline (dict): Output of build_baseline
+            history (int): Valuation points kept in the rolling snapshot
+                (390 is one trading day of one-minute polls)
+        """
+        self.baseline = baseline
+        self.tickers = list(baseline['tickers'])
+        self.symbols = self.tickers + [BENCHMARK]
+        self.position = {t: i for i, t in enumerate(self.symbols)}
+
+        # Previous closes for the tickers and SPY (last slot); NaN = no close
+        self.prev_close = np.array([
+            np.nan if baseline['prev_close'].get(t) is None else baseline['prev_close'][t]
+            for t in self.symbols
+        ], dtype=float)
+        self.last = self.prev_close.copy()
+
+        # Weight vectors padded with a zero for SPY, so one dot product scores all
+        caps = self.prev_close[:-1] * np.array(baseline['shares'], dtype=float)
+        caps = np.where(np.isnan(caps), 0.0, caps)
+        self.fixed_weights = np.append(np.array(baseline['weights'], dtype=float), 0.0)
+        self.daily_weights = np.append(caps / caps.sum() if caps.sum() > 0 else caps, 0.0)
+
+        self.fixed_return = 0.0
+        self.daily_weighted_return = 0.0
+        self.quoted = np.zeros(len(self.symbols), dtype=bool)
+        self.points = deque(maxlen=history)
+
+    @classmethod
+    def from_file(cls, filename, history=390):
+        """Load the baseline JSON saved by the daily run"""
+        with open(filename) as f:
+            return cls(json.load(f), history=history)
+
+    def update(self, quotes, timestamp=None):
+        """
+        Apply new quotes and record a valuation point
+
+        Only the quoted tickers are touched: each one's change since its last
+        quote is added to the running portfolio returns. Tickers without a
+        previous close contribute nothing, as in the daily calculation.
+
+        Args:
+            quotes (dict): Ticker -> latest price
+            timestamp (datetime): Time of the quotes (defaults to now)
+
+        Returns:
+            dict: The new valuation point
+        """
+        positions = np.fromiter((self.position.get(t, -1) for t in quotes), dtype=int, count=len(quotes))
+        prices = np.fromiter((np.nan if p is None else p for p in quotes.values()), dtype=float,
+                             count=len(quotes))
+        # Unknown tickers, bad prices and tickers with no previous close are skipped
+        valid = (positions >= 0) & (prices > 0)
+        valid[valid] = ~np.isnan(self.prev_close[positions[valid]])
+        positions, prices = positions[valid], prices[valid]
+        change = (prices - self.last[positions]) / self.prev_close[positions]
+        self.fixed_return += self.fixed_weights[positions] @ change
+        self.daily_weighted_return += self.daily_weights[positions] @ change
+        self.last[positions] = prices
+        self.quoted[positions] = True
+
+        start = self.baseline['start_values']
+        spy_return = self.last[-1] / self.prev_close[-1] - 1
+        point = {
+            'time': (timestamp or datetime.now()).strftime('%Y-%m-%d %H:%M:%S'),
+            'portfolio_value': round(float(100 * start['portfolio'] * (1 + self.fixed_return)), 4),
+            'portfolio_return': round(float(self.fixed_return), 6),
+            'daily_weighted_value': round(float(100 * start['daily_weighted'] * (1 + self.daily_weighted_return)), 4),
+            'daily_weighted_return': round(float(self.daily_weighted_return), 6),
+            'spy_value': None if np.isnan(spy_return) else round(float(100 * start['spy'] * (1 + spy_return)), 4),
+            'spy_return': None if np.isnan(spy_return) else round(float(spy_return), 6),
+            'quoted': int(self.quoted[:-1].sum())
+        }
+        self.points.append(point)
+        return point
+
+    def snapshot(self):
+        """Rolling snapshot: baseline date, latest point and recent points"""
+        return {
+            'previous_close': self.baseline['as_of'],
+            'tickers': len(self.tickers),
+            'latest': self.points[-1] if self.points else None,
+            'points': list(self.points)
+        }
+
+    def write_snapshot(self, filename):
+        """Write the snapshot atomically, so readers never see a partial file"""
+        temporary = filename + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(self.snapshot(), f, separators=(',', ':'))
+        os.replace(temporary, filename)
+
+
+def run_live(valuation, source, output='ai_portfolio_live.json', interval=60, polls=None):
+    """
+    Poll quotes and publish the snapshot until interrupted
+
+    Args:
+        valuation (LiveValuation): Valuation state
+        source (QuoteSource): Quote feed
+        output (str): Snapshot file rewritten after every poll
+        interval (float): Seconds between the starts of two polls
+        polls (int): Stop after this many polls (None runs until interrupted)
+
+    Returns:
+        int: Number of polls made
+    """
+    count = 0
+    try:
+        while polls is None or count < polls:
+            started = time.monotonic()
+            try:
+                quotes = source.get_quotes(valuation.symbols)
+            except Exception as e:
+                print(f"  Warning: Quote request failed: {e}")
+                quotes = {}
+            count += 1
+
+            if quotes:
+                point = valuation.update(quotes)
+                valuation.write_snapshot(output)
+                if interval:
+                    spy = f"{point['spy_return']:+.2%}" if point['spy_return'] is not None else 'n/a'
+                    print(f"{point['time']}  portfolio {point['portfolio_value']:.2f} "
+                          f"({point['portfolio_return']:+.2%})  daily-weighted "
+                          f"{point['daily_weighted_value']:.2f} ({point['daily_weighted_return']:+.2%})  "
+                          f"SPY {spy}  [{point['quoted']}/{len(valuation.tickers)} quoted]")
+
+            if polls is None or count < polls:
+                time.sleep(max(0.0, interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        print("\nStopped")
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--baseline', default='files/ai_portfolio_data_live_baseline.json',
+                        help='Baseline saved by the daily run')
+    parser.add_argument('--source', choices=['yfinance', 'simulated'], default='yfinance',
+                        help="'simulated' random-walks from the previous close (no network)")
+    parser.add_argument('--interval', type=float, default=60, help='Seconds between polls')
+    parser.add_argument('--polls', type=int, help='Stop after this many polls')
+    parser.add_argument('--history', type=int, default=390, help='Points kept in the snapshot')
+    parser.add_argument('-o', '--output', default='ai_portfolio_live.json', help='Rolling snapshot file')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.baseline):
+        print(f"Error: No baseline at {args.baseline} (written by the daily run)")
+        return
+
+    valuation = LiveValuation.from_file(args.baseline, history=args.history)
+    if args.source == 'simulated':
+        source = SimulatedQuoteSource(valuation.baseline['prev_close'], seed=0)
+    else:
+        source = YFinanceQuoteSource()
+
+    print(f"Valuing {len(valuation.tickers)} tickers from the {valuation.baseline['as_of']} close "
+          f"({source.name} quotes, every {args.interval:g}s)")
+    start = time.perf_counter()
+    polls = run_live(valuation, source, args.output, args.interval, args.polls)
+    elapsed = time.perf_counter() - start
+    print(f"{polls} polls in {elapsed:.2f}s ({1e6 * elapsed / max(polls, 1):.0f} µs per poll)")
+    print(f"Snapshot saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Market data providers for the AI Shocks Portfolio Monitor
+
+PortfolioMonitor reads everything it needs from the network through one of
+these providers: daily price panels, a single ticker's price history around
+the base date, shares outstanding and company names.
+
+  YFinanceProvider  live data from Yahoo Finance (the default)
+  LocalProvider     on-disk fixture files, for offline, deterministic runs
+
+A LocalProvider can be built from the monitor's own outputs
+(files/ai_portfolio_data.csv plus the weights file), from a synthetic
+panel written by write_synthetic_fixture(), or directly from in-memory
+frames such as synthetic_panel() output.
+"""
+
+import os
+import threading
+from abc import ABC, abstractmethod
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+
+class MarketDataProvider(ABC):
+    """Interface for the market data PortfolioMonitor needs"""
+
+    name = 'base'
+
+    @abstractmethod
+    def download_prices(self, tickers, start_date, end_date):
+        """
+        Daily close prices for several tickers
+
+        Args:
+            tickers (list): Ticker symbols
+            start_date (str): First date (YYYY-MM-DD)
+            end_date (str): End date, exclusive (YYYY-MM-DD)
+
+        Returns:
+            DataFrame: Date index, one column per ticker found, or None
+        """
+
+    @abstractmethod
+    def get_price_history(self, ticker, start_date, end_date):
+        """
+        One ticker's daily history
+
+        Returns:
+            DataFrame: Date index with at least a 'Close' column (empty if none)
+        """
+
+    @abstractmethod
+    def get_shares_outstanding(self, ticker):
+        """Current shares outstanding, or None if unknown"""
+
+    @abstractmethod
+    def get_company_name(self, ticker):
+        """Current long company name, or 'Unknown'"""
+
+
+class YFinanceProvider(MarketDataProvider):
+    """
+    Live market data from Yahoo Finance through yfinance
+
+    Every request goes through one managed session (see http_session):
+    pooled keep-alive connections, a token-bucket rate limit, a circuit
+    breaker per endpoint and per-endpoint counters in session.stats.
+    yf.Ticker objects are kept per ticker, so shares outstanding and the
+    company name come from a single info request.
+    """
+
+    name = 'yfinance'
+
+    def __init__(self, session=None, **session_options):
+        """
+        Args:
+            session: Session to send requests through (defaults to
+                http_session.create_session(**session_options))
+        """
+        # Imported here so offline providers never need yfinance installed
+        import yfinance
+        from http_session import create_session
+        self.yf = yfinance
+        self.session = session if session is not None else create_session(**session_options)
+        self._tickers = {}
+        self._lock = threading.Lock()
+
+    def _ticker(self, ticker):
+        with self._lock:
+            if ticker not in self._tickers:
+                self._tickers[ticker] = self.yf.Ticker(ticker, session=self.session)
+            return self._tickers[ticker]
+
+    def download_prices(self, tickers, start_date, end_date):
+        tickers = list(tickers)
+        data = self.yf.download(tickers, start=start_date, end=end_date, progress=False,
+                                session=self.session)
+
+        if data.empty:
+            return None
+
+        # Handle different data structures based on number of tickers
+        if isinstance(data.columns, pd.MultiIndex):
+            # Multiple tickers (and newer single-ticker downloads) have MultiIndex columns
+            if 'Adj Close' in data.columns.get_level_values(0):
+                prices = data['Adj Close']
+            else:
+                prices = data['Close']
+        elif len(tickers) == 1:
+            # Single ticker case - data is a simple DataFrame
+            if 'Adj Close' in data.columns:
+                prices = data['Adj Close'].to_frame()
+                prices.columns = tickers
+            else:
+                prices = data[['Close']].rename(columns={'Close': tickers[0]})
+        else:
+            # Fallback if structure is unexpected
+            print("Warning: Unexpected data structure, using Close prices")
+            prices = data
+
+        if prices.index.tz is not None:
+            prices.index = prices.index.tz_localize(None)
+        return prices
+
+    def get_price_history(self, ticker, start_date, end_date):
+        return self._ticker(ticker).history(start=start_date, end=end_date)
+
+    def get_shares_outstanding(self, ticker):
+        info = self._ticker(ticker).info
+        shares_outstanding = info.get('sharesOutstanding')
+        if shares_outstanding is None:
+            shares_outstanding = info.get('impliedSharesOutstanding')
+        return shares_outstanding
+
+    def get_company_name(self, ticker):
+        return self._ticker(ticker).info.get('longName', 'Unknown')
+
+
+class LocalProvider(MarketDataProvider):
+    """
+    Market data served from fixture files on disk
+
+    Fixtures are two CSV files:
+      prices.csv        'date' column plus one price column per ticker
+      fundamentals.csv  ticker, shares_outstanding, company_name
+    """
+
+    name = 'local'
+
+    def __init__(self, prices_file, fundamentals_file):
+        """
+        Args:
+            prices_file (str): Wide CSV of daily prices
+            fundamentals_file (str): CSV of shares outstanding and company names
+        """
+        prices = pd.read_csv(prices_file, index_col='date', parse_dates=['date'])
+        fundamentals = pd.read_csv(fundamentals_file, dtype={'ticker': str})
+        self._set_frames(prices, fundamentals)
+
+    def _set_frames(self, prices, fundamentals):
+        self.prices = prices.sort_index()
+        fundamentals = fundamentals.set_index('ticker')
+        self.shares = fundamentals['shares_outstanding'].to_dict()
+        self.names = fundamentals['company_name'].to_dict()
+
+    @classmethod
+    def from_frames(cls, prices, fundamentals):
+        """
+        Build a provider from in-memory frames instead of fixture files
+
+        Args:
+            prices (DataFrame): Date index, one price column per ticker
+            fundamentals (DataFrame): ticker, shares_outstanding, company_name
+
+        Returns:
+            LocalProvider
+        """
+        provider = cls.__new__(cls)
+        provider._set_frames(prices, fundamentals)
+        return provider
+
+    @classmethod
+    def from_directory(cls, fixtures_dir):
+        """
+        Provider reading prices.csv and fundamentals.csv from a fixture directory
+
+        Args:
+            fixtures_dir (str): Directory written by write_synthetic_fixture or
+                from_dataset
+
+        Returns:
+            LocalProvider
+        """
+        return cls(os.path.join(fixtures_dir, 'prices.csv'), os.path.join(fixtures_dir, 'fundamentals.csv'))
+
+    @classmethod
+    def from_dataset(cls, dataset_file='files/ai_portfolio_data.csv', weights_file=None,
+                     output_dir=None, total_market_cap=1e12):
+        """
+        Build fixtures from an existing ai_portfolio_data.csv and weights file
+
+        Each ticker's price before its first stored return is backed out of
+        that return: on the base date for tickers with a full history, or on
+        the day before the first return for late listings. Shares outstanding
+        are chosen so market caps at that price reproduce the stored weights;
+        SPY's price is its stored $100 value.
+
+        Args:
+            dataset_file (str): Monitor dataset with {ticker}_price columns
+            weights_file (str): Weights CSV (defaults to the dataset's _weights.csv)
+            output_dir (str): Where to write prices.csv and fundamentals.csv
+                (None keeps the fixtures in memory)
+            total_market_cap (float): Total base-date market cap to scale shares to
+
+        Returns:
+            LocalProvider
+        """
+        if weights_file is None:
+            weights_file = dataset_file.replace('.csv', '_weights.csv')
+
+        data = pd.read_csv(dataset_file, parse_dates=['date'])
+        weights = pd.read_csv(weights_file, dtype={'ticker': str})
+        tickers = [t for t in weights['ticker'] if f'{t}_price' in data.columns]
+
+        prices = data.set_index('date')[[f'{t}_price' for t in tickers]]
+        prices.columns = tickers
+        prices['SPY'] = data['spy_value'].to_numpy()
+
+        # Seed price per ticker: its first price with a return, undone by that
+        # return. It lands on the base date (the day before the first stored
+        # row) or, for a late listing, on the day before its first return.
+        base_date = data['date'].iloc[0] - pd.tseries.offsets.BDay(1)
+        base_row = {t: np.nan for t in tickers}
+        base_row['SPY'] = 100.0
+        seeds = {}
+        for t in tickers:
+            returns = data[f'{t}_return'].to_numpy(dtype=float)
+            valid = np.flatnonzero(~np.isnan(returns) & prices[t].notna().to_numpy())
+            if not len(valid):
+                seeds[t] = prices[t].dropna().iloc[0] if prices[t].notna().any() else np.nan
+                continue
+            i = valid[0]
+            seeds[t] = prices[t].iloc[i] / (1 + returns[i])
+            if i == 0:
+                base_row[t] = seeds[t]
+            elif np.isnan(prices[t].iloc[i - 1]):
+                prices.iloc[i - 1, prices.columns.get_loc(t)] = seeds[t]
+        prices = pd.concat([pd.DataFrame(base_row, index=[base_date]), prices])
+        prices.index.name = 'date'
+
+        weight_map = weights.set_index('ticker')['weight']
+        fundamentals = pd.DataFrame({
+            'ticker': tickers,
+            'shares_outstanding': [weight_map[t] * total_market_cap / seeds[t] for t in tickers],
+            'company_name': weights.set_index('ticker').loc[tickers, 'company_name'].to_numpy()
+        })
+
+        if output_dir is None:
+            return cls.from_frames(prices, fundamentals)
+        os.makedirs(output_dir, exist_ok=True)
+        prices_file = os.path.join(output_dir, 'prices.csv')
+        fundamentals_file = os.path.join(output_dir, 'fundamentals.csv')
+        prices.to_csv(prices_file, date_format='%Y-%m-%d')
+        fundamentals.to_csv(fundamentals_file, index=False)
+        return cls(prices_file, fundamentals_file)
+
+    def download_prices(self, tickers, start_date, end_date):
+        columns = [t for t in tickers if t in self.prices.columns]
+        if not columns:
+            return None
+        end = pd.to_datetime(end_date) - timedelta(days=1)
+        prices = self.prices.loc[pd.to_datetime(start_date):end, columns]
+        return None if prices.empty else prices
+
+    def get_price_history(self, ticker, start_date, end_date):
+        if ticker not in self.prices.columns:
+            return pd.DataFrame(columns=['Close'])
+        end = pd.to_datetime(end_date) - timedelta(days=1)
+        close = self.prices.loc[pd.to_datetime(start_date):end, ticker].dropna()
+        return close.to_frame('Close')
+
+    def get_shares_outstanding(self, ticker):
+        return self.shares.get(ticker)
+
+    def get_company_name(self, ticker):
+        return self.names.get(ticker, 'Unknown')
+
+
+def synthetic_panel(n_tickers=38, n_days=950, start_date='2022-10-25', seed=0, benchmark='SPY'):
+    """
+    Generate a synthetic price panel and fundamentals
+
+    Prices follow a geometric random walk with a shared market factor, so
+    tickers are correlated like real equities. Tickers are named T0001,
+    T0002, ... plus the benchmark column.
+
+    Args:
+        n_tickers (int): Number of tickers in the universe
+        n_days (int): Number of business days of history
+        start_date (str): First date of the panel (YYYY-MM-DD)
+        seed (int): Random seed, so panels are reproducible
+        benchmark (str): Name of the benchmark column
+
+    Returns:
+        tuple: (prices DataFrame, fundamentals DataFrame)
+    """
+    rng = np.random.default_rng(seed)
+
+    dates = pd.bdate_range(start_date, periods=n_days)
+    tickers = [f'T{i:04d}' for i in range(1, n_tickers + 1)]
+
+    market = rng.normal(0.0004, 0.011, size=(n_days, 1))
+    betas = rng.uniform(0.6, 1.8, size=(1, n_tickers))
+    idiosyncratic = rng.normal(0.0, 0.02, size=(n_days, n_tickers))
+    log_returns = np.hstack([market * betas + idiosyncratic, market])
+    log_returns[0] = 0.0
+    start_prices = np.append(rng.uniform(10, 500, size=n_tickers), 100.0)
+    prices = pd.DataFrame(
+        start_prices * np.exp(np.cumsum(log_returns, axis=0)),
+        index=pd.Index(dates, name='date'),
+        columns=tickers + [benchmark]
+    )
+
+    fundamentals = pd.DataFrame({
+        'ticker': tickers,
+        'shares_outstanding': np.round(rng.lognormal(20, 1.2, size=n_tickers)),
+        'company_name': [f'SYNTHETIC COMPANY {t} INC' for t in tickers]
+    })
+    return prices, fundamentals
+
+
+def write_synthetic_fixture(output_dir, n_tickers=38, n_days=950, start_date='2022-10-25',
+                            seed=0, benchmark='SPY'):
+    """
+    Write a synthetic fixture (see synthetic_panel) to output_dir
+
+    Writes prices.csv, fundamentals.csv and a matching tickerlist.txt.
+
+    Returns:
+        LocalProvider: Provider reading the written fixture
+    """
+    prices, fundamentals = synthetic_panel(n_tickers, n_days, start_date, seed, benchmark)
+    os.makedirs(output_dir, exist_ok=True)
+
+    prices_file = os.path.join(output_dir, 'prices.csv')
+    fundamentals_file = os.path.join(output_dir, 'fundamentals.csv')
+    prices.to_csv(prices_file, date_format='%Y-%m-%d')
+    fundamentals.to_csv(fundamentals_file, index=False)
+    fundamentals[['ticker', 'company_name']].to_csv(
+        os.path.join(output_dir, 'tickerlist.txt'), sep='\t', header=False, index=False
+    )
+    return LocalProvider(prices_file, fundamentals_file)
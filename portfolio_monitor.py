@@ -10,44 +10,593 @@ The portfolio is weighted using market capitalization from October 25, 2022.
 
 import pandas as pd
 import numpy as np
-import yfinance as yf
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+import argparse
 import warnings
 from datetime import datetime, timedelta
+import hashlib
+import json
 import os
+import re
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from attribution import attribution_tables
+from data_quality import lookback_rows, merge_reports, quality_report, screen_prices
+from http_session import CircuitOpenError
+from live_valuation import build_baseline
+from market_data import LocalProvider, YFinanceProvider
+from rebalancing import merge_totals, run_rebalancing, schedule_totals, summarize_totals, validate_schedules
+from risk_analytics import latest_snapshot, rolling_risk
+from strategies import STRATEGIES, history_needed, run_strategies
+from run_report import NetworkStats, RunReport, carry_phase, payload_bytes
 
 warnings.filterwarnings('ignore')
 
+
+def call_with_retries(func, retries=3, backoff=1.0, on_retry=None, give_up=()):
+    """
+    Call func, retrying with exponential backoff when it raises
+    
+    Rate limiting is left to the HTTP session func sends its requests
+    through (see http_session), so every attempt is limited exactly once.
+    
+    Args:
+        func (callable): Zero-argument function making one network request
+        retries (int): Extra attempts after the first failure
+        backoff (float): Seconds to wait before the first retry, doubled each time
+        on_retry (callable): Called with no arguments before each retry
+        give_up (tuple): Exception types raised at once, without retrying
+    
+    Returns:
+        The value returned by func
+    """
+    for attempt in range(retries + 1):
+        try:
+            return func()
+        except give_up:
+            raise
+        except Exception:
+            if attempt == retries:
+                raise
+            if on_retry is not None:
+                on_retry()
+            time.sleep(backoff * (2 ** attempt))
+
+
+# Tokens that differ between listing names and Yahoo long names without
+# signalling a real change ("NVIDIA CORP" vs "NVIDIA Corporation")
+COMPANY_NAME_SUFFIXES = {
+    'INC', 'INCORPORATED', 'CORP', 'CORPORATION', 'COR', 'CO', 'COMPANY',
+    'LTD', 'LIMITED', 'PLC', 'HOLDINGS', 'HOLDING', 'LLC', 'LP', 'NV', 'SA',
+    'AG', 'SE', 'COMMON', 'STOCK', 'SHARES', 'ORDINARY', 'ADR', 'THE'
+}
+
+
+def normalize_company_name(name):
+    """
+    Reduce a company name to a comparable form
+    
+    Upper-cases, drops punctuation, share-class labels ("CLASS A") and
+    trailing legal suffixes, so "ARISTA NETWORKS INC" and
+    "Arista Networks, Inc." both become "ARISTA NETWORKS".
+    """
+    text = re.sub(r'[^A-Z0-9 ]', ' ', str(name).upper().replace('&', ' AND '))
+    text = re.sub(r'\b(CLASS|CL|SERIES)\s+[A-Z]\b', ' ', text)
+    tokens = text.split()
+    if tokens and tokens[0] == 'THE':
+        tokens = tokens[1:]
+    while len(tokens) > 1 and tokens[-1] in COMPANY_NAME_SUFFIXES:
+        tokens.pop()
+    return ' '.join(tokens)
+
+
+def company_names_match(original, current):
+    """True if two company names refer to the same listing name"""
+    return normalize_company_name(original) == normalize_company_name(current)
+
+
+def load_universe(filename, symbol_column='Symbol', name_column='Security'):
+    """
+    Read a ticker universe from a CSV such as files/sp500.csv
+    
+    Symbols are converted to Yahoo Finance form (BRK.B -> BRK-B).
+    
+    Args:
+        filename (str): CSV with a header row
+        symbol_column (str): Column of ticker symbols
+        name_column (str): Column of company names
+    
+    Returns:
+        DataFrame: ticker, company_name
+    """
+    universe = pd.read_csv(filename, dtype=str, encoding='utf-8-sig')
+    return pd.DataFrame({
+        'ticker': universe[symbol_column].str.strip().str.replace('.', '-', regex=False),
+        'company_name': universe[name_column].str.strip()
+    }).dropna(subset=['ticker']).drop_duplicates('ticker').reset_index(drop=True)
+
+
+def fixed_weight_returns(returns, weights):
+    """
+    Daily returns of a portfolio held at constant weights
+    
+    Missing tickers (absent columns or NaN returns) contribute nothing on
+    that day, the same as skipping them in a per-ticker loop.
+    
+    Args:
+        returns (DataFrame): Daily returns, one column per ticker
+        weights (dict): Ticker -> portfolio weight
+    
+    Returns:
+        Series: Portfolio daily return indexed like ``returns``
+    """
+    tickers = list(weights.keys())
+    ret_matrix = returns.reindex(columns=tickers).to_numpy(dtype=float)
+    weight_vector = np.array([weights[t] for t in tickers], dtype=float)
+    
+    daily = np.where(np.isnan(ret_matrix), 0.0, ret_matrix) @ weight_vector
+    return pd.Series(daily, index=returns.index, dtype=float)
+
+
+def market_cap_weighted_returns(prices, returns, weights, market_caps, prev_prices=None):
+    """
+    Daily returns of a portfolio reweighted each day by market cap
+    
+    Day one uses the base-date weights. Every later day weights each ticker
+    by its previous row's price times base-date shares outstanding; tickers
+    with no previous price get zero weight for that day.
+    
+    Args:
+        prices (DataFrame): Prices, one column per ticker
+        returns (DataFrame): Daily returns aligned to the dates being scored
+        weights (dict): Ticker -> base-date weight
+        market_caps (dict): Ticker -> base-date market cap info
+        prev_prices (Series): Prices on the day before returns.index[0]; when
+            given, day one is weighted from these instead of base weights
+    
+    Returns:
+        tuple: (Series of daily returns, DataFrame of daily weights)
+    """
+    tickers = list(weights.keys())
+    n_days = len(returns.index)
+    
+    # Shares outstanding implied by the base-date snapshot
+    shares = np.array([
+        market_caps[t]['market_cap'] / market_caps[t]['price'] if t in market_caps else 1_000_000
+        for t in tickers
+    ], dtype=float)
+    
+    # Previous row of the return index, not the previous calendar day
+    price_matrix = prices.reindex(index=returns.index, columns=tickers).to_numpy(dtype=float)
+    weight_matrix = np.empty((n_days, len(tickers)), dtype=float)
+    if prev_prices is None:
+        if n_days:
+            weight_matrix[0] = [weights[t] for t in tickers]
+        first, prev_matrix = 1, price_matrix[:-1]
+    else:
+        prev_row = prev_prices.reindex(tickers).to_numpy(dtype=float)
+        first, prev_matrix = 0, np.vstack([prev_row, price_matrix[:-1]])[:n_days]
+    if n_days > first:
+        caps = prev_matrix * shares
+        caps = np.where(np.isnan(caps), 0.0, caps)
+        total = caps.sum(axis=1, keepdims=True)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight_matrix[first:] = np.where(total > 0, caps / total, 0.0)
+    
+    ret_matrix = returns.reindex(columns=tickers).to_numpy(dtype=float)
+    daily = (weight_matrix * np.where(np.isnan(ret_matrix), 0.0, ret_matrix)).sum(axis=1)
+    
+    daily_returns = pd.Series(daily, index=returns.index, dtype=float)
+    daily_weights = pd.DataFrame(weight_matrix, index=returns.index, columns=tickers)
+    return daily_returns, daily_weights
+
+
+def long_format(portfolio_data, tickers):
+    """
+    Reshape per-ticker dataset columns to one row per date and ticker
+    
+    Args:
+        portfolio_data (DataFrame): Dataset with {ticker}_price / {ticker}_return columns
+        tickers (list): Tickers to include, in order
+    
+    Returns:
+        DataFrame: date, ticker (categorical), price, return
+    """
+    tickers = [t for t in tickers if f'{t}_price' in portfolio_data.columns]
+    n_days = len(portfolio_data)
+    
+    prices = portfolio_data[[f'{t}_price' for t in tickers]].to_numpy(dtype=float)
+    returns = portfolio_data.reindex(columns=[f'{t}_return' for t in tickers]).to_numpy(dtype=float)
+    
+    return pd.DataFrame({
+        'date': np.repeat(portfolio_data['date'].to_numpy(), len(tickers)),
+        'ticker': pd.Categorical.from_codes(np.tile(np.arange(len(tickers)), n_days), categories=tickers),
+        'price': prices.ravel(),
+        'return': returns.ravel()
+    })
+
+
+def partition_keys(dates, layout):
+    """Partition key ('2024' or '2024-03') for each date"""
+    fmt = '%Y' if layout == 'year' else '%Y-%m'
+    return pd.to_datetime(pd.Series(dates)).dt.strftime(fmt).to_numpy()
+
+
+def iter_partitions(directory, start_date=None, end_date=None, columns=None):
+    """
+    Yield the partitions of a partitioned dataset that overlap a date range
+    
+    Partitions outside the range are never opened, so a reader only pays
+    for the years or months it asks for.
+    
+    Args:
+        directory (str): Partition directory containing manifest.json
+        start_date (str): First date wanted (YYYY-MM-DD), inclusive
+        end_date (str): Last date wanted (YYYY-MM-DD), inclusive
+        columns (list): Columns to read ('date' is always included)
+    
+    Yields:
+        DataFrame: One partition, trimmed to the date range
+    """
+    with open(os.path.join(directory, 'manifest.json')) as f:
+        manifest = json.load(f)
+    
+    start = pd.to_datetime(start_date) if start_date else None
+    end = pd.to_datetime(end_date) if end_date else None
+    usecols = None if columns is None else ['date'] + [c for c in columns if c != 'date']
+    
+    for entry in manifest['partitions']:
+        if start is not None and pd.to_datetime(entry['end']) < start:
+            continue
+        if end is not None and pd.to_datetime(entry['start']) > end:
+            continue
+        part = pd.read_csv(os.path.join(directory, entry['file']), usecols=usecols, parse_dates=['date'])
+        if start is not None:
+            part = part[part['date'] >= start]
+        if end is not None:
+            part = part[part['date'] <= end]
+        yield part
+
+
+def load_partitioned_dataset(directory, start_date=None, end_date=None, columns=None):
+    """
+    Load a partitioned dataset (or a date range of it) as one DataFrame
+    
+    See iter_partitions for the arguments.
+    """
+    parts = list(iter_partitions(directory, start_date, end_date, columns))
+    if not parts:
+        return pd.DataFrame(columns=['date'] + list(columns or []))
+    return pd.concat(parts, ignore_index=True)
+
+
+def lttb_indices(values, max_points):
+    """
+    Pick which points to keep when downsampling a series for plotting
+    
+    Largest-Triangle-Three-Buckets: the series is split into max_points - 2
+    buckets and from each the point forming the largest triangle with its
+    neighbours is kept, which preserves peaks, troughs and overall shape.
+    Runs in O(n).
+    
+    Args:
+        values (ndarray): Series values, evenly spaced in x
+        max_points (int): Number of points to keep
+    
+    Returns:
+        ndarray: Sorted row indices to keep (all rows if already short enough)
+    """
+    n = len(values)
+    if max_points is None or max_points < 3 or n <= max_points:
+        return np.arange(n)
+    
+    y = np.nan_to_num(np.asarray(values, dtype=float))
+    edges = np.floor(np.linspace(1, n - 1, max_points - 1)).astype(int)
+    keep = np.empty(max_points, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    
+    selected = 0
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (the last point for the final bucket)
+        if i + 2 < len(edges):
+            next_x = (edges[i + 1] + edges[i + 2] - 1) / 2
+            next_y = y[edges[i + 1]:edges[i + 2]].mean()
+        else:
+            next_x, next_y = n - 1, y[n - 1]
+        
+        xs = np.arange(start, end)
+        areas = np.abs((selected - next_x) * (y[start:end] - y[selected])
+                       - (selected - xs) * (next_y - y[selected]))
+        selected = start + int(np.argmax(areas))
+        keep[i + 1] = selected
+    
+    return keep
+
+
+# Swaps full-resolution points into the chart when the user zooms in and
+# restores the downsampled series on reset (lean charts only)
+CHART_ZOOM_SCRIPT = """
+(function() {
+    var gd = document.getElementById('{plot_id}');
+    var dataUrl = __DATA_URL__;
+    var maxPoints = __MAX_POINTS__;
+    var full = null, pending = null;
+
+    function load(callback) {
+        if (full) { callback(); return; }
+        if (!pending) {
+            pending = fetch(dataUrl)
+                .then(function(response) { return response.json(); })
+                .then(function(data) { full = data; });
+        }
+        pending.then(callback).catch(function(err) {
+            console.warn('Full-resolution chart data unavailable', err);
+        });
+    }
+
+    function show(indicesFor) {
+        var update = {x: [], y: [], 'marker.color': []};
+        full.traces.forEach(function(trace, i) {
+            var idx = indicesFor(trace);
+            var y = idx.map(function(k) { return trace.y[k]; });
+            update.x.push(idx.map(function(k) { return full.dates[k]; }));
+            update.y.push(y);
+            update['marker.color'].push(trace.colors ? y.map(function(v) {
+                return v >= 0 ? trace.colors[0] : trace.colors[1];
+            }) : null);
+        });
+        Plotly.restyle(gd, update, full.traces.map(function(trace, i) { return i; }));
+    }
+
+    gd.on('plotly_relayout', function(event) {
+        var keys = Object.keys(event);
+        if (keys.some(function(k) { return /^xaxis\\d*\\.autorange$/.test(k); })) {
+            if (full) { show(function(trace) { return trace.sample; }); }
+            return;
+        }
+        var lo = null, hi = null;
+        keys.forEach(function(k) {
+            if (/^xaxis\\d*\\.range\\[0\\]$/.test(k)) { lo = event[k]; hi = event[k.replace('[0]', '[1]')]; }
+            else if (/^xaxis\\d*\\.range$/.test(k)) { lo = event[k][0]; hi = event[k][1]; }
+        });
+        if (lo === null) { return; }
+        lo = String(lo).slice(0, 10);
+        hi = String(hi).slice(0, 10);
+        load(function() {
+            var inRange = function(k) { return full.dates[k] >= lo && full.dates[k] <= hi; };
+            var visible = [];
+            for (var k = 0; k < full.dates.length; k++) { if (inRange(k)) { visible.push(k); } }
+            show(function(trace) {
+                return visible.length > maxPoints ? trace.sample.filter(inRange) : visible;
+            });
+        });
+    });
+})();
+"""
+
+
+# Data feed format (save_feed); bump FEED_VERSION on incompatible changes
+FEED_VERSION = 1
+# column: (scale, decimals) - values in base-100 dollars, returns in percent
+FEED_PRECISION = {
+    'portfolio_value': (1, 2),
+    'daily_weighted_value': (1, 2),
+    'spy_value': (1, 2),
+    'daily_return': (100, 3),
+    'daily_weighted_return': (100, 3),
+    'spy_daily_return': (100, 3)
+}
+
+
+# Line colours for extra strategies in the chart
+STRATEGY_COLORS = ['#3BB273', '#7768AE', '#E1BC29', '#4D9DE0', '#E15554', '#6C757D']
+
+
 class PortfolioMonitor:
-    def __init__(self, ticker_file='tickerlist.txt', base_date='2022-10-25'):
+    def __init__(self, ticker_file='tickerlist.txt', base_date='2022-10-25',
+                 price_cache='files/price_cache.csv', refresh_prices=False,
+                 dataset_file='files/ai_portfolio_data.csv', incremental=False,
+                 max_workers=8, requests_per_second=10, max_retries=3, retry_backoff=1.0,
+                 base_snapshot='files/base_snapshot.json',
+                 metadata_cache='files/company_metadata.json', metadata_ttl_days=7,
+                 provider=None, output_formats=(), csv_float_precision=None,
+                 dataset_layout='single', lean_chart=False, chart_max_points=1000,
+                 risk_windows=(), risk_constituents=False, strategies=(),
+                 download_chunk_size=100, price_dtype='float64', quality_checks=True,
+                 overlap_fetch=True, circuit_failure_threshold=5,
+                 circuit_reset_seconds=60, attribution=False, rebalance_schedules=(),
+                 rebalance_targets=('fixed',), rebalance_cost_bps=0.0):
         """
         Initialize the Portfolio Monitor
         
         Args:
-            ticker_file (str): Path to ticker list file
+            ticker_file (str): Path to ticker list file: tab-separated ticker and
+                company name, or a CSV universe with Symbol and Security columns
+                such as files/sp500.csv
             base_date (str): Date to use for market cap weights (YYYY-MM-DD)
+            price_cache (str): CSV file of cached daily prices (None disables caching)
+            refresh_prices (bool): Ignore the price cache and download full history
+            dataset_file (str): Existing dataset that incremental runs extend
+            incremental (bool): Append only new trading days to dataset_file
+            max_workers (int): Concurrent per-ticker requests to Yahoo Finance
+            requests_per_second (float): Token-bucket rate for the HTTP requests
+                of the default Yahoo Finance session, shared by every thread (see
+                http_session); the only rate limit, so offline providers run
+                unthrottled
+            max_retries (int): Retries per request after a failure
+            retry_backoff (float): Initial retry delay in seconds, doubled per retry
+            base_snapshot (str): JSON file freezing base-date market caps and weights
+                (None always fetches them live)
+            metadata_cache (str): JSON cache of company names for change checks
+            metadata_ttl_days (float): Days before a cached company name is refreshed
+            provider (MarketDataProvider): Source of prices, shares and names
+                (defaults to YFinanceProvider, created on first use)
+            output_formats (tuple): Columnar copies to write with the CSV:
+                'parquet' and/or 'feather' (Arrow IPC); needs pyarrow
+            csv_float_precision (int): Significant digits for CSV floats
+                (None writes full precision)
+            dataset_layout (str): 'single' CSV, or 'year' / 'month' partitions in
+                a directory named after the dataset, with a manifest.json
+            lean_chart (bool): Write the lightweight chart page by default
+                (shared plotly.min.js, WebGL lines, downsampling)
+            chart_max_points (int): Points per trace in a lean chart before zooming
+            risk_windows (tuple): Rolling windows in trading days for the risk
+                columns (volatility, beta, correlation, Sharpe, Sortino); empty
+                skips risk analytics
+            risk_constituents (bool): Also compute risk statistics for every
+                constituent and save the latest values to <dataset>_risk.csv
+            strategies (tuple): Extra weighting strategies from strategies.STRATEGIES
+                (e.g. 'equal', 'inverse_vol') to evaluate alongside the fixed and
+                daily-weighted portfolios; each adds strategy_{name}_return and
+                strategy_{name}_value columns and a chart line
+            download_chunk_size (int): Tickers per batch price download; larger
+                universes are split into chunks fetched on max_workers threads,
+                with completed chunks kept on disk so an interrupted run resumes
+            price_dtype (str): dtype of the per-ticker price/return columns;
+                'float32' halves their memory and keeps about 7 significant
+                digits (relative error under 1e-6 against float64); portfolio
+                series are computed and stored in float64 either way
+            quality_checks (bool): Screen prices for gaps, stale prices, split-like
+                jumps and bad prints before aggregation, masking bad values
+                instead of dropping dates (see data_quality); False restores
+                dropping every date on which any ticker has no return
+            overlap_fetch (bool): Download prices and check company names in the
+                background while base-date market caps are fetched (see
+                start_network_phases)
+            circuit_failure_threshold (int): Consecutive failures that make an
+                endpoint fail fast instead of timing out on every ticker
+            circuit_reset_seconds (float): Seconds before a failed endpoint is tried again
+            attribution (bool): Compute each ticker's daily and cumulative
+                contribution to the fixed and daily-weighted portfolios and
+                save them with the top contributors per day (see attribution)
+            rebalance_schedules (tuple): Rebalancing schedules to hold each
+                rebalance target on ('daily', 'weekly', 'monthly', 'quarterly' or
+                a drift threshold such as 'threshold5'); each target/schedule
+                pair adds rebalance_{target}_{schedule}_return, _value and
+                _turnover columns (see rebalancing)
+            rebalance_targets (tuple): Strategies from strategies.STRATEGIES whose
+                weights the schedules trade back to
+            rebalance_cost_bps (float): Transaction cost in basis points of the
+                value traded at each rebalance
         """
         self.ticker_file = ticker_file
         self.base_date = base_date
+        self.price_cache = price_cache
+        self.refresh_prices = refresh_prices
+        self.dataset_file = dataset_file
+        self.incremental = incremental
+        self.rows_on_disk = 0
+        self.attribution_on_disk = None
+        self.max_workers = max_workers
+        self.requests_per_second = requests_per_second
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.base_snapshot = base_snapshot
+        self.metadata_cache = metadata_cache
+        self.metadata_ttl_days = metadata_ttl_days
+        self._provider = provider
+        self.output_formats = tuple(output_formats)
+        self.csv_float_precision = csv_float_precision
+        self.dataset_layout = dataset_layout
+        self.lean_chart = lean_chart
+        self.chart_max_points = chart_max_points
+        self.risk_windows = tuple(risk_windows)
+        self.risk_constituents = risk_constituents
+        self.strategies = tuple(strategies)
+        self.download_chunk_size = download_chunk_size
+        self.price_dtype = np.dtype(price_dtype)
+        self.quality_checks = quality_checks
+        self.quality_report = None
+        self.quality_flags = None
+        self.overlap_fetch = overlap_fetch
+        self._background = {}
+        self._background_executor = None
+        self.circuit_failure_threshold = circuit_failure_threshold
+        self.circuit_reset_seconds = circuit_reset_seconds
+        self.attribution = attribution
+        self.attribution_matrix = None
+        self.top_contributors = None
+        validate_schedules(rebalance_schedules)
+        self.rebalance_schedules = tuple(rebalance_schedules)
+        self.rebalance_targets = tuple(rebalance_targets)
+        self.rebalance_cost_bps = rebalance_cost_bps
+        self.rebalance_summary = None
+        self.rebalance_totals = None
+        self.price_adjustments = {}
+        self.network_stats = NetworkStats()
+        self.run_report = None
         self.tickers_df = None
         self.market_caps = {}
         self.weights = {}
         self.portfolio_data = None
+        self.daily_weights = None
+        self.constituent_risk = None
+        self.last_close = None
         self.ticker_changes = []
         
+    @property
+    def provider(self):
+        """Market data provider, defaulting to live Yahoo Finance data"""
+        if self._provider is None:
+            self._provider = YFinanceProvider(
+                requests_per_second=self.requests_per_second,
+                failure_threshold=self.circuit_failure_threshold,
+                reset_timeout=self.circuit_reset_seconds,
+                network_stats=self.network_stats
+            )
+        return self._provider
+    
+    @property
+    def http_stats(self):
+        """Per-endpoint counters of the provider's HTTP session (None for offline providers)"""
+        return getattr(getattr(self._provider, 'session', None), 'stats', None)
+    
+    def _call_provider(self, func):
+        """
+        Make one provider request, retrying failures
+        
+        This is the only retry layer: the provider's HTTP session limits the
+        rate and fails fast once an endpoint's circuit opens, which ends the
+        retries here at once instead of waiting out the backoff. Every attempt, retry, failure and the decoded size of each result
+        are counted in self.network_stats for the run report; bytes on the
+        wire are counted by the HTTP session itself.
+        """
+        def counted():
+            self.network_stats.add('provider_calls')
+            result = func()
+            self.network_stats.add('payload_bytes', payload_bytes(result))
+            return result
+        
+        try:
+            return call_with_retries(
+                counted,
+                retries=self.max_retries, backoff=self.retry_backoff,
+                on_retry=lambda: self.network_stats.add('retries'),
+                # An open circuit fails fast; retrying would only wait out the backoff
+                give_up=(CircuitOpenError,)
+            )
+        except Exception:
+            self.network_stats.add('failures')
+            raise
+    
     def load_ticker_list(self):
         """Load ticker symbols and company names from file"""
         print(f"Loading ticker list from {self.ticker_file}...")
         
         try:
-            # Read ticker file (tab-separated)
-            self.tickers_df = pd.read_csv(
-                self.ticker_file, 
-                sep='\t', 
-                names=['ticker', 'company_name'],
-                dtype=str
-            )
+            if self.ticker_file.endswith('.csv'):
+                # Universe file such as files/sp500.csv (Symbol, Security, ...)
+                self.tickers_df = load_universe(self.ticker_file)
+            else:
+                # Read ticker file (tab-separated)
+                self.tickers_df = pd.read_csv(
+                    self.ticker_file, 
+                    sep='\t', 
+                    names=['ticker', 'company_name'],
+                    dtype=str
+                )
             
             # Clean whitespace
             self.tickers_df['ticker'] = self.tickers_df['ticker'].str.strip()
@@ -60,296 +609,1340 @@ class PortfolioMonitor:
             print(f"Error loading ticker list: {e}")
             return False
     
-    def get_market_caps_base_date(self):
-        """Get market capitalizations for all tickers on the base date"""
-        print(f"Fetching market caps for {self.base_date}...")
+    def _fetch_base_market_cap(self, ticker, company, hist_data=None):
+        """
+        Fetch one ticker's close and market cap around the base date
+        
+        Args:
+            hist_data (DataFrame): Closes around the base date from a batch
+                download ('Close' column); fetched per ticker when None
+        
+        Returns:
+            dict: Entry for self.market_caps, or None if no data was found
+        """
+        # Get historical data around base date
+        start_date = pd.to_datetime(self.base_date) - timedelta(days=7)
+        end_date = pd.to_datetime(self.base_date) + timedelta(days=7)
+        
+        if hist_data is None:
+            hist_data = self._call_provider(lambda: self.provider.get_price_history(ticker, start_date, end_date))
+        
+        if hist_data.empty:
+            print(f"  Warning: No data for {ticker} ({company})")
+            return None
+        
+        # Find the closest date to our base date
+        target_date = pd.to_datetime(self.base_date)
+        
+        # Handle timezone-aware index
+        if hist_data.index.tz is not None:
+            # If historical data has timezone, localize target_date
+            target_date = target_date.tz_localize(hist_data.index.tz)
+        elif target_date.tz is not None:
+            # If target_date has timezone but hist_data doesn't, remove timezone
+            target_date = target_date.tz_localize(None)
+        
+        closest_date = hist_data.index[hist_data.index.get_indexer([target_date], method='nearest')[0]]
+        
+        # Get shares outstanding (use info or approximate from market cap)
+        try:
+            shares_outstanding = self._call_provider(lambda: self.provider.get_shares_outstanding(ticker))
+        except:
+            shares_outstanding = None
+        
+        # Calculate market cap
+        close_price = hist_data.loc[closest_date, 'Close']
+        
+        if shares_outstanding:
+            market_cap = close_price * shares_outstanding
+        else:
+            # Use a default approximation if shares outstanding not available
+            # This is a fallback - in practice, you'd want actual shares outstanding
+            market_cap = close_price * 1_000_000  # Placeholder
+            print(f"  Warning: Using estimated market cap for {ticker}")
+        
+        return {
+            'market_cap': market_cap,
+            'price': close_price,
+            'date': closest_date,
+            'company_name': company,
+            'estimated': not shares_outstanding
+        }
+    
+    def start_network_phases(self, prices=True, names=True):
+        """
+        Start the price download and company-name check in the background
+        
+        Neither needs the base-date market caps, so both run on their own
+        threads while get_market_caps_base_date works in the caller's thread;
+        load_price_history and check_ticker_changes then wait for and use the
+        results. Wall time approaches the slowest of the three network phases
+        instead of their sum. The whole ticker list is fetched (plus SPY for
+        prices); tickers later dropped for lack of a market cap are not used.
+        Their traffic is counted under their own phases, not the foreground
+        stage that happens to be running, and finish_network_phases joins
+        them and adds them to the run report.
+        
+        Args:
+            prices (bool): Download price history from the base date to today
+            names (bool): Refresh current company names
+        """
+        if not self.overlap_fetch or self.tickers_df is None:
+            return
+        
+        tickers = list(self.tickers_df['ticker'])
+        self.provider  # create the provider once, before the threads share it
+        executor = self._background_executor = ThreadPoolExecutor(max_workers=2)
+        if prices:
+            start_date, end_date = self.base_date, datetime.now().strftime('%Y-%m-%d')
+            self._background['prices'] = {'tickers': tickers + ['SPY'], 'start_date': start_date,
+                                          'end_date': end_date}
+            self._background['prices']['future'] = executor.submit(
+                self._background_phase, 'prices', self._load_price_history, tickers + ['SPY'], start_date, end_date
+            )
+        if names:
+            self._background['names'] = {'tickers': tickers}
+            self._background['names']['future'] = executor.submit(
+                self._background_phase, 'names', self.refresh_company_metadata, tickers
+            )
+        print(f"Started background {' and '.join(self._background)} fetch for {len(tickers)} tickers")
+    
+    def _background_phase(self, name, func, *args):
+        """Run func as background phase name, counting its traffic and wall time"""
+        start = time.perf_counter()
+        try:
+            with self.network_stats.phase(name):
+                return func(*args)
+        finally:
+            self._background[name]['seconds'] = time.perf_counter() - start
+    
+    def finish_network_phases(self):
+        """
+        Wait for the background phases and add them to the run report
+        
+        Called at the end of every run, so no background download is still
+        writing the price or metadata cache once the run has returned.
+        """
+        if self._background_executor is None:
+            return
+        self._background_executor.shutdown(wait=True)
+        self._background_executor = None
+        
+        for name, phase in self._background.items():
+            future = phase['future']
+            result = future.result() if future.exception() is None else None
+            if self.run_report is not None:
+                self.run_report.add_phase(name, phase['seconds'],
+                                          rows=len(result) if result is not None else 0)
+        self._background = {}
+    
+    def get_market_caps_base_date(self):
+        """
+        Get market capitalizations for all tickers on the base date
+        
+        Tickers already in the frozen base snapshot are read from disk; only
+        the rest are fetched, concurrently on up to max_workers threads, with
+        every request passing through the session's shared rate limit.
+        Results are stored in ticker-list order, as if fetched one by one.
+        """
+        print(f"Fetching market caps for {self.base_date}...")
+        
+        rows = list(zip(self.tickers_df['ticker'], self.tickers_df['company_name']))
+        results = self.load_base_snapshot()
+        to_fetch = [(ticker, company) for ticker, company in rows if ticker not in results]
+        if results:
+            print(f"  Loaded {len(results)} tickers from base snapshot, fetching {len(to_fetch)}")
+        
+        # Closes around the base date in one batched download; tickers missing
+        # from it fall back to a per-ticker history request
+        base_window = None
+        if len(to_fetch) > 1:
+            base = pd.to_datetime(self.base_date)
+            base_window = self._download_prices(
+                [ticker for ticker, _ in to_fetch],
+                (base - timedelta(days=7)).strftime('%Y-%m-%d'),
+                (base + timedelta(days=7)).strftime('%Y-%m-%d')
+            )
+        
+        def window_for(ticker):
+            if base_window is None or ticker not in base_window.columns:
+                return None
+            closes = base_window[[ticker]].dropna()
+            return closes.rename(columns={ticker: 'Close'}) if not closes.empty else None
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self._fetch_base_market_cap, ticker, company, window_for(ticker)): ticker
+                for ticker, company in to_fetch
+            }
+            for future in as_completed(futures):
+                ticker = futures[future]
+                try:
+                    results[ticker] = future.result()
+                except Exception as e:
+                    print(f"  Error fetching data for {ticker}: {e}")
+                    results[ticker] = None
+        
+        successful_tickers = []
+        for ticker, _ in rows:
+            data = results.get(ticker)
+            if data is None:
+                continue
+            self.market_caps[ticker] = data
+            successful_tickers.append(ticker)
+            print(f"  ✓ {ticker}: ${data['market_cap']:,.0f}")
+        
+        print(f"Successfully retrieved market caps for {len(successful_tickers)} tickers")
+        return successful_tickers
+    
+    def _snapshot_key(self):
+        """Hash of the ticker list file contents and the base date"""
+        digest = hashlib.sha256()
+        with open(self.ticker_file, 'rb') as f:
+            digest.update(f.read())
+        digest.update(self.base_date.encode())
+        return digest.hexdigest()
+    
+    def _listing_hash(self, ticker, company):
+        """Hash of one ticker-list line (ticker and company name)"""
+        return hashlib.sha256(f"{ticker}\t{company}".encode()).hexdigest()[:12]
+    
+    def load_base_snapshot(self):
+        """
+        Load frozen base-date market caps from self.base_snapshot
+        
+        When the snapshot key (ticker list contents and base date) matches,
+        every ticker comes from disk and no network calls are needed. When the
+        ticker list changed, an entry is reused only if its ticker's line is
+        unchanged, so added tickers and edited lines (a new company name or
+        share class) are fetched and the rest are not. Market caps estimated
+        without shares outstanding are never saved, so they are fetched again;
+        entries from older snapshots holding the 1,000,000-share placeholder
+        are skipped for the same reason. Company names always come from the
+        current ticker list.
+        
+        Returns:
+            dict: Ticker -> market cap entry for tickers found in the snapshot
+        """
+        if not self.base_snapshot or not os.path.exists(self.base_snapshot):
+            return {}
+        
+        try:
+            with open(self.base_snapshot) as f:
+                snapshot = json.load(f)
+        except Exception as e:
+            print(f"  Warning: Could not read base snapshot {self.base_snapshot}: {e}")
+            return {}
+        
+        if snapshot.get('base_date') != self.base_date:
+            print("  Base snapshot is for a different base date, ignoring it")
+            return {}
+        
+        names = dict(zip(self.tickers_df['ticker'], self.tickers_df['company_name']))
+        unchanged = snapshot.get('key') == self._snapshot_key()
+        if not unchanged:
+            print("  Ticker list changed since base snapshot was taken, reusing unchanged lines")
+        return {
+            ticker: {
+                'market_cap': entry['market_cap'],
+                'price': entry['price'],
+                'date': pd.Timestamp(entry['date']),
+                'company_name': names[ticker],
+                'estimated': False
+            }
+            for ticker, entry in snapshot.get('tickers', {}).items()
+            if ticker in names and entry.get('shares_outstanding') not in (None, 1_000_000)
+            and (unchanged or entry.get('listing') == self._listing_hash(ticker, names[ticker]))
+        }
+    
+    def save_base_snapshot(self):
+        """
+        Persist base-date price, shares, market cap and weight per ticker
+        
+        Estimated market caps (no shares outstanding) are left out so a later
+        run fetches them again instead of freezing the placeholder.
+        """
+        if not self.base_snapshot:
+            return
+        
+        estimated = [ticker for ticker, data in self.market_caps.items() if data.get('estimated')]
+        if estimated:
+            print(f"  Not freezing estimated market caps: {', '.join(estimated)}")
+        snapshot = {
+            'base_date': self.base_date,
+            'ticker_file': os.path.basename(self.ticker_file),
+            'key': self._snapshot_key(),
+            'tickers': {
+                ticker: {
+                    'listing': self._listing_hash(ticker, data['company_name']),
+                    'price': float(data['price']),
+                    'shares_outstanding': float(data['market_cap'] / data['price']),
+                    'market_cap': float(data['market_cap']),
+                    'weight': float(self.weights[ticker]) if ticker in self.weights else None,
+                    'date': pd.Timestamp(data['date']).isoformat()
+                }
+                for ticker, data in self.market_caps.items()
+                if not data.get('estimated')
+            }
+        }
+        
+        snapshot_dir = os.path.dirname(self.base_snapshot)
+        if snapshot_dir:
+            os.makedirs(snapshot_dir, exist_ok=True)
+        with open(self.base_snapshot, 'w') as f:
+            json.dump(snapshot, f, indent=2)
+    
+    def calculate_weights(self):
+        """Calculate portfolio weights based on market capitalizations"""
+        print("Calculating portfolio weights...")
+        
+        # Calculate total market cap
+        total_market_cap = sum(data['market_cap'] for data in self.market_caps.values())
+        
+        # Calculate weights
+        for ticker, data in self.market_caps.items():
+            weight = data['market_cap'] / total_market_cap
+            self.weights[ticker] = weight
+            print(f"  {ticker}: {weight:.4f} ({weight*100:.2f}%)")
+        
+        print(f"Total portfolio weight: {sum(self.weights.values()):.4f}")
+        
+        # Freeze the base snapshot so later runs skip the network
+        self.save_base_snapshot()
+    
+    def _download_prices(self, tickers, start_date, end_date):
+        """
+        Download prices for tickers from the market data provider
+        
+        Universes larger than download_chunk_size are fetched in chunks
+        (see _download_chunked).
+        
+        Returns:
+            DataFrame: Adjusted (or plain) close prices, one column per ticker,
+            or None if nothing could be downloaded
+        """
+        tickers = list(tickers)
+        if self.download_chunk_size and len(tickers) > self.download_chunk_size:
+            return self._download_chunked(tickers, start_date, end_date)
+        try:
+            return self._call_provider(
+                lambda: self.provider.download_prices(tickers, start_date, end_date)
+            )
+        except Exception as e:
+            print(f"Error downloading data: {e}")
+            return None
+    
+    def _progress_file(self, chunk, start_date, end_date):
+        """On-disk copy of one downloaded chunk (None when there is no price cache)"""
+        if not self.price_cache:
+            return None
+        key = hashlib.sha256(','.join(chunk).encode()).hexdigest()[:12]
+        return os.path.join(
+            os.path.dirname(self.price_cache) or '.', 'download_progress',
+            f"{pd.Timestamp(start_date):%Y%m%d}_{pd.Timestamp(end_date):%Y%m%d}_{key}.csv"
+        )
+    
+    def _download_bisect(self, tickers, start_date, end_date):
+        """
+        Download tickers, splitting the request in half whenever it fails
+        
+        Isolates tickers that break a whole batch request in O(log n) calls.
+        
+        Returns:
+            list: DataFrames for the parts that downloaded
+        """
+        prices = self._download_prices(tickers, start_date, end_date)
+        if prices is not None:
+            return [prices]
+        if len(tickers) == 1:
+            return []
+        middle = len(tickers) // 2
+        return (self._download_bisect(tickers[:middle], start_date, end_date)
+                + self._download_bisect(tickers[middle:], start_date, end_date))
+    
+    def _download_chunked(self, tickers, start_date, end_date):
+        """
+        Download a large universe in chunks of download_chunk_size tickers
+        
+        Chunks run concurrently on max_workers threads through the shared
+        session rate limit and retries. Each finished chunk is written to a
+        download_progress directory next to the price cache, so a rerun after
+        an interruption only fetches the chunks still missing; the files are
+        removed once the panel is complete. Tickers missing from their chunk
+        (a failed chunk or an empty column) are retried, halving any request
+        that fails again. The panel is assembled with a single concatenation.
+        
+        Returns:
+            DataFrame: Prices, one column per ticker found, or None
+        """
+        size = self.download_chunk_size
+        chunks = [tickers[i:i + size] for i in range(0, len(tickers), size)]
+        progress = [self._progress_file(chunk, start_date, end_date) for chunk in chunks]
+        
+        frames = {}
+        for i, path in enumerate(progress):
+            if path and os.path.exists(path):
+                frames[i] = pd.read_csv(path, index_col='date', parse_dates=['date'])
+        pending = [i for i in range(len(chunks)) if i not in frames]
+        print(f"  Downloading {len(tickers)} tickers in {len(chunks)} chunks of up to {size}"
+              + (f" ({len(frames)} resumed from disk)" if frames else ""))
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(carry_phase(self._download_prices), chunks[i], start_date, end_date): i
+                for i in pending
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                prices = future.result()
+                if prices is None:
+                    print(f"  Warning: Chunk {i + 1}/{len(chunks)} failed")
+                    continue
+                frames[i] = prices
+                if progress[i]:
+                    os.makedirs(os.path.dirname(progress[i]), exist_ok=True)
+                    prices.to_csv(progress[i], index_label='date')
+        
+        # Partial failures: retry tickers with no prices, splitting failed requests
+        found = set()
+        for prices in frames.values():
+            found.update(prices.columns[prices.notna().any()])
+        missing = [t for t in tickers if t not in found]
+        retried = []
+        if missing and not frames:
+            # Every chunk failed: the provider is down, not a few bad tickers
+            print("  Warning: All chunks failed, not retrying")
+        elif missing:
+            print(f"  Retrying {len(missing)} tickers")
+            groups = [missing[i:i + size] for i in range(0, len(missing), size)]
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                bisect = carry_phase(lambda group: self._download_bisect(group, start_date, end_date))
+                for parts in executor.map(bisect, groups):
+                    retried.extend(parts)
+        
+        parts = [frames[i] for i in sorted(frames)] + retried
+        if not parts:
+            return None
+        prices = pd.concat(parts, axis=1)
+        # A retried ticker replaces its empty column from the chunk download
+        prices = prices.loc[:, ~prices.columns.duplicated(keep='last')]
+        prices = prices.reindex(columns=[t for t in tickers if t in prices.columns]).sort_index()
+        
+        # Keep the chunk files for a rerun until every ticker has been downloaded
+        if len(prices.columns) < len(tickers):
+            print(f"  Warning: {len(tickers) - len(prices.columns)} tickers could not be downloaded")
+        else:
+            for path in progress:
+                if path and os.path.exists(path):
+                    os.remove(path)
+            progress_dir = os.path.dirname(progress[0]) if progress[0] else None
+            if progress_dir and os.path.isdir(progress_dir) and not os.listdir(progress_dir):
+                os.rmdir(progress_dir)
+        return prices
+    
+    def _read_price_cache(self):
+        """Read the on-disk price cache, or return None if there isn't one"""
+        if not self.price_cache or not os.path.exists(self.price_cache):
+            return None
+        try:
+            cached = pd.read_csv(self.price_cache, index_col='date', parse_dates=['date'])
+            return cached.sort_index()
+        except Exception as e:
+            print(f"  Warning: Could not read price cache {self.price_cache}: {e}")
+            return None
+    
+    def _price_tolerance(self):
+        """Relative tolerance for comparing stored prices with fresh ones"""
+        # Prices read back from a rounded CSV only match to its precision
+        return max(1e-6, 10.0 ** (1 - self.csv_float_precision)) if self.csv_float_precision else 1e-6
+    
+    def _float_format(self):
+        """to_csv float_format for csv_float_precision (None writes full precision)"""
+        return f'%.{self.csv_float_precision}g' if self.csv_float_precision else None
+    
+    def _write_price_cache(self, prices, new_rows=None):
+        """
+        Write the price cache (date x ticker)
+        
+        Args:
+            prices (DataFrame): The whole cache
+            new_rows (DataFrame): Rows after the cached ones, in the cached
+                column order; when given they are appended instead of rewriting
+                the file, so a daily top-up only adds lines
+        """
+        if not self.price_cache:
+            return
+        cache_dir = os.path.dirname(self.price_cache)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        if new_rows is not None and os.path.exists(self.price_cache):
+            if not new_rows.empty:
+                new_rows.to_csv(self.price_cache, mode='a', header=False,
+                                date_format='%Y-%m-%d', float_format=self._float_format())
+            return
+        prices.sort_index().to_csv(self.price_cache, index_label='date',
+                                   date_format='%Y-%m-%d', float_format=self._float_format())
+    
+    def load_price_history(self, tickers, start_date, end_date):
+        """
+        Load daily prices, reading the local cache first
+        
+        A request covered by the background price download (see
+        start_network_phases) waits for it and is served from memory. Any
+        other request also waits for it first, so the two never race on the
+        cache file, and then reads the cache it wrote.
+        
+        Otherwise only bars after the last cached date are downloaded and
+        appended to the cache file. The last cached bar is downloaded again
+        and compared: tickers whose bar moved (a split or dividend re-adjusted
+        their history) get their full history again and the file is
+        rewritten; the other tickers are not downloaded again. Tickers that
+        are not in the cache yet also get their full history and the file is
+        rewritten. Set refresh_prices=True to ignore the cache and download
+        everything.
+        
+        Args:
+            tickers (list): Ticker symbols to load
+            start_date (str): First date needed (YYYY-MM-DD)
+            end_date (str): End date, exclusive (YYYY-MM-DD)
+        
+        Returns:
+            DataFrame: Prices for start_date..end_date, one column per ticker
+        """
+        background = self._background.get('prices')
+        if background:
+            # Join even when not served from it (e.g. the date changed since it
+            # started): it may still be writing the price cache
+            prices = background['future'].result()
+            covered = (set(tickers) <= set(background['tickers'])
+                       and pd.to_datetime(start_date) >= pd.to_datetime(background['start_date'])
+                       and end_date == background['end_date'])
+            if covered and prices is not None:
+                columns = [t for t in tickers if t in prices.columns]
+                return prices.loc[pd.to_datetime(start_date):, columns]
+        return self._load_price_history(tickers, start_date, end_date)
+    
+    def _load_price_history(self, tickers, start_date, end_date):
+        """load_price_history without the background download"""
+        start = pd.to_datetime(start_date)
+        end = pd.to_datetime(end_date)
+        
+        cached = None if self.refresh_prices else self._read_price_cache()
+        if cached is not None and (cached.empty or cached.index[0] > start):
+            print("  Price cache does not reach back to start date, rebuilding")
+            cached = None
+        
+        if cached is None:
+            print(f"  Downloading full price history for {len(tickers)} tickers")
+            prices = self._download_prices(tickers, start_date, end_date)
+            if prices is None:
+                return None
+            self._write_price_cache(prices)
+            return prices.loc[start:end - timedelta(days=1), list(prices.columns)]
+        
+        cached_tickers = [t for t in tickers if t in cached.columns]
+        new_tickers = [t for t in tickers if t not in cached.columns]
+        last_cached = cached.index[-1]
+        appended = cached.iloc[:0]
+        readjusted = False
+        
+        if cached_tickers and last_cached + timedelta(days=1) < end:
+            print(f"  Price cache ends {last_cached.date()}, topping up")
+            top_up = self._download_prices(cached_tickers, last_cached.strftime('%Y-%m-%d'), end_date)
+            if top_up is not None and last_cached in top_up.index:
+                old_bar = cached.loc[last_cached, cached_tickers].to_numpy(dtype=float)
+                new_bar = top_up.loc[last_cached, cached_tickers].to_numpy(dtype=float)
+                moved = [t for t, same in zip(cached_tickers, np.isclose(
+                    old_bar, new_bar, rtol=self._price_tolerance(), equal_nan=True)) if not same]
+                if moved:
+                    print(f"  Adjusted prices changed for {', '.join(moved)}, re-downloading their history")
+                    history = self._download_prices(moved, cached.index[0].strftime('%Y-%m-%d'), end_date)
+                    if history is None:
+                        print("  Could not re-download them, rebuilding price cache")
+                        self.refresh_prices = True
+                        try:
+                            return self._load_price_history(tickers, start_date, end_date)
+                        finally:
+                            self.refresh_prices = False
+                    cached[moved] = history.reindex(index=cached.index, columns=moved)
+                    readjusted = True
+            if top_up is not None:
+                appended = top_up.loc[top_up.index > last_cached].reindex(columns=cached.columns)
+                cached = pd.concat([cached, appended])
+        
+        added = None
+        if new_tickers:
+            print(f"  Downloading full history for new tickers: {', '.join(new_tickers)}")
+            added = self._download_prices(new_tickers, start_date, end_date)
+            if added is not None:
+                cached = cached.join(added.reindex(columns=new_tickers), how='outer')
+        
+        if added is None and not readjusted:
+            self._write_price_cache(cached, new_rows=appended)
+        else:
+            cached = cached[~cached.index.duplicated(keep='last')]
+            self._write_price_cache(cached)
+        
+        columns = [t for t in tickers if t in cached.columns]
+        return cached.loc[start:end - timedelta(days=1), columns]
+    
+    def _incremental_history_start(self):
+        """
+        First day of price history strategies and rebalancing need for new rows
+        
+        That is the longest strategy lookback (see strategies.history_needed)
+        before the last stored day, or before the earliest last rebalance of
+        the resumed schedules, plus the screening lookback. Falls back to the
+        base date when a strategy has no bounded lookback or the state file
+        carries no rebalancing totals to resume from.
+        
+        Returns:
+            str: Start date (YYYY-MM-DD)
+        """
+        names = set(self.strategies)
+        if self.rebalance_schedules:
+            names.update(self.rebalance_targets)
+            if not self.rebalance_totals:
+                return self.base_date
+        needed = history_needed(names)
+        if needed is None:
+            return self.base_date
+        
+        anchors = [pd.to_datetime(self.portfolio_data['date'].iloc[self.rows_on_disk - 1])]
+        if self.rebalance_schedules:
+            anchors += [pd.Timestamp(t['last_rebalance']) for t in self.rebalance_totals.values()
+                        if t['last_rebalance']]
+        start = min(anchors) - pd.tseries.offsets.BDay(needed + lookback_rows() + 5)
+        return max(start, pd.Timestamp(self.base_date)).strftime('%Y-%m-%d')
+    
+    def fetch_portfolio_data(self, start_date=None, end_date=None):
+        """
+        Fetch historical price data for all stocks and calculate portfolio returns
+        
+        Args:
+            start_date (str): Start date for data (YYYY-MM-DD)
+            end_date (str): End date for data (YYYY-MM-DD)
+        """
+        full_history = start_date is None
+        if start_date is None:
+            start_date = self.base_date
+        if end_date is None:
+            end_date = datetime.now().strftime('%Y-%m-%d')
+        
+        print(f"Fetching portfolio data from {start_date} to {end_date}...")
+        
+        tickers_list = list(self.weights.keys())
+        
+        # Add SPY for S&P 500 comparison
+        all_tickers = tickers_list + ['SPY']
+        
+        self.rows_on_disk = 0
+        self.attribution_on_disk = None
+        if self.incremental and full_history and self.update_portfolio_data(end_date):
+            if self.strategies or self.rebalance_schedules:
+                # Only the lookback the new rows need (trailing volatility,
+                # drift since each schedule's last rebalance)
+                history = self.load_price_history(all_tickers, self._incremental_history_start(), end_date)
+                self.compute_strategies(history)
+                self.compute_rebalancing(history)
+            self.compute_risk_analytics()
+            self.compute_attribution()
+            self.check_ticker_changes()
+            return
+        self.price_adjustments = {}
+        self.rebalance_totals = None
+        
+        # Read cached prices and download only what is missing
+        prices = self.load_price_history(all_tickers, start_date, end_date)
+        if prices is None or prices.empty:
+            print("Error: No price data available")
+            return
+        
+        # Screen the panel and calculate daily returns
+        prices, returns = self.screen_data_quality(prices)
+        
+        # Calculate original portfolio daily returns (fixed weights from base date)
+        portfolio_returns = fixed_weight_returns(returns, self.weights)
+        
+        # Calculate daily market cap weighted portfolio ("New AI Information")
+        # This portfolio rebalances daily based on previous day's market caps
+        daily_weighted_returns, self.daily_weights = market_cap_weighted_returns(
+            prices, returns, self.weights, self.market_caps
+        )
+        
+        # Calculate S&P 500 returns
+        spy_returns = returns['SPY'] if 'SPY' in returns.columns else pd.Series(index=returns.index)
+        
+        # Create comprehensive dataset
+        self.portfolio_data = self._build_portfolio_frame(
+            prices, returns, portfolio_returns, daily_weighted_returns, spy_returns
+        )
+        
+        print(f"Portfolio data calculated for {len(self.portfolio_data)} trading days "
+              f"({self.memory_footprint_mb():.1f} MB, {self.price_dtype} ticker columns)")
+        self._record_last_close(prices)
+        
+        # Extra weighting strategies from the same price matrix
+        self.compute_strategies(prices)
+        
+        # Target weights held on other rebalancing schedules
+        self.compute_rebalancing(prices)
+        
+        # Rolling volatility, beta, Sharpe etc. as extra columns
+        self.compute_risk_analytics()
+        
+        # Which tickers drove each day's move
+        self.compute_attribution()
+        
+        # Check for ticker changes (simplified check)
+        self.check_ticker_changes()
+    
+    def _build_portfolio_frame(self, prices, returns, portfolio_returns, daily_weighted_returns,
+                               spy_returns, start_values=(1.0, 1.0, 1.0)):
+        """
+        Assemble dataset rows from daily returns
+        
+        Args:
+            start_values (tuple): Cumulative values (fixed, daily weighted, SPY)
+                the first row compounds from; 1.0 for a fresh series
+        """
+        tickers_list = list(self.weights.keys())
+        portfolio_start, daily_weighted_start, spy_start = start_values
+        
+        # Calculate cumulative returns, continuing from the starting values
+        portfolio_cumulative = portfolio_start * (1 + portfolio_returns).cumprod()
+        daily_weighted_cumulative = daily_weighted_start * (1 + daily_weighted_returns).cumprod()
+        spy_cumulative = spy_start * (1 + spy_returns).cumprod()
+        
+        portfolio_data = pd.DataFrame({
+            'date': portfolio_returns.index,
+            'daily_return': portfolio_returns.values,
+            'cumulative_return': portfolio_cumulative.values,
+            'portfolio_value': portfolio_cumulative.values * 100,  # Starting at $100
+            'daily_weighted_return': daily_weighted_returns.values,
+            'daily_weighted_cumulative': daily_weighted_cumulative.values,
+            'daily_weighted_value': daily_weighted_cumulative.values * 100,  # Starting at $100
+            'spy_daily_return': spy_returns.values,
+            'spy_cumulative_return': spy_cumulative.values,
+            'spy_value': spy_cumulative.values * 100  # Starting at $100
+        })
+        
+        # Add individual stock data for analysis - align with portfolio_returns index.
+        # Prices and returns are interleaved ({ticker}_price, {ticker}_return) in
+        # one block allocated once, instead of inserting two columns per ticker
+        tickers_present = [t for t in tickers_list if t in prices.columns]
+        block = np.empty((len(portfolio_returns.index), 2 * len(tickers_present)), dtype=self.price_dtype)
+        block[:, 0::2] = prices.reindex(index=portfolio_returns.index, columns=tickers_present).to_numpy()
+        block[:, 1::2] = returns.reindex(index=portfolio_returns.index, columns=tickers_present).to_numpy()
+        ticker_columns = [f'{t}_{field}' for t in tickers_present for field in ('price', 'return')]
+        
+        return pd.concat([portfolio_data, pd.DataFrame(block, columns=ticker_columns, copy=False)], axis=1)
+    
+    def screen_data_quality(self, prices, since=None):
+        """
+        Data-quality stage between download and aggregation
+        
+        Flags gaps, stale prices, split-like jumps and bad prints and masks
+        them per ticker and day (see data_quality.screen_prices), so one bad
+        ticker never removes a date from the portfolio. The summary is kept in
+        self.quality_report and saved with the dataset; this run's totals
+        are kept in self.quality_flags.
+        
+        Args:
+            prices (DataFrame): Downloaded prices, one column per ticker
+            since (Timestamp): Last stored day of an incremental update. Rows
+                up to it are lookback context: they are screened but not
+                reported, and the new days' report is merged into the stored one
+        
+        Returns:
+            tuple: (prices with bad prints masked, daily returns)
+        """
+        if not self.quality_checks:
+            return prices, prices.pct_change().dropna()
+        
+        screened = screen_prices(prices)
+        report = quality_report(screened, since=since)
+        totals = self.quality_flags = report['totals']
+        previous = self._load_quality_report() if since is not None else None
+        self.quality_report = merge_reports(previous, report) if previous else report
+        if any(totals.values()):
+            print("  Data quality: " + ', '.join(f"{count} {flag}" for flag, count in totals.items() if count)
+                  + f" across {len(report['by_ticker'])} tickers")
+        else:
+            print("  Data quality: no issues flagged")
+        return screened['prices'], screened['returns'].dropna(how='all')
+    
+    def _load_quality_report(self):
+        """The data-quality report saved with the existing dataset, or None"""
+        filename = self.dataset_file.replace('.csv', '_quality.json')
+        if not os.path.exists(filename):
+            return None
+        try:
+            with open(filename) as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"  Warning: Could not read data-quality report {filename}: {e}")
+            return None
+    
+    def _record_last_close(self, prices):
+        """Keep each ticker's (and SPY's) close on the dataset's last day for the live baseline"""
+        last_date = pd.to_datetime(self.portfolio_data['date'].iloc[-1])
+        self.last_close = prices.loc[:last_date].ffill().iloc[-1]
+    
+    def memory_footprint_mb(self):
+        """In-memory size of portfolio_data in MB"""
+        if self.portfolio_data is None:
+            return 0.0
+        return self.portfolio_data.memory_usage(deep=True).sum() / (1024 * 1024)
+    
+    def _fill_new_rows(self, columns):
+        """
+        Write derived columns into portfolio_data, adding any that are missing
+        
+        Only rows after rows_on_disk are filled, so after an incremental update
+        the rows already saved keep their stored values.
+        
+        Args:
+            columns (DataFrame): Values for every row of portfolio_data
+        """
+        data = self.portfolio_data
+        missing = [c for c in columns.columns if c not in data.columns]
+        if missing:
+            data = self.portfolio_data = pd.concat(
+                [data, pd.DataFrame(np.nan, index=data.index, columns=missing)], axis=1
+            )
+        positions = [data.columns.get_loc(c) for c in columns.columns]
+        data.iloc[self.rows_on_disk:, positions] = columns.to_numpy(dtype=float)[self.rows_on_disk:]
+    
+    def compute_strategies(self, prices):
+        """
+        Evaluate the extra weighting strategies and add their columns
+        
+        All strategies are scored against one shared return matrix (see
+        strategies.run_strategies), adding strategy_{name}_return and
+        strategy_{name}_value (starting at $100) for each.
+        
+        Args:
+            prices (DataFrame): Price history from the base date, or from the
+                lookback before the new rows of an incremental update
+        """
+        if not self.strategies or self.portfolio_data is None:
+            return
+        if prices is None or prices.empty:
+            print("  Warning: No price history for strategies")
+            return
+        
+        prices, returns, shares = self._strategy_inputs(prices)
+        strategy_returns = run_strategies(prices, returns, self.weights, shares, self.strategies)
+        strategy_returns = strategy_returns.reindex(pd.to_datetime(self.portfolio_data['date']))
+        
+        columns = {}
+        for name in self.strategies:
+            daily = strategy_returns[name].to_numpy()
+            columns[f'strategy_{name}_return'] = daily
+            columns[f'strategy_{name}_value'] = self._compound(daily, f'strategy_{name}_value')
+        self._fill_new_rows(pd.DataFrame(columns))
+        
+        print(f"Strategies evaluated: {', '.join(self.strategies)}")
+    
+    def _compound(self, daily, value_column):
+        """
+        Value series of daily returns starting at $100
+        
+        After an incremental update the new rows compound from the last stored
+        value, so the rows on disk (and the history before them) are not needed.
+        
+        Args:
+            daily (ndarray): Daily returns for every row of portfolio_data
+            value_column (str): Column holding the stored values
+        
+        Returns:
+            ndarray: Values for every row (only rows after rows_on_disk are used)
+        """
+        if not self.rows_on_disk:
+            return np.cumprod(1 + daily) * 100  # Starting at $100
+        values = np.full(len(daily), np.nan)
+        start = self.portfolio_data[value_column].iloc[self.rows_on_disk - 1]
+        values[self.rows_on_disk:] = start * np.cumprod(1 + daily[self.rows_on_disk:])
+        return values
+    
+    def _strategy_inputs(self, prices):
+        """
+        Screened prices, daily returns and base-date shares for strategy scoring
+        
+        Args:
+            prices (DataFrame): Price history to score
+        
+        Returns:
+            tuple: (prices, returns, dict of ticker -> shares outstanding)
+        """
+        shares = {
+            t: self.market_caps[t]['market_cap'] / self.market_caps[t]['price'] if t in self.market_caps else 1_000_000
+            for t in self.weights
+        }
+        if self.quality_checks:
+            screened = screen_prices(prices)
+            return screened['prices'], screened['returns'].dropna(how='all'), shares
+        return prices, prices.pct_change().dropna(), shares
+    
+    def compute_rebalancing(self, prices):
+        """
+        Hold each rebalance target on each rebalancing schedule and add its columns
+        
+        Weights drift with prices between rebalances and every rebalance pays
+        rebalance_cost_bps on its turnover (see rebalancing.run_rebalancing).
+        Adds rebalance_{target}_{schedule}_return (after costs), _value
+        (starting at $100) and _turnover for each pair; totals per pair are
+        kept in self.rebalance_summary.
+        
+        After an incremental update each pair resumes from its last rebalance
+        recorded in self.rebalance_totals, and the totals of the new rows are
+        merged into the stored ones.
+        
+        Args:
+            prices (DataFrame): Price history from the base date, or from the
+                lookback before the earliest last rebalance
+        """
+        if not self.rebalance_schedules or self.portfolio_data is None:
+            return
+        if prices is None or prices.empty:
+            print("  Warning: No price history for rebalancing")
+            return
+        
+        prices, returns, shares = self._strategy_inputs(prices)
+        dates = pd.to_datetime(self.portfolio_data['date'])
+        resume = None
+        if self.rows_on_disk and self.rebalance_totals:
+            resume = {name: totals['last_rebalance'] for name, totals in self.rebalance_totals.items()}
+            if not all(pd.Timestamp(date) in returns.index for date in resume.values() if date):
+                print("  Warning: Last rebalances are outside the price history, rebalancing from its start")
+                resume = None
+        results, summary = run_rebalancing(
+            prices, returns, self.weights, shares, self.rebalance_targets,
+            self.rebalance_schedules, self.rebalance_cost_bps, last_rebalance=resume
+        )
+        
+        if resume is None:
+            self.rebalance_totals = {name: schedule_totals(results, name) for name in summary}
+        else:
+            new_rows = results.index > dates.iloc[self.rows_on_disk - 1]
+            self.rebalance_totals = {
+                name: merge_totals(self.rebalance_totals[name], schedule_totals(results, name, new_rows))
+                for name in summary
+            }
+        self.rebalance_summary = {name: summarize_totals(t) for name, t in self.rebalance_totals.items()}
+        results = results.reindex(dates)
+        
+        columns = {}
+        for name in self.rebalance_summary:
+            daily = results[f'{name}_return'].to_numpy()
+            columns[f'rebalance_{name}_return'] = daily
+            columns[f'rebalance_{name}_value'] = self._compound(daily, f'rebalance_{name}_value')
+            columns[f'rebalance_{name}_turnover'] = results[f'{name}_turnover'].to_numpy()
+        self._fill_new_rows(pd.DataFrame(columns))
+        
+        print(f"Rebalancing evaluated: {', '.join(self.rebalance_targets)} on "
+              f"{', '.join(self.rebalance_schedules)} ({self.rebalance_cost_bps:g} bps costs)")
+    
+    def compute_risk_analytics(self):
+        """
+        Add rolling risk columns to portfolio_data
+        
+        For the fixed-weight ('portfolio'), daily-weighted and SPY series this
+        adds running drawdown and maximum drawdown plus, for each window in
+        risk_windows, annualized volatility, beta and correlation against SPY,
+        Sharpe and Sortino ratio (see risk_analytics.rolling_risk). Constituent
+        tickers are computed in the same pass when risk_constituents is set;
+        their latest values are kept in self.constituent_risk.
+        
+        After an incremental update only the new rows are filled in; rows
+        already on disk keep their stored values.
+        """
+        if not self.risk_windows or self.portfolio_data is None:
+            return
+        
+        data = self.portfolio_data
+        returns = pd.DataFrame({
+            'portfolio': data['daily_return'],
+            'daily_weighted': data['daily_weighted_return']
+        })
+        tickers = [t for t in self.weights if f'{t}_return' in data.columns]
+        if self.risk_constituents:
+            constituent_returns = data[[f'{t}_return' for t in tickers]]
+            constituent_returns.columns = tickers
+            returns = pd.concat([returns, constituent_returns], axis=1)
+        
+        risk = pd.concat([
+            rolling_risk(returns, data['spy_daily_return'], self.risk_windows),
+            rolling_risk(data[['spy_daily_return']].set_axis(['spy'], axis=1), None, self.risk_windows)
+        ], axis=1)
+        
+        series_columns = [c for c in risk.columns if c.startswith(('portfolio_', 'daily_weighted_', 'spy_'))]
+        self._fill_new_rows(risk[series_columns].reset_index(drop=True))
+        
+        if self.risk_constituents:
+            self.constituent_risk = latest_snapshot(risk, tickers)
+            self.constituent_risk.index.name = 'ticker'
+        
+        print(f"Risk analytics: {len(series_columns)} columns for windows "
+              f"{', '.join(f'{w}d' for w in self.risk_windows)}"
+              + (f", {len(tickers)} constituents" if self.risk_constituents else ""))
+    
+    def compute_attribution(self):
+        """
+        Per-ticker contributions to the fixed and daily-weighted portfolios
+        
+        Each day's weight x return matrix, its compounded running total and
+        the top contributors per day (see attribution.attribution_tables).
+        Everything is rebuilt from the stored {ticker}_price and _return
+        columns, so an incremental run covers the whole history without
+        extra state. Results are kept in self.attribution_matrix and
+        self.top_contributors and saved by save_dataset.
+        """
+        if not self.attribution or self.portfolio_data is None:
+            return
+        
+        data = self.portfolio_data
+        tickers = list(self.weights.keys())
+        dates = pd.to_datetime(data['date'])
+        prices = data.reindex(columns=[f'{t}_price' for t in tickers]).set_axis(tickers, axis=1).set_index(dates)
+        returns = data.reindex(columns=[f'{t}_return' for t in tickers]).set_axis(tickers, axis=1).set_index(dates)
+        
+        # Daily weights from the previous stored prices, as in the portfolio itself
+        _, daily_weights = market_cap_weighted_returns(prices, returns, self.weights, self.market_caps)
+        
+        self.attribution_matrix, self.top_contributors = attribution_tables(dates, tickers, returns.to_numpy(), {
+            'fixed': (np.array([self.weights[t] for t in tickers]), data['daily_return'].to_numpy()),
+            'daily_weighted': (daily_weights.to_numpy(), data['daily_weighted_return'].to_numpy())
+        })
+        
+        last_date, last_top = list(self.top_contributors.items())[-1]
+        print(f"Attribution: {len(tickers)} tickers x {len(dates)} days; top movers {last_date}: "
+              + ', '.join(f"{ticker} {value:+.2%}" for ticker, value in last_top['fixed'][:3]))
+    
+    def _state_filename(self, filename):
+        """Sidecar file describing how a dataset was built"""
+        return filename.replace('.csv', '_state.json')
+    
+    def _dataset_path(self, filename):
+        """The CSV itself, or its partition directory for partitioned layouts"""
+        return filename if self.dataset_layout == 'single' else filename.replace('.csv', '')
+    
+    def _last_stored_row(self, state, dataset_path):
+        """
+        The dataset's last row: date, cumulative values and ticker prices
         
-        successful_tickers = []
+        Read from the state file written by save_dataset. States written
+        before it carried the row fall back to the dataset itself, reading
+        only the last partition of a partitioned layout.
         
-        for idx, row in self.tickers_df.iterrows():
-            ticker = row['ticker']
-            company = row['company_name']
-            
-            try:
-                # Get stock info
-                stock = yf.Ticker(ticker)
-                
-                # Get historical data around base date
-                start_date = pd.to_datetime(self.base_date) - timedelta(days=7)
-                end_date = pd.to_datetime(self.base_date) + timedelta(days=7)
-                
-                hist_data = stock.history(start=start_date, end=end_date)
-                
-                if hist_data.empty:
-                    print(f"  Warning: No data for {ticker} ({company})")
-                    continue
-                
-                # Find the closest date to our base date
-                target_date = pd.to_datetime(self.base_date)
-                
-                # Handle timezone-aware index
-                if hist_data.index.tz is not None:
-                    # If historical data has timezone, localize target_date
-                    target_date = target_date.tz_localize(hist_data.index.tz)
-                elif target_date.tz is not None:
-                    # If target_date has timezone but hist_data doesn't, remove timezone
-                    target_date = target_date.tz_localize(None)
-                
-                closest_date = hist_data.index[hist_data.index.get_indexer([target_date], method='nearest')[0]]
-                
-                # Get shares outstanding (use info or approximate from market cap)
-                try:
-                    info = stock.info
-                    shares_outstanding = info.get('sharesOutstanding')
-                    if shares_outstanding is None:
-                        shares_outstanding = info.get('impliedSharesOutstanding')
-                except:
-                    shares_outstanding = None
-                
-                # Calculate market cap
-                close_price = hist_data.loc[closest_date, 'Close']
-                
-                if shares_outstanding:
-                    market_cap = close_price * shares_outstanding
-                else:
-                    # Use a default approximation if shares outstanding not available
-                    # This is a fallback - in practice, you'd want actual shares outstanding
-                    market_cap = close_price * 1_000_000  # Placeholder
-                    print(f"  Warning: Using estimated market cap for {ticker}")
-                
-                self.market_caps[ticker] = {
-                    'market_cap': market_cap,
-                    'price': close_price,
-                    'date': closest_date,
-                    'company_name': company
-                }
-                
-                successful_tickers.append(ticker)
-                print(f"  ✓ {ticker}: ${market_cap:,.0f}")
-                
-            except Exception as e:
-                print(f"  Error fetching data for {ticker}: {e}")
-                continue
+        Returns:
+            Series: Last row, or None if the dataset is empty
+        """
+        if 'last_row' in state:
+            row = dict(state['last_row'])
+            row['date'] = pd.to_datetime(row['date'])
+            row.update({f'{t}_price': np.nan if p is None else p for t, p in state['last_prices'].items()})
+            return pd.Series(row, dtype=object)
         
-        print(f"Successfully retrieved market caps for {len(successful_tickers)} tickers")
-        return successful_tickers
+        if self.dataset_layout == 'single':
+            stored = pd.read_csv(dataset_path, parse_dates=['date'])
+        else:
+            with open(os.path.join(dataset_path, 'manifest.json')) as f:
+                partitions = json.load(f)['partitions']
+            if not partitions:
+                return None
+            stored = load_partitioned_dataset(dataset_path, start_date=partitions[-1]['start'])
+        return None if stored.empty else stored.iloc[-1]
     
-    def calculate_weights(self):
-        """Calculate portfolio weights based on market capitalizations"""
-        print("Calculating portfolio weights...")
+    def _adjustment_factor(self, ticker, date):
+        """
+        Factor taking a stored price of ticker on date to today's adjusted history
         
-        # Calculate total market cap
-        total_market_cap = sum(data['market_cap'] for data in self.market_caps.values())
+        Each re-adjustment found by an incremental update is recorded in
+        self.price_adjustments (and the state file) as a factor for the stored
+        rows up to and including its 'through' date.
         
-        # Calculate weights
-        for ticker, data in self.market_caps.items():
-            weight = data['market_cap'] / total_market_cap
-            self.weights[ticker] = weight
-            print(f"  {ticker}: {weight:.4f} ({weight*100:.2f}%)")
+        Args:
+            ticker (str): Ticker symbol
+            date (Timestamp): Date of the stored row
         
-        print(f"Total portfolio weight: {sum(self.weights.values()):.4f}")
+        Returns:
+            float: Product of the factors that apply to that row
+        """
+        factor = 1.0
+        for adjustment in self.price_adjustments.get(ticker, []):
+            if date <= pd.Timestamp(adjustment['through']):
+                factor *= adjustment['factor']
+        return factor
     
-    def fetch_portfolio_data(self, start_date=None, end_date=None):
+    def update_portfolio_data(self, end_date):
         """
-        Fetch historical price data for all stocks and calculate portfolio returns
+        Extend the existing dataset with trading days after its last row
+        
+        Cumulative values, previous-day prices and daily weights are carried
+        over from the last stored row, so only new days are computed. That row
+        is read from the state file (see _last_stored_row), so checking and
+        computing an update does not parse the stored history. The dataset is
+        only extended if it was built from the same base date and ticker list;
+        otherwise the caller should rebuild from scratch. The stored rows are
+        read once the update is known to apply, for the stages that use the
+        whole history.
+        
+        Stored rows are never rewritten. When a split or dividend re-adjusts a
+        ticker's history, its stored prices keep the adjustment they were
+        written with and the factor to today's adjustment is recorded in the
+        state file instead (see _adjustment_factor); new rows continue from the
+        re-adjusted prices.
         
         Args:
-            start_date (str): Start date for data (YYYY-MM-DD)
             end_date (str): End date for data (YYYY-MM-DD)
-        """
-        if start_date is None:
-            start_date = self.base_date
-        if end_date is None:
-            end_date = datetime.now().strftime('%Y-%m-%d')
-            
-        print(f"Fetching portfolio data from {start_date} to {end_date}...")
         
+        Returns:
+            bool: True if self.portfolio_data was updated incrementally
+        """
         tickers_list = list(self.weights.keys())
+        state_file = self._state_filename(self.dataset_file)
+        dataset_path = self._dataset_path(self.dataset_file)
         
-        # Add SPY for S&P 500 comparison
-        all_tickers = tickers_list + ['SPY']
+        if not (os.path.exists(dataset_path) and os.path.exists(state_file)):
+            print("  No previous dataset state found, running full rebuild")
+            return False
         
-        # Download all data at once
-        try:
-            data = yf.download(all_tickers, start=start_date, end=end_date, progress=False)
-            
-            if data.empty:
-                print("Error: No data downloaded")
-                return
-            
-            # Handle different data structures based on number of tickers
-            if len(all_tickers) == 1:
-                # Single ticker case - data is a simple DataFrame
-                if 'Adj Close' in data.columns:
-                    prices = data['Adj Close'].to_frame()
-                    prices.columns = all_tickers
-                else:
-                    prices = data[['Close']].rename(columns={'Close': all_tickers[0]})
-            else:
-                # Multiple tickers case - data has MultiIndex columns
-                if isinstance(data.columns, pd.MultiIndex):
-                    if 'Adj Close' in data.columns.get_level_values(0):
-                        prices = data['Adj Close']
-                    else:
-                        prices = data['Close']
-                else:
-                    # Fallback if structure is unexpected
-                    print("Warning: Unexpected data structure, using Close prices")
-                    prices = data
-            
-            # Ensure we have valid price data
-            if prices.empty:
-                print("Error: No price data available")
-                return
-                
-        except Exception as e:
-            print(f"Error downloading data: {e}")
-            return
+        with open(state_file) as f:
+            state = json.load(f)
+        if state.get('base_date') != self.base_date or state.get('tickers') != tickers_list:
+            print("  Ticker list or base date changed, running full rebuild")
+            return False
+        if state.get('csv_float_precision') != self.csv_float_precision:
+            print("  CSV precision changed, running full rebuild")
+            return False
+        if state.get('dataset_layout', 'single') != self.dataset_layout:
+            print("  Dataset layout changed, running full rebuild")
+            return False
+        if state.get('risk_windows', []) != list(self.risk_windows):
+            print("  Risk windows changed, running full rebuild")
+            return False
+        if state.get('strategies', []) != list(self.strategies):
+            print("  Strategies changed, running full rebuild")
+            return False
+        if state.get('rebalance_schedules', []) != list(self.rebalance_schedules) or (
+                self.rebalance_schedules
+                and (state.get('rebalance_targets') != list(self.rebalance_targets)
+                     or state.get('rebalance_cost_bps') != self.rebalance_cost_bps)):
+            print("  Rebalancing settings changed, running full rebuild")
+            return False
+        if state.get('price_dtype', 'float64') != str(self.price_dtype):
+            print("  Price dtype changed, running full rebuild")
+            return False
+        if state.get('quality_checks', False) != self.quality_checks:
+            print("  Data-quality screening changed, running full rebuild")
+            return False
         
-        # Calculate daily returns
-        returns = prices.pct_change().dropna()
+        last_row = self._last_stored_row(state, dataset_path)
+        if last_row is None:
+            return False
+        last_date = last_row['date']
         
-        # Calculate original portfolio daily returns (fixed weights from base date)
-        portfolio_returns = pd.Series(index=returns.index, dtype=float)
+        # Screening needs a few stored days before the new ones for context
+        # (stale runs, spike reversals); the extra business days cover holidays
+        start = last_date - pd.tseries.offsets.BDay(lookback_rows() + 5) if self.quality_checks else last_date
+        prices = self.load_price_history(tickers_list + ['SPY'], start.strftime('%Y-%m-%d'), end_date)
+        if prices is None or last_date not in prices.index:
+            print("  Price history does not cover the last stored day, running full rebuild")
+            return False
         
-        for date in returns.index:
-            daily_return = 0
-            for ticker in tickers_list:
-                if ticker in returns.columns and not pd.isna(returns.loc[date, ticker]):
-                    daily_return += self.weights[ticker] * returns.loc[date, ticker]
-            portfolio_returns[date] = daily_return
+        # A re-adjusted history moves the last stored prices by one factor per ticker
+        self.price_adjustments = {t: list(a) for t, a in state.get('price_adjustments', {}).items()}
+        price_tickers = [t for t in tickers_list if f'{t}_price' in last_row.index]
+        stored = np.array([float(last_row[f'{t}_price']) * self._adjustment_factor(t, last_date)
+                           for t in price_tickers])
+        current = prices.loc[last_date, price_tickers].to_numpy(dtype=float)
+        unchanged = np.isclose(stored, current, rtol=self._price_tolerance(), equal_nan=True)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            factors = current / stored
+        if not np.isfinite(factors[~unchanged]).all():
+            print("  Stored prices no longer match the price history, running full rebuild")
+            return False
+        adjusted = [t for t, same in zip(price_tickers, unchanged) if not same]
+        for t, factor in zip(adjusted, factors[~unchanged]):
+            self.price_adjustments.setdefault(t, []).append(
+                {'through': last_date.strftime('%Y-%m-%d'), 'factor': float(factor)})
+        if adjusted:
+            print(f"  Adjusted history changed for {', '.join(adjusted)}, recording the factor "
+                  f"(stored rows are kept)")
         
-        # Calculate cumulative returns for original portfolio
-        portfolio_cumulative = (1 + portfolio_returns).cumprod()
+        # Screen with the lookback, then keep daily returns for the new days only
+        prices, returns = self.screen_data_quality(prices, since=last_date)
+        prices, returns = prices.loc[last_date:], returns.loc[returns.index > last_date]
         
-        # Calculate daily market cap weighted portfolio ("New AI Information")
-        # This portfolio rebalances daily based on previous day's market caps
-        daily_weighted_returns = pd.Series(index=returns.index, dtype=float)
-        daily_weighted_cumulative = pd.Series(index=returns.index, dtype=float)
+        portfolio_returns = fixed_weight_returns(returns, self.weights)
+        daily_weighted_returns, self.daily_weights = market_cap_weighted_returns(
+            prices, returns, self.weights, self.market_caps, prev_prices=prices.loc[last_date]
+        )
+        spy_returns = returns['SPY'] if 'SPY' in returns.columns else pd.Series(index=returns.index)
         
-        # Initialize daily weights dictionary
-        daily_weights = {}
+        new_rows = self._build_portfolio_frame(
+            prices, returns, portfolio_returns, daily_weighted_returns, spy_returns,
+            start_values=(last_row['cumulative_return'],
+                          last_row['daily_weighted_cumulative'],
+                          last_row['spy_cumulative_return'])
+        )
         
-        for i, date in enumerate(returns.index):
-            if i == 0:
-                # First day: use base date weights
-                current_weights = self.weights.copy()
-            else:
-                # Calculate market caps from previous day's prices
-                prev_date = returns.index[i-1]
-                total_market_cap = 0
-                ticker_market_caps = {}
-                
-                for ticker in tickers_list:
-                    if ticker in prices.columns and not pd.isna(prices.loc[prev_date, ticker]):
-                        # Use previous day's price and base shares outstanding for market cap
-                        prev_price = prices.loc[prev_date, ticker]
-                        if ticker in self.market_caps:
-                            base_price = self.market_caps[ticker]['price']
-                            base_market_cap = self.market_caps[ticker]['market_cap']
-                            # Estimate shares outstanding from base data
-                            shares_outstanding = base_market_cap / base_price
-                            current_market_cap = prev_price * shares_outstanding
-                        else:
-                            # Fallback if ticker not in original market caps
-                            current_market_cap = prev_price * 1_000_000
-                        
-                        ticker_market_caps[ticker] = current_market_cap
-                        total_market_cap += current_market_cap
-                
-                # Calculate new weights based on previous day's market caps
-                current_weights = {}
-                for ticker in tickers_list:
-                    if ticker in ticker_market_caps:
-                        current_weights[ticker] = ticker_market_caps[ticker] / total_market_cap
-                    else:
-                        current_weights[ticker] = 0
-            
-            # Store daily weights for analysis
-            daily_weights[date] = current_weights.copy()
-            
-            # Calculate daily return using current weights
-            daily_return = 0
-            for ticker in tickers_list:
-                if ticker in returns.columns and not pd.isna(returns.loc[date, ticker]) and ticker in current_weights:
-                    daily_return += current_weights[ticker] * returns.loc[date, ticker]
-            daily_weighted_returns[date] = daily_return
+        if self.dataset_layout == 'single':
+            existing = pd.read_csv(dataset_path, parse_dates=['date'])
+        else:
+            existing = load_partitioned_dataset(dataset_path)
+        if existing.empty or existing['date'].iloc[-1] != last_date:
+            print("  Dataset does not end on the state file's last day, running full rebuild")
+            return False
+        new_rows = new_rows.reindex(columns=existing.columns)
         
-        # Calculate cumulative returns for daily weighted portfolio
-        daily_weighted_cumulative = (1 + daily_weighted_returns).cumprod()
+        self.portfolio_data = pd.concat([existing, new_rows], ignore_index=True)
+        if self.price_dtype != np.float64:
+            ticker_columns = [c for c in self.portfolio_data.columns
+                              if c.endswith(('_price', '_return')) and c[:c.rindex('_')] in self.weights]
+            self.portfolio_data = self.portfolio_data.astype(dict.fromkeys(ticker_columns, self.price_dtype))
+        self.rows_on_disk = len(existing)
+        self.rebalance_totals = state.get('rebalance_totals')
+        # Attribution rows up to here are final; save_dataset appends the rest
+        self.attribution_on_disk = state.get('attribution_last_date')
+        self._record_last_close(prices)
+        print(f"Portfolio data extended by {len(new_rows)} trading days "
+              f"({len(self.portfolio_data)} total)")
+        return True
+    
+    def _load_metadata_cache(self):
+        """Read the company metadata cache, or return an empty one"""
+        if not self.metadata_cache or not os.path.exists(self.metadata_cache):
+            return {}
+        try:
+            with open(self.metadata_cache) as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"  Warning: Could not read metadata cache {self.metadata_cache}: {e}")
+            return {}
+    
+    def _save_metadata_cache(self, cache):
+        """Write the company metadata cache"""
+        if not self.metadata_cache:
+            return
+        cache_dir = os.path.dirname(self.metadata_cache)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        with open(self.metadata_cache, 'w') as f:
+            json.dump(cache, f, indent=2, sort_keys=True)
+    
+    def _fetch_company_name(self, ticker):
+        """Fetch a ticker's current long name from the market data provider"""
+        return self._call_provider(lambda: self.provider.get_company_name(ticker))
+    
+    def refresh_company_metadata(self, tickers):
+        """
+        Return current company names, refreshing only expired cache entries
         
-        # Calculate S&P 500 returns and cumulative performance
-        spy_returns = returns['SPY'] if 'SPY' in returns.columns else pd.Series(index=returns.index)
-        spy_cumulative = (1 + spy_returns).cumprod()
+        Each cache entry carries its own expiry time. Missing or expired
+        entries are refreshed together in one concurrent batch; entries that
+        fail to refresh keep their previous value until the next run.
         
-        # Create comprehensive dataset
-        self.portfolio_data = pd.DataFrame({
-            'date': portfolio_returns.index,
-            'daily_return': portfolio_returns.values,
-            'cumulative_return': portfolio_cumulative.values,
-            'portfolio_value': portfolio_cumulative.values * 100,  # Starting at $100
-            'daily_weighted_return': daily_weighted_returns.values,
-            'daily_weighted_cumulative': daily_weighted_cumulative.values,
-            'daily_weighted_value': daily_weighted_cumulative.values * 100,  # Starting at $100
-            'spy_daily_return': spy_returns.values,
-            'spy_cumulative_return': spy_cumulative.values,
-            'spy_value': spy_cumulative.values * 100  # Starting at $100
-        })
+        Args:
+            tickers (list): Ticker symbols to look up
         
-        # Add individual stock data for analysis - align with portfolio_returns index
-        for ticker in tickers_list:
-            if ticker in prices.columns:
-                # Align stock data with portfolio returns index
-                aligned_prices = prices[ticker].reindex(portfolio_returns.index)
-                self.portfolio_data[f'{ticker}_price'] = aligned_prices.values
-                
-                if ticker in returns.columns:
-                    aligned_returns = returns[ticker].reindex(portfolio_returns.index)
-                    self.portfolio_data[f'{ticker}_return'] = aligned_returns.values
-                else:
-                    self.portfolio_data[f'{ticker}_return'] = np.nan
+        Returns:
+            dict: Ticker -> current long name (tickers never fetched are omitted)
+        """
+        cache = self._load_metadata_cache()
+        now = datetime.now()
+        stale = [
+            ticker for ticker in tickers
+            if ticker not in cache or datetime.fromisoformat(cache[ticker]['expires_at']) <= now
+        ]
+        print(f"  {len(tickers) - len(stale)} company names cached, refreshing {len(stale)}")
         
-        print(f"Portfolio data calculated for {len(self.portfolio_data)} trading days")
+        if stale:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {executor.submit(carry_phase(self._fetch_company_name), t): t for t in stale}
+                for future in as_completed(futures):
+                    ticker = futures[future]
+                    try:
+                        long_name = future.result()
+                    except Exception as e:
+                        print(f"  Could not check {ticker}: {e}")
+                        continue
+                    cache[ticker] = {
+                        'long_name': long_name,
+                        'fetched_at': now.isoformat(timespec='seconds'),
+                        'expires_at': (now + timedelta(days=self.metadata_ttl_days)).isoformat(timespec='seconds')
+                    }
+            self._save_metadata_cache(cache)
         
-        # Check for ticker changes (simplified check)
-        self.check_ticker_changes()
+        return {ticker: cache[ticker]['long_name'] for ticker in tickers if ticker in cache}
+    
+    def _load_change_log(self):
+        """Read previously logged name changes, dropping ones that are not real changes"""
+        changes_file = self.dataset_file.replace('.csv', '_changes.csv')
+        if not os.path.exists(changes_file):
+            return []
+        try:
+            logged = pd.read_csv(changes_file, dtype=str).fillna('')
+        except Exception as e:
+            print(f"  Warning: Could not read change log {changes_file}: {e}")
+            return []
+        return [
+            row for row in logged.to_dict('records')
+            if not company_names_match(row['original_name'], row['current_name'])
+        ]
     
     def check_ticker_changes(self):
-        """Check for potential ticker or company name changes"""
+        """
+        Check for potential ticker or company name changes
+        
+        Names are compared after normalisation (case, punctuation, legal
+        suffixes and share-class labels), and each change is logged once:
+        a change already in the log is not recorded again.
+        """
         print("Checking for ticker/company name changes...")
         
+        tickers = list(self.weights.keys())
+        background = self._background.get('names')
+        # Joined either way, so a refresh below never races its cache write
+        names = background['future'].result() if background else None
+        if background and set(tickers) <= set(background['tickers']):
+            current_names = {ticker: names[ticker] for ticker in tickers if ticker in names}
+        else:
+            current_names = self.refresh_company_metadata(tickers)
+        
+        change_log = self._load_change_log()
+        logged = {(row['ticker'], normalize_company_name(row['current_name'])) for row in change_log}
         current_changes = []
         
-        for ticker in self.weights.keys():
-            try:
-                stock = yf.Ticker(ticker)
-                current_info = stock.info
-                
-                original_company = self.market_caps[ticker]['company_name']
-                current_company = current_info.get('longName', 'Unknown')
-                
-                # Simple name change detection (you might want more sophisticated logic)
-                if current_company.upper() != original_company.upper():
-                    if 'Unknown' not in current_company:
-                        change_info = {
-                            'ticker': ticker,
-                            'original_name': original_company,
-                            'current_name': current_company,
-                            'change_detected': datetime.now().strftime('%Y-%m-%d')
-                        }
-                        current_changes.append(change_info)
-                        print(f"  ⚠️ Name change detected for {ticker}:")
-                        print(f"     Original: {original_company}")
-                        print(f"     Current:  {current_company}")
-                
-            except Exception as e:
-                print(f"  Could not check {ticker}: {e}")
+        for ticker in tickers:
+            if ticker not in current_names:
+                continue
+            
+            original_company = self.market_caps[ticker]['company_name']
+            current_company = current_names[ticker]
+            
+            if 'Unknown' in current_company or company_names_match(original_company, current_company):
                 continue
+            if (ticker, normalize_company_name(current_company)) in logged:
+                continue
+            
+            change_info = {
+                'ticker': ticker,
+                'original_name': original_company,
+                'current_name': current_company,
+                'change_detected': datetime.now().strftime('%Y-%m-%d')
+            }
+            current_changes.append(change_info)
+            print(f"  ⚠️ Name change detected for {ticker}:")
+            print(f"     Original: {original_company}")
+            print(f"     Current:  {current_company}")
         
-        self.ticker_changes.extend(current_changes)
+        self.ticker_changes = change_log + current_changes
         
         if not current_changes:
-            print("  No ticker/company name changes detected")
+            print("  No new ticker/company name changes detected")
     
     def save_dataset(self, filename='ai_portfolio_data.csv'):
         """Save portfolio data to CSV file"""
@@ -365,8 +1958,61 @@ class PortfolioMonitor:
             ['']
         ])
         
-        # Save main data
-        self.portfolio_data.to_csv(filename, index=False)
+        # Fixed significant digits keep the CSV small; None keeps full precision
+        float_format = self._float_format()
+        
+        # Save main data, appending only new rows after an incremental update
+        if self.dataset_layout != 'single':
+            self._save_partitioned(self._dataset_path(filename), float_format)
+        elif self.rows_on_disk and os.path.exists(self.dataset_file):
+            if os.path.abspath(filename) != os.path.abspath(self.dataset_file):
+                shutil.copyfile(self.dataset_file, filename)
+            new_rows = self.portfolio_data.iloc[self.rows_on_disk:]
+            new_rows.to_csv(filename, mode='a', header=False, index=False,
+                            date_format='%Y-%m-%d', float_format=float_format)
+            print(f"  Appended {len(new_rows)} new rows")
+        else:
+            self.portfolio_data.to_csv(filename, index=False,
+                                       date_format='%Y-%m-%d', float_format=float_format)
+        
+        # Columnar copies (Parquet / Arrow IPC) in wide and long layouts
+        columnar_files = self.save_columnar(filename)
+        
+        # Record what the dataset was built from so incremental runs can check
+        # it, and the last row they continue from
+        last_row = self.portfolio_data.iloc[-1]
+        state = {
+            'base_date': self.base_date,
+            'tickers': list(self.weights.keys()),
+            'last_date': pd.to_datetime(self.portfolio_data['date'].iloc[-1]).strftime('%Y-%m-%d'),
+            'rows': len(self.portfolio_data),
+            'csv_float_precision': self.csv_float_precision,
+            'dataset_layout': self.dataset_layout,
+            'risk_windows': list(self.risk_windows),
+            'strategies': list(self.strategies),
+            'rebalance_schedules': list(self.rebalance_schedules),
+            'rebalance_targets': list(self.rebalance_targets),
+            'rebalance_cost_bps': self.rebalance_cost_bps,
+            'price_dtype': str(self.price_dtype),
+            'quality_checks': self.quality_checks,
+            'price_adjustments': self.price_adjustments,
+            'rebalance_totals': self.rebalance_totals,
+            'attribution_last_date': (
+                pd.to_datetime(last_row['date']).strftime('%Y-%m-%d')
+                if self.attribution_matrix is not None else None
+            ),
+            'last_row': {
+                'date': pd.to_datetime(last_row['date']).strftime('%Y-%m-%d'),
+                **{c: float(last_row[c]) for c in
+                   ('cumulative_return', 'daily_weighted_cumulative', 'spy_cumulative_return')}
+            },
+            'last_prices': {
+                t: None if pd.isna(last_row[f'{t}_price']) else float(last_row[f'{t}_price'])
+                for t in self.weights if f'{t}_price' in last_row.index
+            }
+        }
+        with open(self._state_filename(filename), 'w') as f:
+            json.dump(state, f, indent=2)
         
         # Save weights separately
         weights_df = pd.DataFrame([
@@ -377,34 +2023,305 @@ class PortfolioMonitor:
         weights_filename = filename.replace('.csv', '_weights.csv')
         weights_df.to_csv(weights_filename, index=False)
         
-        # Save ticker changes if any
+        # Save the ticker change log (header only when nothing has changed)
+        changes_df = pd.DataFrame(
+            self.ticker_changes,
+            columns=['ticker', 'original_name', 'current_name', 'change_detected']
+        )
+        changes_filename = filename.replace('.csv', '_changes.csv')
+        changes_df.to_csv(changes_filename, index=False)
         if self.ticker_changes:
-            changes_df = pd.DataFrame(self.ticker_changes)
-            changes_filename = filename.replace('.csv', '_changes.csv')
-            changes_df.to_csv(changes_filename, index=False)
             print(f"Ticker changes saved to {changes_filename}")
         
-        print(f"Dataset saved successfully:")
-        print(f"  - Main data: {filename}")
+        # Data-quality flags from this run's screening
+        if self.quality_report is not None:
+            quality_filename = filename.replace('.csv', '_quality.json')
+            with open(quality_filename, 'w') as f:
+                json.dump(self.quality_report, f, indent=2)
+            print(f"Data-quality report saved to {quality_filename}")
+        
+        # Per-ticker contributions (gzip CSV) and top contributors per day
+        if self.attribution_matrix is not None:
+            self._save_attribution(filename)
+        
+        # Turnover, costs and returns of each target on each rebalancing schedule
+        if self.rebalance_summary is not None:
+            rebalancing_filename = filename.replace('.csv', '_rebalancing.json')
+            with open(rebalancing_filename, 'w') as f:
+                json.dump({
+                    'cost_bps': self.rebalance_cost_bps,
+                    'portfolios': self.rebalance_summary
+                }, f, indent=2)
+            print(f"Rebalancing summary saved to {rebalancing_filename}")
+        
+        # Weights, shares and closes for intraday valuation (live_valuation.py)
+        if self.last_close is not None:
+            baseline_filename = filename.replace('.csv', '_live_baseline.json')
+            baseline = build_baseline(self.weights, self.market_caps,
+                                      self.portfolio_data.iloc[-1], self.last_close)
+            with open(baseline_filename, 'w') as f:
+                json.dump(baseline, f, indent=2)
+            print(f"Live valuation baseline saved to {baseline_filename}")
+        
+        # Latest rolling risk statistics for each constituent
+        if self.constituent_risk is not None:
+            risk_filename = filename.replace('.csv', '_risk.csv')
+            self.constituent_risk.to_csv(risk_filename, float_format=float_format)
+            print(f"Constituent risk saved to {risk_filename}")
+        
+        print("Dataset saved successfully:")
+        print(f"  - Main data: {self._dataset_path(filename)}")
         print(f"  - Weights: {weights_filename}")
+        print(f"  - State: {self._state_filename(filename)}")
+        for columnar_file in columnar_files:
+            print(f"  - Columnar: {columnar_file}")
+    
+    def _save_attribution(self, filename):
+        """
+        Save contributions (gzip CSV) and top contributors (one JSON line per day)
+        
+        Stored days never change, so after an incremental update only the new
+        days are appended: a new gzip member and new lines, leaving the bytes
+        already on disk (and committed) untouched. Full writes use a fixed
+        gzip timestamp, so unchanged contributions give an identical file.
+        """
+        attribution_filename = filename.replace('.csv', '_attribution.csv.gz')
+        top_filename = filename.replace('.csv', '_attribution_top.jsonl')
+        stored = [self.dataset_file.replace('.csv', suffix)
+                  for suffix in ('_attribution.csv.gz', '_attribution_top.jsonl')]
+        matrix = self.attribution_matrix
+        top = self.top_contributors
+        
+        append = self.attribution_on_disk is not None and all(os.path.exists(path) for path in stored)
+        if append:
+            for source, target in zip(stored, (attribution_filename, top_filename)):
+                if os.path.abspath(source) != os.path.abspath(target):
+                    shutil.copyfile(source, target)
+            since = self.attribution_on_disk
+            matrix = matrix[matrix['date'] > pd.to_datetime(since)]
+            top = {date: value for date, value in top.items() if date > since}
+        
+        matrix.to_csv(attribution_filename, mode='a' if append else 'w', header=not append, index=False,
+                      float_format='%.4g', date_format='%Y-%m-%d',
+                      compression={'method': 'gzip', 'mtime': 0})
+        with open(top_filename, 'a' if append else 'w') as f:
+            for date, portfolios in top.items():
+                f.write(json.dumps({'date': date, **portfolios}, separators=(',', ':')) + '\n')
+        
+        if append:
+            print(f"Attribution: appended {len(top)} days to {attribution_filename} and {top_filename}")
+        else:
+            print(f"Attribution saved to {attribution_filename} and {top_filename}")
+    
+    def _save_partitioned(self, directory, float_format=None):
+        """
+        Write the dataset as one CSV per year or month plus manifest.json
+        
+        After an incremental update only partitions receiving new rows are
+        touched, and rows are appended; closed partitions are never rewritten.
+        A full rebuild rewrites every partition.
+        """
+        existing_dir = self._dataset_path(self.dataset_file)
+        manifest_file = os.path.join(directory, 'manifest.json')
+        incremental = self.rows_on_disk and os.path.exists(os.path.join(existing_dir, 'manifest.json'))
+        
+        if incremental and os.path.abspath(directory) != os.path.abspath(existing_dir):
+            # Work on a copy so unchanged partition files stay byte-identical
+            if os.path.exists(directory):
+                shutil.rmtree(directory)
+            shutil.copytree(existing_dir, directory)
+        elif not incremental and os.path.exists(directory):
+            shutil.rmtree(directory)
+        os.makedirs(directory, exist_ok=True)
+        
+        if incremental:
+            with open(manifest_file) as f:
+                manifest = json.load(f)
+            new_rows = self.portfolio_data.iloc[self.rows_on_disk:]
+        else:
+            manifest = {'layout': self.dataset_layout, 'columns': list(self.portfolio_data.columns),
+                        'partitions': []}
+            new_rows = self.portfolio_data
+        
+        partitions = {p['key']: p for p in manifest['partitions']}
+        keys = partition_keys(new_rows['date'], self.dataset_layout)
+        for key, rows in new_rows.groupby(keys, sort=True):
+            entry = partitions.get(key)
+            path = os.path.join(directory, f'{key}.csv')
+            if entry is None:
+                entry = partitions[key] = {'key': key, 'file': f'{key}.csv', 'rows': 0}
+                rows.to_csv(path, index=False, date_format='%Y-%m-%d', float_format=float_format)
+            else:
+                rows.to_csv(path, mode='a', header=False, index=False,
+                            date_format='%Y-%m-%d', float_format=float_format)
+            entry['rows'] += len(rows)
+            if 'start' not in entry:
+                entry['start'] = pd.to_datetime(rows['date'].iloc[0]).strftime('%Y-%m-%d')
+            entry['end'] = pd.to_datetime(rows['date'].iloc[-1]).strftime('%Y-%m-%d')
+            print(f"  Partition {key}: +{len(rows)} rows")
+        
+        manifest['partitions'] = [partitions[k] for k in sorted(partitions)]
+        with open(manifest_file, 'w') as f:
+            json.dump(manifest, f, indent=2)
+    
+    def save_columnar(self, filename='ai_portfolio_data.csv'):
+        """
+        Write columnar copies of the dataset for fast, selective loading
+        
+        For each format in self.output_formats ('parquet' and/or 'feather',
+        the Arrow IPC file format) two files are written next to filename:
+        the wide table (ai_portfolio_data.parquet) and a long table with one
+        row per date and ticker (ai_portfolio_data_long.parquet), where the
+        ticker column is dictionary-encoded. Readers can load single columns,
+        e.g. pd.read_parquet(path, columns=['date', 'NVDA_price']).
+        
+        Requires pyarrow; if it is not installed the files are skipped.
+        
+        Returns:
+            list: Paths written
+        """
+        if not self.output_formats:
+            return []
+        try:
+            import pyarrow  # noqa: F401  (pandas' Parquet/Feather engine)
+        except ImportError:
+            print("  Warning: pyarrow not installed, skipping columnar output")
+            return []
+        
+        tables = {
+            '': self.portfolio_data,
+            '_long': long_format(self.portfolio_data, list(self.weights.keys()))
+        }
+        written = []
+        for fmt in self.output_formats:
+            for suffix, table in tables.items():
+                path = filename.replace('.csv', f'{suffix}.{fmt}')
+                if fmt == 'parquet':
+                    table.to_parquet(path, index=False, compression='zstd')
+                elif fmt == 'feather':
+                    table.to_feather(path, compression='zstd')
+                else:
+                    print(f"  Warning: Unknown output format '{fmt}'")
+                    break
+                written.append(path)
+        return written
+    
+    def load_dataset(self, filename=None):
+        """
+        Load a saved dataset so it can be charted without fetching anything
+        
+        Reads the dataset (single CSV or partitions, per its state file), the
+        weights file and the risk windows and strategies it was built with.
+        
+        Args:
+            filename (str): Dataset CSV (defaults to self.dataset_file)
+        
+        Returns:
+            bool: True if the dataset was loaded
+        """
+        filename = filename or self.dataset_file
+        state_file = self._state_filename(filename)
+        state = {}
+        if os.path.exists(state_file):
+            with open(state_file) as f:
+                state = json.load(f)
+        
+        self.dataset_layout = state.get('dataset_layout', 'single')
+        self.risk_windows = tuple(state.get('risk_windows', []))
+        self.strategies = tuple(state.get('strategies', []))
+        
+        dataset_path = self._dataset_path(filename)
+        try:
+            if self.dataset_layout == 'single':
+                self.portfolio_data = pd.read_csv(dataset_path, parse_dates=['date'])
+            else:
+                self.portfolio_data = load_partitioned_dataset(dataset_path)
+            weights_df = pd.read_csv(filename.replace('.csv', '_weights.csv'), dtype={'ticker': str})
+        except Exception as e:
+            print(f"Error loading dataset {dataset_path}: {e}")
+            return False
+        
+        self.weights = dict(zip(weights_df['ticker'], weights_df['weight']))
+        print(f"Loaded {len(self.portfolio_data)} trading days and {len(self.weights)} weights "
+              f"from {dataset_path}")
+        return True
     
-    def create_interactive_chart(self, html_filename='ai_portfolio_chart.html'):
-        """Create interactive plotly chart of portfolio performance"""
+    def create_interactive_chart(self, html_filename='ai_portfolio_chart.html', lean=None):
+        """
+        Create interactive plotly chart of portfolio performance
+        
+        Args:
+            html_filename (str): Output HTML file
+            lean (bool): Lean page (defaults to self.lean_chart): plotly.js is
+                referenced as a shared plotly.min.js next to the HTML instead of
+                inlined, lines use WebGL, and line series longer than
+                chart_max_points are LTTB-downsampled (daily-return bars are
+                kept whole: a dropped bar would hide that day's move).
+                Full-resolution data is written to <name>_data.json and
+                fetched only when the user zooms in.
+        """
         print(f"Creating interactive chart: {html_filename}")
         
-        # Create subplots with 3 panels
+        # Imported here so fetch/compute runs never load plotly
+        import plotly.graph_objects as go
+        from plotly.subplots import make_subplots
+        
+        lean = self.lean_chart if lean is None else lean
+        scatter = go.Scattergl if lean else go.Scatter
+        dates = self.portfolio_data['date'].to_numpy()
+        
+        def points(column, scale=1, downsample=True):
+            """Dates and values to plot, kept row indices and all values for one trace"""
+            values = self.portfolio_data[column].to_numpy(dtype=float) * scale
+            keep = lttb_indices(values, self.chart_max_points) if lean and downsample else np.arange(len(values))
+            return dates[keep], values[keep], keep, values
+        
+        series = {
+            'portfolio_value': points('portfolio_value'),
+            'daily_weighted_value': points('daily_weighted_value'),
+            'spy_value': points('spy_value'),
+            'daily_return': points('daily_return', 100, downsample=False),  # Convert to percentage
+            'daily_weighted_return': points('daily_weighted_return', 100, downsample=False)
+        }
+        
+        # Rolling volatility panel for the middle risk window (less noisy than
+        # the shortest, available earlier than the longest)
+        risk_window = self.risk_windows[len(self.risk_windows) // 2] if self.risk_windows else None
+        risk_lines = []
+        if risk_window and f'portfolio_vol_{risk_window}d' in self.portfolio_data.columns:
+            risk_lines = [
+                (f'portfolio_vol_{risk_window}d', 'AI Portfolio Volatility', '#2E86AB', None),
+                (f'daily_weighted_vol_{risk_window}d', 'New AI Information Volatility', '#A23B72', None),
+                (f'spy_vol_{risk_window}d', 'S&P 500 Volatility', '#FF6B35', 'dash')
+            ]
+            for column, _, _, _ in risk_lines:
+                series[column] = points(column, 100)
+        
+        # One value line per extra weighting strategy (Panel 1)
+        strategy_lines = [name for name in self.strategies
+                          if f'strategy_{name}_value' in self.portfolio_data.columns]
+        for name in strategy_lines:
+            series[f'strategy_{name}_value'] = points(f'strategy_{name}_value')
+        
+        # Create subplots with 3 panels (4 with rolling risk)
+        subplot_titles = ['Portfolio Cumulative Value', 'Original Portfolio Daily Returns', 'New AI Information Daily Returns']
+        row_heights = [0.5, 0.25, 0.25]
+        if risk_lines:
+            subplot_titles.append(f'Rolling {risk_window}-Day Volatility (Annualized)')
+            row_heights = [0.4, 0.2, 0.2, 0.2]
         fig = make_subplots(
-            rows=3, cols=1,
-            subplot_titles=('Portfolio Cumulative Value', 'Original Portfolio Daily Returns', 'New AI Information Daily Returns'),
+            rows=len(row_heights), cols=1,
+            subplot_titles=subplot_titles,
             vertical_spacing=0.06,
-            row_heights=[0.5, 0.25, 0.25]
+            row_heights=row_heights
         )
         
         # Original AI Portfolio value line
+        x, y, _, _ = series['portfolio_value']
         fig.add_trace(
-            go.Scatter(
-                x=self.portfolio_data['date'],
-                y=self.portfolio_data['portfolio_value'],
+            scatter(
+                x=x,
+                y=y,
                 mode='lines',
                 name='AI Portfolio (Fixed Weights)',
                 line=dict(color='#2E86AB', width=3),
@@ -416,10 +2333,11 @@ class PortfolioMonitor:
         )
         
         # New AI Information Portfolio (daily weighted)
+        x, y, _, _ = series['daily_weighted_value']
         fig.add_trace(
-            go.Scatter(
-                x=self.portfolio_data['date'],
-                y=self.portfolio_data['daily_weighted_value'],
+            scatter(
+                x=x,
+                y=y,
                 mode='lines',
                 name='New AI Information (Daily Weighted)',
                 line=dict(color='#A23B72', width=3),
@@ -431,10 +2349,11 @@ class PortfolioMonitor:
         )
         
         # S&P 500 comparison line
+        x, y, _, _ = series['spy_value']
         fig.add_trace(
-            go.Scatter(
-                x=self.portfolio_data['date'],
-                y=self.portfolio_data['spy_value'],
+            scatter(
+                x=x,
+                y=y,
                 mode='lines',
                 name='S&P 500 (SPY)',
                 line=dict(color='#FF6B35', width=2, dash='dash'),
@@ -446,13 +2365,13 @@ class PortfolioMonitor:
         )
         
         # Original Portfolio Daily returns (Panel 2)
-        colors = ['green' if x >= 0 else 'red' for x in self.portfolio_data['daily_return']]
+        x, y, _, _ = series['daily_return']
         fig.add_trace(
             go.Bar(
-                x=self.portfolio_data['date'],
-                y=self.portfolio_data['daily_return'] * 100,  # Convert to percentage
+                x=x,
+                y=y,
                 name='Original AI Portfolio Daily Return (%)',
-                marker_color=colors,
+                marker_color=np.where(y >= 0, 'green', 'red'),
                 hovertemplate='<b>Date:</b> %{x}<br>' +
                               '<b>Daily Return:</b> %{y:.2f}%<br>' +
                               '<extra></extra>',
@@ -462,13 +2381,13 @@ class PortfolioMonitor:
         )
         
         # New AI Information Daily returns (Panel 3)
-        colors_new = ['#2E8B57' if x >= 0 else '#DC143C' for x in self.portfolio_data['daily_weighted_return']]
+        x, y, _, _ = series['daily_weighted_return']
         fig.add_trace(
             go.Bar(
-                x=self.portfolio_data['date'],
-                y=self.portfolio_data['daily_weighted_return'] * 100,  # Convert to percentage
+                x=x,
+                y=y,
                 name='New AI Information Daily Return (%)',
-                marker_color=colors_new,
+                marker_color=np.where(y >= 0, '#2E8B57', '#DC143C'),
                 hovertemplate='<b>Date:</b> %{x}<br>' +
                               '<b>Daily Return:</b> %{y:.2f}%<br>' +
                               '<extra></extra>',
@@ -477,11 +2396,47 @@ class PortfolioMonitor:
             row=3, col=1
         )
         
+        # Rolling volatility (Panel 4)
+        for column, name, color, dash in risk_lines:
+            x, y, _, _ = series[column]
+            fig.add_trace(
+                scatter(
+                    x=x,
+                    y=y,
+                    mode='lines',
+                    name=name,
+                    line=dict(color=color, width=2, dash=dash),
+                    hovertemplate='<b>Date:</b> %{x}<br>' +
+                                  f'<b>{name}:</b> ' + '%{y:.1f}%<br>' +
+                                  '<extra></extra>',
+                    showlegend=False
+                ),
+                row=4, col=1
+            )
+        
+        # Extra strategies (Panel 1)
+        for i, name in enumerate(strategy_lines):
+            label = STRATEGIES[name]['label']
+            x, y, _, _ = series[f'strategy_{name}_value']
+            fig.add_trace(
+                scatter(
+                    x=x,
+                    y=y,
+                    mode='lines',
+                    name=label,
+                    line=dict(color=STRATEGY_COLORS[i % len(STRATEGY_COLORS)], width=1.5),
+                    hovertemplate='<b>Date:</b> %{x}<br>' +
+                                  f'<b>{label}:</b> ' + '$%{y:.2f}<br>' +
+                                  '<extra></extra>'
+                ),
+                row=1, col=1
+            )
+        
         # Update layout
         fig.update_layout(
             title={
                 'text': 'AI Shocks Portfolio Performance<br>' +
-                        f'<sub>Fixed weights vs Daily rebalancing comparison</sub>',
+                        '<sub>Fixed weights vs Daily rebalancing comparison</sub>',
                 'x': 0.5,
                 'font': {'size': 20}
             },
@@ -492,29 +2447,31 @@ class PortfolioMonitor:
         )
         
         # Update axes
-        fig.update_xaxes(title_text="Date", row=3, col=1)
+        fig.update_xaxes(title_text="Date", row=len(row_heights), col=1)
         fig.update_yaxes(title_text="Portfolio Value ($)", row=1, col=1)
         fig.update_yaxes(title_text="Daily Return (%)", row=2, col=1)
         fig.update_yaxes(title_text="Daily Return (%)", row=3, col=1)
+        if risk_lines:
+            fig.update_yaxes(title_text="Volatility (%)", row=4, col=1)
         
         # Add performance statistics as annotation
-        portfolio_return = (self.portfolio_data['portfolio_value'].iloc[-1] / 100 - 1) * 100
-        daily_weighted_return = (self.portfolio_data['daily_weighted_value'].iloc[-1] / 100 - 1) * 100
-        spy_return = (self.portfolio_data['spy_value'].iloc[-1] / 100 - 1) * 100
-        
-        portfolio_vol = self.portfolio_data['daily_return'].std() * np.sqrt(252) * 100  # Annualized
-        daily_weighted_vol = self.portfolio_data['daily_weighted_return'].std() * np.sqrt(252) * 100
-        spy_vol = self.portfolio_data['spy_daily_return'].std() * np.sqrt(252) * 100
+        summary = self.performance_summary()
+        portfolio_return = summary['portfolio_return_pct']
+        daily_weighted_return = summary['daily_weighted_return_pct']
+        spy_return = summary['spy_return_pct']
+        portfolio_vol = summary['portfolio_vol_pct']
+        daily_weighted_vol = summary['daily_weighted_vol_pct']
+        spy_vol = summary['spy_vol_pct']
         
-        stats_text = (f"<b>Performance Summary</b><br>"
+        stats_text = ("<b>Performance Summary</b><br>"
                      f"AI Fixed Weights: {portfolio_return:.1f}%<br>"
                      f"New AI Info (Daily): {daily_weighted_return:.1f}%<br>"
                      f"S&P 500: {spy_return:.1f}%<br>"
-                     f"<br>"
+                     "<br>"
                      f"Fixed Weight Vol: {portfolio_vol:.1f}%<br>"
                      f"Daily Vol: {daily_weighted_vol:.1f}%<br>"
                      f"S&P 500 Vol: {spy_vol:.1f}%<br>"
-                     f"Stocks: {len(self.weights)}")
+                     f"Stocks: {summary['stocks']}")
         
         fig.add_annotation(
             text=stats_text,
@@ -529,9 +2486,18 @@ class PortfolioMonitor:
         )
         
         # Save as HTML
+        post_script = None
+        if lean and len(dates) > self.chart_max_points:
+            data_filename = html_filename.replace('.html', '_data.json')
+            self._write_chart_data(data_filename, series)
+            post_script = (CHART_ZOOM_SCRIPT
+                           .replace('__DATA_URL__', json.dumps(os.path.basename(data_filename)))
+                           .replace('__MAX_POINTS__', str(self.chart_max_points)))
+        
         fig.write_html(
             html_filename,
-            include_plotlyjs=True,
+            include_plotlyjs='directory' if lean else True,
+            post_script=post_script,
             config={'displayModeBar': True, 'displaylogo': False}
         )
         
@@ -541,91 +2507,388 @@ class PortfolioMonitor:
         print(f"  S&P 500 Return: {spy_return:.2f}%")
         print(f"  Fixed vs Daily Difference: {daily_weighted_return - portfolio_return:+.2f}%")
     
-    def run_full_analysis(self):
-        """Run the complete portfolio analysis workflow"""
-        print("=" * 60)
-        print("AI SHOCKS PORTFOLIO MONITOR")
-        print("=" * 60)
+    def performance_summary(self):
+        """
+        Headline statistics shown in the chart annotation
+        
+        Returns:
+            dict: Total returns and annualized volatilities (in %) for the fixed-weight,
+                daily-weighted and SPY series, plus the number of stocks
+        """
+        data = self.portfolio_data
+        return {
+            'portfolio_return_pct': (data['portfolio_value'].iloc[-1] / 100 - 1) * 100,
+            'daily_weighted_return_pct': (data['daily_weighted_value'].iloc[-1] / 100 - 1) * 100,
+            'spy_return_pct': (data['spy_value'].iloc[-1] / 100 - 1) * 100,
+            'portfolio_vol_pct': data['daily_return'].std() * np.sqrt(252) * 100,  # Annualized
+            'daily_weighted_vol_pct': data['daily_weighted_return'].std() * np.sqrt(252) * 100,
+            'spy_vol_pct': data['spy_daily_return'].std() * np.sqrt(252) * 100,
+            'stocks': len(self.weights)
+        }
+    
+    def save_feed(self, filename='ai_portfolio_feed.json'):
+        """
+        Save a compact JSON feed of the chart series for client-side rendering
+        
+        Dates are stored as day offsets from the first date and values at fixed
+        precision (FEED_PRECISION), so the feed stays in the tens of kilobytes.
+        It is rebuilt from portfolio_data in a few vectorized passes, which is
+        cheap on incremental runs too.
+        
+        Args:
+            filename (str): Output JSON file
+        """
+        print(f"Saving data feed: {filename}")
+        
+        data = self.portfolio_data
+        dates = pd.to_datetime(data['date'])
+        
+        # NaN and infinity are not valid JSON (JSON.parse rejects them), so
+        # non-finite values are written as null
+        def fixed(values, decimals):
+            values = np.round(values.to_numpy(dtype=float), decimals)
+            return [v if np.isfinite(v) else None for v in values.tolist()]
+        
+        series = {}
+        for column, (scale, decimals) in FEED_PRECISION.items():
+            series[column] = fixed(data[column] * scale, decimals)
+        
+        summary = {key: round(float(value), 2) if np.isfinite(value) else None
+                   for key, value in self.performance_summary().items()}
+        summary['stocks'] = len(self.weights)
+        
+        feed = {
+            'version': FEED_VERSION,
+            'generated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'base_date': self.base_date,
+            'start_date': dates.iloc[0].strftime('%Y-%m-%d'),
+            'end_date': dates.iloc[-1].strftime('%Y-%m-%d'),
+            'day_offsets': (dates - dates.iloc[0]).dt.days.tolist(),
+            'units': {column: 'percent' if scale == 100 else 'value (base 100)'
+                      for column, (scale, _) in FEED_PRECISION.items()},
+            'series': series,
+            'summary': summary
+        }
+        
+        with open(filename, 'w') as f:
+            json.dump(feed, f, separators=(',', ':'), allow_nan=False)
+        
+        print(f"Data feed saved: {len(data)} days, {os.path.getsize(filename) / 1024:.1f} KB")
+    
+    def _write_chart_data(self, filename, series):
+        """Write full-resolution chart series for the zoom handler"""
+        bar_colors = {
+            'daily_return': ['green', 'red'],
+            'daily_weighted_return': ['#2E8B57', '#DC143C']
+        }
+        dates = pd.to_datetime(self.portfolio_data['date']).dt.strftime('%Y-%m-%d').tolist()
+        payload = {
+            'dates': dates,
+            'traces': [
+                {
+                    'y': [round(float(v), 4) if np.isfinite(v) else None for v in values],
+                    'sample': keep.tolist(),
+                    'colors': bar_colors.get(column)
+                }
+                for column, (_, _, keep, values) in series.items()
+            ]
+        }
+        with open(filename, 'w') as f:
+            json.dump(payload, f, separators=(',', ':'), allow_nan=False)
+    
+    def run_stages(self, stages, chart_file='ai_portfolio_chart.html',
+                   report_file='ai_portfolio_run_report.json', print_report=False):
+        """
+        Run the pipeline stages shared by main() and run_full_analysis()
+        
+        The ticker list, base-date market caps and weights are always loaded;
+        the rest depends on stages. Each step is timed in self.run_report.
+        
+        Args:
+            stages (set): Any of 'prices' (bring the price cache up to date),
+                'portfolio' (compute the series), 'save' (dataset and data
+                feed) and 'chart'
+            chart_file (str): Output HTML for the chart
+            report_file (str): Where to write the per-stage run report (None to skip)
+            print_report (bool): Also print the run report as a table
+        
+        Returns:
+            bool: True if every requested stage ran
+        """
+        # Record wall/CPU time, memory and network traffic for each step
+        report = self.run_report = RunReport(self.network_stats)
         
         # Step 1: Load ticker list
-        if not self.load_ticker_list():
+        with report.stage('load_ticker_list') as stage:
+            loaded = self.load_ticker_list()
+            stage['rows'] = len(self.tickers_df) if loaded else 0
+        if not loaded:
+            print("Error: Failed to load ticker list")
             return False
         
-        # Step 2: Get market caps on base date
-        successful_tickers = self.get_market_caps_base_date()
+        # Prices (and name checks, when the portfolio is computed) download
+        # while the market caps are fetched
+        self.start_network_phases(names='portfolio' in stages)
+        
+        # Step 2: Get market caps on base date for weighting
+        with report.stage('get_market_caps_base_date') as stage:
+            successful_tickers = self.get_market_caps_base_date()
+            stage['rows'] = len(successful_tickers)
         if not successful_tickers:
             print("Error: No market cap data retrieved")
+            self.finish_network_phases()
             return False
         
-        # Step 3: Calculate weights
-        self.calculate_weights()
+        # Step 3: Calculate portfolio weights
+        with report.stage('calculate_weights') as stage:
+            self.calculate_weights()
+            stage['rows'] = len(self.weights)
         
-        # Step 4: Fetch portfolio data and calculate returns
-        self.fetch_portfolio_data()
+        # Fetch only: bring the price cache up to date
+        if 'prices' in stages:
+            with report.stage('load_price_history') as stage:
+                prices = self.load_price_history(list(self.weights) + ['SPY'], self.base_date,
+                                                 datetime.now().strftime('%Y-%m-%d'))
+                stage['rows'] = len(prices) if prices is not None else 0
+        
+        # Step 4: Fetch portfolio data and calculate returns (includes S&P 500)
+        if 'portfolio' in stages:
+            with report.stage('fetch_portfolio_data') as stage:
+                self.fetch_portfolio_data()
+                stage['rows'] = len(self.portfolio_data) - self.rows_on_disk if self.portfolio_data is not None else 0
+                stage['frame_mb'] = round(self.memory_footprint_mb(), 2)
+                if self.quality_flags is not None:
+                    stage['quality_flags'] = self.quality_flags
+            if self.portfolio_data is None:
+                print("Error: No portfolio data calculated")
+                self.finish_network_phases()
+                return False
         
         # Step 5: Save dataset
-        self.save_dataset()
+        if 'save' in stages:
+            with report.stage('save_dataset') as stage:
+                self.save_dataset()
+                stage['rows'] = len(self.portfolio_data) - self.rows_on_disk
+        
+        # Step 6: Create interactive chart with S&P 500 comparison
+        if 'chart' in stages:
+            with report.stage('create_interactive_chart') as stage:
+                self.create_interactive_chart(chart_file)
+                stage['rows'] = len(self.portfolio_data)
+        
+        # Step 7: Save the compact data feed for client-side rendering
+        if 'save' in stages:
+            with report.stage('save_feed') as stage:
+                self.save_feed()
+                stage['rows'] = len(self.portfolio_data)
+        
+        # Step 8: Write the run report, with the background phases joined
+        self.finish_network_phases()
+        report.http_stats = self.http_stats
+        if report_file:
+            report.write_json(report_file)
+        if print_report:
+            print()
+            report.print_table()
+        return True
+    
+    def run_full_analysis(self, report_file='ai_portfolio_run_report.json', print_report=False):
+        """
+        Run the complete portfolio analysis workflow
+        
+        Args:
+            report_file (str): Where to write the per-stage run report (None to skip)
+            print_report (bool): Also print the run report as a table
+        """
+        print("=" * 60)
+        print("AI SHOCKS PORTFOLIO MONITOR")
+        print("=" * 60)
         
-        # Step 6: Create interactive chart
-        self.create_interactive_chart()
+        if not self.run_stages(COMMAND_STAGES['all'], report_file=report_file, print_report=print_report):
+            return False
         
         print("\n" + "=" * 60)
         print("ANALYSIS COMPLETE!")
         print("=" * 60)
-        print(f"Files created:")
-        print(f"  • ai_portfolio_data.csv - Main portfolio dataset")
-        print(f"  • ai_portfolio_data_weights.csv - Portfolio weights")
-        print(f"  • ai_portfolio_chart.html - Interactive chart")
+        print("Files created:")
+        print("  • ai_portfolio_data.csv - Main portfolio dataset")
+        print("  • ai_portfolio_data_weights.csv - Portfolio weights")
+        print("  • ai_portfolio_chart.html - Interactive chart")
+        print("  • ai_portfolio_feed.json - Compact data feed")
+        if report_file:
+            print(f"  • {report_file} - Per-stage run report")
         if self.ticker_changes:
-            print(f"  • ai_portfolio_data_changes.csv - Ticker changes detected")
+            print("  • ai_portfolio_data_changes.csv - Ticker changes detected")
         
         return True
 
+def local_provider(fixtures=None, dataset_file='files/ai_portfolio_data.csv'):
+    """
+    Offline provider from a fixture directory, or rebuilt from the saved dataset
+    
+    Args:
+        fixtures (str): Directory with prices.csv and fundamentals.csv (see
+            market_data.write_synthetic_fixture); None rebuilds fixtures in
+            memory from dataset_file and its weights file
+        dataset_file (str): Dataset to rebuild fixtures from
+    
+    Returns:
+        LocalProvider
+    """
+    if fixtures:
+        return LocalProvider.from_directory(fixtures)
+    return LocalProvider.from_dataset(dataset_file)
+
 
-def main():
-    """Main execution function - less abstracted for easier modifications"""
-    print("=" * 60)
-    print("AI SHOCKS PORTFOLIO MONITOR")
-    print("=" * 60)
+def build_monitor(provider=None, fixtures=None):
+    """
+    PortfolioMonitor configured for the scheduled run (PORTFOLIO_* environment overrides)
     
-    # Initialize portfolio monitor
-    monitor = PortfolioMonitor(
-        ticker_file='tickerlist.txt',
-        base_date='2022-10-25'
+    Args:
+        provider (str): 'yfinance' or 'local' (defaults to PORTFOLIO_PROVIDER,
+            then 'yfinance'); a local run reads fixtures and never touches the
+            network, the price cache, the base snapshot or the name cache
+        fixtures (str): Fixture directory for the local provider (defaults to
+            PORTFOLIO_FIXTURES, then fixtures rebuilt from the saved dataset);
+            its tickerlist.txt, if any, is the default universe
+    """
+    provider = provider or os.environ.get('PORTFOLIO_PROVIDER', 'yfinance')
+    fixtures = fixtures or os.environ.get('PORTFOLIO_FIXTURES')
+    ticker_file = 'tickerlist.txt'
+    offline = {}
+    if provider == 'local':
+        if fixtures and os.path.exists(os.path.join(fixtures, 'tickerlist.txt')):
+            ticker_file = os.path.join(fixtures, 'tickerlist.txt')
+        offline = dict(provider=local_provider(fixtures), price_cache=None, base_snapshot=None,
+                       metadata_cache=None, requests_per_second=None)
+    elif provider != 'yfinance':
+        raise ValueError(f"Unknown provider {provider!r} (use yfinance or local)")
+    
+    settings = dict(
+        ticker_file=os.environ.get('PORTFOLIO_UNIVERSE', ticker_file),
+        base_date='2022-10-25',
+        price_cache='files/price_cache.csv',
+        refresh_prices=os.environ.get('PORTFOLIO_REFRESH_PRICES') == '1',
+        dataset_file='files/ai_portfolio_data.csv',
+        incremental=os.environ.get('PORTFOLIO_FULL_REBUILD') != '1',
+        base_snapshot='files/base_snapshot.json',
+        metadata_cache='files/company_metadata.json',
+        output_formats=[f for f in os.environ.get('PORTFOLIO_OUTPUT_FORMATS', '').split(',') if f],
+        dataset_layout=os.environ.get('PORTFOLIO_DATASET_LAYOUT', 'single'),
+        lean_chart=os.environ.get('PORTFOLIO_LEAN_CHART', '1') == '1',
+        # Opt-in analytics: each adds columns to the committed dataset
+        risk_windows=[int(w) for w in os.environ.get('PORTFOLIO_RISK_WINDOWS', '').split(',') if w],
+        risk_constituents=os.environ.get('PORTFOLIO_RISK_CONSTITUENTS') == '1',
+        strategies=[s for s in os.environ.get('PORTFOLIO_STRATEGIES', '').split(',') if s],
+        price_dtype=os.environ.get('PORTFOLIO_PRICE_DTYPE', 'float64'),
+        quality_checks=os.environ.get('PORTFOLIO_QUALITY_CHECKS', '1') == '1',
+        attribution=os.environ.get('PORTFOLIO_ATTRIBUTION', '1') == '1',
+        rebalance_schedules=[s for s in os.environ.get(
+            'PORTFOLIO_REBALANCE_SCHEDULES', '').split(',') if s],
+        rebalance_targets=[t for t in os.environ.get('PORTFOLIO_REBALANCE_TARGETS', 'fixed,equal').split(',') if t],
+        rebalance_cost_bps=float(os.environ.get('PORTFOLIO_REBALANCE_COST_BPS', '10'))
     )
+    settings.update(offline)
+    return PortfolioMonitor(**settings)
+
+
+def render_chart(dataset_file, html_filename, lean=True):
+    """
+    Re-render the chart from a saved dataset (no network, no yfinance)
     
-    # Step 1: Load ticker list
-    if not monitor.load_ticker_list():
-        print("Error: Failed to load ticker list")
-        return
+    Args:
+        dataset_file (str): Dataset CSV written by save_dataset
+        html_filename (str): Output HTML file
+        lean (bool): Write the lightweight chart page
     
-    # Step 2: Get market caps on base date for weighting
-    successful_tickers = monitor.get_market_caps_base_date()
-    if not successful_tickers:
-        print("Error: No market cap data retrieved")
-        return
+    Returns:
+        bool: True if the chart was written
+    """
+    monitor = PortfolioMonitor(dataset_file=dataset_file, lean_chart=lean)
+    if not monitor.load_dataset():
+        return False
+    monitor.create_interactive_chart(html_filename)
+    return True
+
+
+COMMANDS = {
+    'fetch': 'update the price cache and base-date snapshot only',
+    'compute': 'fetch and compute the portfolio series without writing outputs',
+    'save': 'compute and save the dataset and data feed (no chart)',
+    'chart': 'render the chart from an existing dataset, offline',
+    'all': 'full run: fetch, compute, save, chart and run report (default)'
+}
+
+# Pipeline stages each command runs after the weights are known (see run_stages)
+COMMAND_STAGES = {
+    'fetch': {'prices'},
+    'compute': {'portfolio'},
+    'save': {'portfolio', 'save'},
+    'all': {'portfolio', 'save', 'chart'}
+}
+
+
+def main(argv=None):
+    """Main execution function - less abstracted for easier modifications"""
+    parser = argparse.ArgumentParser(
+        description='AI Shocks Portfolio Monitor',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='commands:\n' + '\n'.join(f'  {name:<9}{help}' for name, help in COMMANDS.items())
+    )
+    parser.add_argument('command', nargs='?', default='all', choices=list(COMMANDS),
+                        help='Pipeline stages to run (default: all)')
+    parser.add_argument('--dataset', default='files/ai_portfolio_data.csv',
+                        help='Dataset the chart command renders from')
+    parser.add_argument('--chart-file', default='ai_portfolio_chart.html',
+                        help='Output HTML for the chart')
+    parser.add_argument('--provider', choices=['yfinance', 'local'],
+                        default=os.environ.get('PORTFOLIO_PROVIDER', 'yfinance'),
+                        help="Market data source; 'local' runs offline from fixtures (PORTFOLIO_PROVIDER)")
+    parser.add_argument('--fixtures', default=os.environ.get('PORTFOLIO_FIXTURES'),
+                        help='Fixture directory for --provider local (default: rebuilt from '
+                             'files/ai_portfolio_data.csv; PORTFOLIO_FIXTURES)')
+    args = parser.parse_args(argv)
     
-    # Step 3: Calculate portfolio weights
-    monitor.calculate_weights()
+    # Chart-only runs read the saved dataset and never import yfinance
+    if args.command == 'chart':
+        lean = os.environ.get('PORTFOLIO_LEAN_CHART', '1') == '1'
+        if not render_chart(args.dataset, args.chart_file, lean):
+            print("Error: Could not render chart from saved dataset")
+        return
     
-    # Step 4: Fetch portfolio data and calculate returns (includes S&P 500)
-    monitor.fetch_portfolio_data()
+    print("=" * 60)
+    print("AI SHOCKS PORTFOLIO MONITOR")
+    print("=" * 60)
     
-    # Step 5: Save dataset
-    monitor.save_dataset()
+    # Initialize portfolio monitor
+    monitor = build_monitor(args.provider, args.fixtures)
     
-    # Step 6: Create interactive chart with S&P 500 comparison
-    monitor.create_interactive_chart()
+    run = COMMAND_STAGES[args.command]
+    if not monitor.run_stages(run, chart_file=args.chart_file,
+                              report_file='ai_portfolio_run_report.json', print_report=True):
+        return
     
     print("\n" + "=" * 60)
-    print("ANALYSIS COMPLETE!")
+    print(f"{args.command.upper()} COMPLETE!" if args.command != 'all' else "ANALYSIS COMPLETE!")
     print("=" * 60)
-    print(f"Files created:")
-    print(f"  • ai_portfolio_data.csv - Main portfolio dataset with S&P 500 data")
-    print(f"  • ai_portfolio_data_weights.csv - Portfolio weights")
-    print(f"  • ai_portfolio_chart.html - Interactive chart with S&P 500 comparison")
-    if monitor.ticker_changes:
-        print(f"  • ai_portfolio_data_changes.csv - Ticker changes detected")
+    print("Files created:")
+    if monitor.price_cache and ('prices' in run or 'portfolio' in run):
+        print(f"  • {monitor.price_cache} - Cached daily prices")
+    if 'save' in run:
+        print("  • ai_portfolio_data.csv - Main portfolio dataset with S&P 500 data")
+        print("  • ai_portfolio_data_weights.csv - Portfolio weights")
+        print("  • ai_portfolio_data_state.json - Dataset build state for incremental runs")
+        if monitor.quality_report is not None:
+            print("  • ai_portfolio_data_quality.json - Data-quality flags from this run")
+        if monitor.constituent_risk is not None:
+            print("  • ai_portfolio_data_risk.csv - Latest rolling risk statistics per stock")
+    if 'chart' in run:
+        print(f"  • {args.chart_file} - Interactive chart with S&P 500 comparison")
+    if 'save' in run:
+        print("  • ai_portfolio_feed.json - Compact data feed of the chart series and summary")
+    print("  • ai_portfolio_run_report.json - Per-stage timing, memory and network report")
+    if 'save' in run and monitor.ticker_changes:
+        print("  • ai_portfolio_data_changes.csv - Ticker changes detected")
     
     print("\nYou can modify individual steps in main() for custom analysis.")
 
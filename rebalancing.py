@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Rebalancing schedules for the AI Shocks Portfolio Monitor
+
+The fixed-weight and daily-weighted portfolios both trade back to their
+target weights every day. This engine holds a target (any strategy in
+strategies.STRATEGIES) on other schedules and lets the weights drift with
+prices in between:
+
+  daily       trade back to target every day (the existing behaviour)
+  weekly      first trading day of each week
+  monthly     first trading day of each month
+  quarterly   first trading day of each quarter
+  threshold5  whenever the drifted weights are more than 5% turnover away
+              from target (any whole percentage, e.g. threshold10)
+
+Between two rebalances a position grows with its cumulative return, so
+holdings on every day come from one cumulative sum of log returns rather
+than a day-by-day loop. All schedules of a target are evaluated together
+as one (schedules x days x tickers) array. Threshold schedules find their
+rebalance days one rebalance at a time, scanning ahead in doubling blocks.
+
+Each rebalance reports its turnover (half the sum of absolute weight
+changes) and, with cost_bps, a transaction-cost drag of cost_bps per unit
+of value traded on the day of the trade.
+
+Holdings after a rebalance depend only on the days since, so a run can
+resume from each schedule's last rebalance (last_rebalance) instead of the
+base date, and schedule_totals / merge_totals carry the summary across runs.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from strategies import STRATEGIES, StrategyContext
+
+TRADING_DAYS_PER_YEAR = 252
+CALENDAR_SCHEDULES = {'daily': None, 'weekly': 'W', 'monthly': 'M', 'quarterly': 'Q'}
+THRESHOLD_SCHEDULE = re.compile(r'^threshold(\d+)$')
+
+
+def validate_schedules(schedules):
+    """Raise ValueError for schedule names the engine does not know"""
+    unknown = [s for s in schedules if s not in CALENDAR_SCHEDULES and not THRESHOLD_SCHEDULE.match(s)]
+    if unknown:
+        raise ValueError(f"Unknown rebalancing schedules: {', '.join(unknown)} "
+                         f"(use {', '.join(CALENDAR_SCHEDULES)} or thresholdN)")
+
+
+def calendar_flags(dates, schedule):
+    """
+    Rebalance days of a calendar schedule
+
+    Args:
+        dates (DatetimeIndex): Trading days
+        schedule (str): 'daily', 'weekly', 'monthly' or 'quarterly'
+
+    Returns:
+        ndarray: Boolean per day; the first day is always a rebalance
+    """
+    frequency = CALENDAR_SCHEDULES[schedule]
+    if frequency is None:
+        return np.ones(len(dates), dtype=bool)
+    periods = pd.DatetimeIndex(dates).to_period(frequency).asi8
+    return np.concatenate([[True], periods[1:] != periods[:-1]]) if len(periods) else np.zeros(0, dtype=bool)
+
+
+def threshold_flags(targets, log_wealth, threshold, block=64):
+    """
+    Rebalance days of a drift-threshold schedule
+
+    After each rebalance the drifted weights are compared with the target
+    for a block of following days at once; the first day whose turnover
+    back to target exceeds the threshold is the next rebalance. Blocks
+    double until a rebalance is found, so each day is scanned about once.
+
+    Args:
+        targets (ndarray): Target weights, days x tickers
+        log_wealth (ndarray): Cumulative log returns, days x tickers
+        threshold (float): Turnover that triggers a rebalance (0.05 = 5%)
+        block (int): Days scanned in the first block after a rebalance
+
+    Returns:
+        ndarray: Boolean per day
+    """
+    n_days = len(targets)
+    flags = np.zeros(n_days, dtype=bool)
+    start = 0
+    while start < n_days:
+        flags[start] = True
+        found = None
+        scanned, size = start + 1, block
+        while found is None and scanned < n_days:
+            stop = min(n_days, scanned + size)
+            # Holdings at the end of the previous day are the weights before trading
+            before = log_wealth[start - 1] if start > 0 else 0.0
+            holdings = targets[start] * np.exp(log_wealth[scanned - 1:stop - 1] - before)
+            totals = holdings.sum(axis=1, keepdims=True)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                drifted = np.where(totals > 0, holdings / totals, 0.0)
+            gap = 0.5 * np.abs(targets[scanned:stop] - drifted).sum(axis=1)
+            hits = np.flatnonzero(gap > threshold)
+            if hits.size:
+                found = scanned + hits[0]
+            scanned, size = stop, size * 2
+        if found is None:
+            break
+        start = found
+    return flags
+
+
+def evaluate_schedules(returns, targets, flags, cost_bps=0.0):
+    """
+    Daily results of holding targets on several rebalancing schedules
+
+    Args:
+        returns (ndarray): Daily returns, days x tickers (NaN = no return)
+        targets (ndarray): Target weights, days x tickers (the weights a
+            rebalance on that day trades to)
+        flags (ndarray): Rebalance days, schedules x days (first day True)
+        cost_bps (float): Transaction cost per unit of value traded, in basis points
+
+    Returns:
+        dict: Arrays (schedules x days) of 'return' (after costs),
+            'gross_return' and 'turnover'
+    """
+    n_days = len(returns)
+    log_wealth = np.cumsum(np.log1p(np.where(np.isnan(returns), 0.0, returns)), axis=0)
+    log_before = np.vstack([np.zeros((1, returns.shape[1])), log_wealth[:-1]])
+
+    # Last rebalance day on or before each day, per schedule
+    days = np.arange(n_days)
+    starts = np.maximum.accumulate(np.where(flags, days, 0), axis=1)
+
+    # Holdings at the end of each day, per unit invested at the last rebalance
+    holdings = targets[starts] * np.exp(log_wealth[None] - log_before[starts])
+    totals = holdings.sum(axis=2)
+    previous = np.concatenate([np.ones((len(flags), 1)), totals[:, :-1]], axis=1)
+    # A rebalance day starts from the target weights on one unit of capital,
+    # so its return is weights x returns as in the daily portfolios
+    rebalanced = starts == days
+    invested = np.where(rebalanced, targets.sum(axis=1)[None], previous)
+    capital = np.where(rebalanced, 1.0, previous)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        gross = np.where(capital > 0, (totals - invested) / capital, 0.0)
+
+        # Weights just before trading on each rebalance day (after the first)
+        prior = np.concatenate([np.zeros((len(flags), 1, returns.shape[1])), holdings[:, :-1]], axis=1)
+        prior_totals = prior.sum(axis=2, keepdims=True)
+        drifted = np.where(prior_totals > 0, prior / prior_totals, 0.0)
+    traded = np.where(flags & (days > 0), np.abs(targets[None] - drifted).sum(axis=2), 0.0)
+
+    cost = traded * cost_bps / 10_000
+    return {
+        'return': (1 + gross) * (1 - cost) - 1,
+        'gross_return': gross,
+        'turnover': traded / 2
+    }
+
+
+def schedule_flags(schedule, dates, weights, log_wealth, resume_at=None):
+    """
+    Rebalance days of one schedule, optionally resuming from a known rebalance
+
+    Args:
+        schedule (str): Schedule name (see module docstring)
+        dates (DatetimeIndex): Trading days
+        weights (ndarray): Target weights, days x tickers
+        log_wealth (ndarray): Cumulative log returns, days x tickers
+        resume_at (int): Position of a day known to be a rebalance (the last
+            one of an earlier run); days before it are not meaningful
+
+    Returns:
+        ndarray: Boolean per day; the first day is always a rebalance
+    """
+    if not len(dates):
+        return np.zeros(0, dtype=bool)
+    resume_at = resume_at or 0
+    if schedule in CALENDAR_SCHEDULES:
+        flags = calendar_flags(dates, schedule)
+        flags[1:resume_at] = False
+        flags[resume_at] = True
+        return flags
+
+    threshold = int(THRESHOLD_SCHEDULE.match(schedule).group(1)) / 100
+    flags = np.zeros(len(dates), dtype=bool)
+    flags[0] = True
+    before = log_wealth[resume_at - 1] if resume_at else 0.0
+    flags[resume_at:] = threshold_flags(weights[resume_at:], log_wealth[resume_at:] - before, threshold)
+    return flags
+
+
+def schedule_totals(results, name, rows=None):
+    """
+    Additive totals of one target/schedule, for summaries spanning several runs
+
+    Args:
+        results (DataFrame): Output of run_rebalancing
+        name (str): '{target}_{schedule}'
+        rows (slice or ndarray): Positions or boolean mask of the rows to total
+            (defaults to all)
+
+    Returns:
+        dict: days, rebalances, turnover, gross_growth and net_growth (products
+            of 1 + daily return) and last_rebalance (YYYY-MM-DD or None)
+    """
+    results = results if rows is None else results.iloc[rows]
+    rebalanced = results.index[results[f'{name}_rebalance'].to_numpy(dtype=bool)]
+    return {
+        'days': len(results),
+        'rebalances': len(rebalanced),
+        'turnover': float(results[f'{name}_turnover'].sum()),
+        'gross_growth': float(np.prod(1 + results[f'{name}_gross_return'].to_numpy())),
+        'net_growth': float(np.prod(1 + results[f'{name}_return'].to_numpy())),
+        'last_rebalance': rebalanced[-1].strftime('%Y-%m-%d') if len(rebalanced) else None
+    }
+
+
+def merge_totals(stored, new):
+    """Totals of two consecutive spans (see schedule_totals)"""
+    return {
+        'days': stored['days'] + new['days'],
+        'rebalances': stored['rebalances'] + new['rebalances'],
+        'turnover': stored['turnover'] + new['turnover'],
+        'gross_growth': stored['gross_growth'] * new['gross_growth'],
+        'net_growth': stored['net_growth'] * new['net_growth'],
+        'last_rebalance': new['last_rebalance'] or stored['last_rebalance']
+    }
+
+
+def summarize_totals(totals):
+    """Summary of one target/schedule from its totals"""
+    years = totals['days'] / TRADING_DAYS_PER_YEAR
+    gross, net = totals['gross_growth'] - 1, totals['net_growth'] - 1
+    return {
+        'rebalances': int(totals['rebalances']),
+        'turnover': round(float(totals['turnover']), 6),
+        'annual_turnover': round(float(totals['turnover'] / years), 6) if years else None,
+        'gross_return': round(float(gross), 6),
+        'net_return': round(float(net), 6),
+        'cost_drag': round(float(gross - net), 6)
+    }
+
+
+def run_rebalancing(prices, returns, base_weights, shares, targets, schedules, cost_bps=0.0,
+                    last_rebalance=None):
+    """
+    Every target strategy on every schedule, one array pass per target
+
+    Args:
+        prices (DataFrame): Prices, one column per ticker
+        returns (DataFrame): Daily returns for the days being scored
+        base_weights (dict): Ticker -> base-date weight
+        shares (dict): Ticker -> base-date shares outstanding
+        targets (list): Strategy names from strategies.STRATEGIES to rebalance to
+        schedules (list): Schedule names (see module docstring)
+        cost_bps (float): Transaction cost in basis points of value traded
+        last_rebalance (dict): '{target}_{schedule}' -> date of its last
+            rebalance in an earlier run, resuming from there; only days after
+            it are meaningful (None starts every schedule on the first day)
+
+    Returns:
+        tuple: (DataFrame indexed like returns with columns
+            {target}_{schedule}_return / _gross_return / _turnover / _rebalance,
+            dict of per-combination summaries)
+    """
+    validate_schedules(schedules)
+    unknown = [t for t in targets if t not in STRATEGIES]
+    if unknown:
+        raise ValueError(f"Unknown rebalancing targets: {', '.join(unknown)} "
+                         f"(registered: {', '.join(STRATEGIES)})")
+
+    context = StrategyContext(prices, returns, base_weights, shares)
+    log_wealth = np.cumsum(np.log1p(context.returns), axis=0)
+    last_rebalance = last_rebalance or {}
+
+    columns = {}
+    for target in targets:
+        weights = np.asarray(STRATEGIES[target]['weights'](context), dtype=float)
+        weights = np.broadcast_to(weights, context.returns.shape) if weights.ndim == 1 else weights
+
+        resume = {s: last_rebalance.get(f'{target}_{s}') for s in schedules}
+        resume = {s: None if date is None else context.index.get_loc(pd.Timestamp(date))
+                  for s, date in resume.items()}
+        flags = np.array([schedule_flags(s, context.index, weights, log_wealth, resume[s]) for s in schedules])
+        results = evaluate_schedules(context.returns, weights, flags, cost_bps)
+
+        for i, schedule in enumerate(schedules):
+            name = f'{target}_{schedule}'
+            for field, values in results.items():
+                columns[f'{name}_{field}'] = values[i]
+            columns[f'{name}_rebalance'] = flags[i]
+
+    frame = pd.DataFrame(columns, index=returns.index)
+    names = [f'{target}_{schedule}' for target in targets for schedule in schedules]
+    return frame, {name: summarize_totals(schedule_totals(frame, name)) for name in names}
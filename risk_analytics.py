@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Rolling risk analytics for the AI Shocks Portfolio Monitor
+
+Rolling annualized volatility, beta and correlation against a benchmark,
+Sharpe and Sortino ratios, and running drawdowns for daily return series.
+
+Window statistics come from running (prefix) sums, so sliding a window one
+day is O(1) and a whole series costs O(n) however long the window is. All
+functions work column-wise on a DataFrame of returns, so the portfolio
+series and every constituent ticker are handled in the same pass:
+
+    risk = rolling_risk(returns, benchmark=spy_returns, windows=(21, 63, 252))
+    risk['portfolio_vol_63d']
+
+A window value is only reported once the window holds `window` valid
+(non-NaN) observations; earlier rows are NaN.
+"""
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS_PER_YEAR = 252
+DEFAULT_WINDOWS = (21, 63, 252)
+WINDOW_METRICS = ('vol', 'beta', 'corr', 'sharpe', 'sortino')
+
+
+def window_sums(values, window):
+    """
+    Sum of each trailing window of rows, from one cumulative sum
+
+    Args:
+        values (ndarray): 2-D array (rows are days); NaNs count as 0
+        window (int): Window length in rows
+
+    Returns:
+        ndarray: Same shape as values; the first window - 1 rows are NaN
+    """
+    values = np.nan_to_num(np.asarray(values, dtype=float))
+    cumulative = np.zeros((len(values) + 1,) + values.shape[1:])
+    np.cumsum(values, axis=0, out=cumulative[1:])
+
+    sums = np.full(values.shape, np.nan)
+    if window <= len(values):
+        sums[window - 1:] = cumulative[window:] - cumulative[:-window]
+    return sums
+
+
+def drawdowns(returns):
+    """
+    Drawdown from the running peak and the running maximum drawdown
+
+    Args:
+        returns (DataFrame): Daily returns, one column per series (NaN = no change)
+
+    Returns:
+        tuple: (drawdown, max_drawdown) arrays, both <= 0
+    """
+    wealth = np.cumprod(1 + np.nan_to_num(returns.to_numpy(dtype=float)), axis=0)
+    drawdown = wealth / np.maximum.accumulate(wealth, axis=0) - 1
+    return drawdown, np.minimum.accumulate(drawdown, axis=0)
+
+
+def rolling_risk(returns, benchmark=None, windows=DEFAULT_WINDOWS,
+                 periods_per_year=TRADING_DAYS_PER_YEAR, risk_free_rate=0.0):
+    """
+    Rolling risk statistics for every column of returns
+
+    Args:
+        returns (DataFrame): Daily returns, one column per series
+        benchmark (Series): Benchmark daily returns for beta and correlation
+            (None skips them)
+        windows (tuple): Window lengths in trading days
+        periods_per_year (int): Annualization factor
+        risk_free_rate (float): Annual risk-free rate for Sharpe and Sortino
+
+    Returns:
+        DataFrame: Same index as returns, with columns {series}_drawdown,
+            {series}_max_drawdown and {series}_{metric}_{window}d for each
+            metric in WINDOW_METRICS (beta/corr only with a benchmark)
+    """
+    r = returns.to_numpy(dtype=float)
+    valid = ~np.isnan(r)
+    excess = r - risk_free_rate / periods_per_year
+    downside = np.where(valid, np.minimum(excess, 0), 0) ** 2
+
+    if benchmark is not None:
+        b = benchmark.reindex(returns.index).to_numpy(dtype=float)[:, None]
+        # Beta and correlation only use days where both series have a return
+        joint = valid & ~np.isnan(b)
+        r_joint = np.where(joint, r, 0)
+        b_joint = np.where(joint, b, 0)
+
+    drawdown, max_drawdown = drawdowns(returns)
+    columns = {}
+    for i, name in enumerate(returns.columns):
+        columns[f'{name}_drawdown'] = drawdown[:, i]
+        columns[f'{name}_max_drawdown'] = max_drawdown[:, i]
+
+    annualize = np.sqrt(periods_per_year)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for window in windows:
+            full = window_sums(valid, window) == window
+            s1 = window_sums(r, window)
+            s2 = window_sums(r ** 2, window)
+            variance = np.maximum(s2 - s1 ** 2 / window, 0) / (window - 1)
+            std = np.sqrt(variance)
+            mean_excess = window_sums(excess, window) / window
+            downside_dev = np.sqrt(window_sums(downside, window) / window)
+
+            stats = {
+                'vol': std * annualize,
+                'sharpe': mean_excess / std * annualize,
+                'sortino': mean_excess / downside_dev * annualize
+            }
+            stats = {metric: np.where(full, values, np.nan) for metric, values in stats.items()}
+
+            if benchmark is not None:
+                joint_full = window_sums(joint, window) == window
+                sx, sy = window_sums(r_joint, window), window_sums(b_joint, window)
+                covariance = (window_sums(r_joint * b_joint, window) - sx * sy / window) / (window - 1)
+                var_x = np.maximum(window_sums(r_joint ** 2, window) - sx ** 2 / window, 0) / (window - 1)
+                var_y = np.maximum(window_sums(b_joint ** 2, window) - sy ** 2 / window, 0) / (window - 1)
+                stats['beta'] = np.where(joint_full, covariance / var_y, np.nan)
+                stats['corr'] = np.where(joint_full, covariance / np.sqrt(var_x * var_y), np.nan)
+
+            for metric in WINDOW_METRICS:
+                if metric not in stats:
+                    continue
+                values = stats[metric]
+                values[~np.isfinite(values)] = np.nan
+                for i, name in enumerate(returns.columns):
+                    columns[f'{name}_{metric}_{window}d'] = values[:, i]
+
+    return pd.DataFrame(columns, index=returns.index)
+
+
+def latest_snapshot(risk, names):
+    """
+    Most recent value of every statistic, one row per series
+
+    Args:
+        risk (DataFrame): Output of rolling_risk
+        names (list): Series names (column prefixes) to include
+
+    Returns:
+        DataFrame: Index of names, one column per statistic
+    """
+    last = risk.iloc[-1]
+    rows = {}
+    for name in names:
+        prefix = f'{name}_'
+        rows[name] = {column[len(prefix):]: last[column] for column in risk.columns
+                      if column.startswith(prefix)}
+    return pd.DataFrame.from_dict(rows, orient='index')
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Per-stage run instrumentation for the AI Shocks Portfolio Monitor
+
+A RunReport times each stage of a run and records, per stage: wall time,
+CPU time, how much the stage raised the process's peak RSS, provider
+calls, bytes received over HTTP, retries and rows produced. Counters are
+read from a NetworkStats object that the monitor updates on every provider
+call and the managed HTTP session updates on every response; the report
+stores the change during each stage.
+
+Work started in the background (the overlapped price download and name
+check) runs while foreground stages are timed, so its traffic is counted
+separately: code inside NetworkStats.phase(name) counts under that phase,
+and RunReport.add_phase adds it to the report as a stage of its own.
+
+    report = RunReport(stats)
+    with report.stage('fetch_portfolio_data') as stage:
+        ...
+        stage['rows'] = len(data)
+    report.write_json('ai_portfolio_run_report.json')
+    report.print_table()
+"""
+
+import contextvars
+import json
+import platform
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# Background phase the current thread's traffic is counted under (None: foreground)
+_phase = contextvars.ContextVar('network_phase', default=None)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (None if unavailable)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def payload_bytes(result):
+    """Approximate decoded (in-memory) size of a provider result"""
+    if result is None:
+        return 0
+    if hasattr(result, 'memory_usage'):
+        usage = result.memory_usage(deep=True)
+        return int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+    return len(str(result).encode())
+
+
+def carry_phase(func):
+    """Wrap func so pool threads running it count traffic under the caller's phase"""
+    phase = _phase.get()
+    if phase is None:
+        return func
+
+    def run(*args, **kwargs):
+        token = _phase.set(phase)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _phase.reset(token)
+    return run
+
+
+class NetworkStats:
+    """Thread-safe counters for provider traffic"""
+
+    # bytes_received counts response bodies from the HTTP session (bytes on
+    # the wire); payload_bytes is the decoded size of what providers returned
+    FIELDS = ('provider_calls', 'payload_bytes', 'bytes_received', 'retries', 'failures',
+              'http_requests', 'http_failures', 'circuit_rejections')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = dict.fromkeys(self.FIELDS, 0)
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name):
+        """Count traffic in the enclosed block under a background phase"""
+        token = _phase.set(name)
+        try:
+            yield
+        finally:
+            _phase.reset(token)
+
+    def add(self, field, amount=1):
+        phase = _phase.get()
+        with self._lock:
+            if phase is None:
+                self.counts[field] += amount
+            else:
+                self.phases.setdefault(phase, dict.fromkeys(self.FIELDS, 0))[field] += amount
+
+    def snapshot(self, phase=None):
+        """Foreground counts, or those of one background phase"""
+        with self._lock:
+            if phase is None:
+                return dict(self.counts)
+            return dict(self.phases.get(phase, dict.fromkeys(self.FIELDS, 0)))
+
+
+class RunReport:
+    """Collects per-stage measurements for one run"""
+
+    def __init__(self, stats=None):
+        """
+        Args:
+            stats (NetworkStats): Counters to attribute to stages (optional)
+        """
+        self.stats = stats if stats is not None else NetworkStats()
+        # SessionStats of the managed HTTP session, summarised per endpoint
+        self.http_stats = None
+        self.stages = []
+        self.started = datetime.now()
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Measure the enclosed block as one stage
+
+        Yields a dict the caller can add fields to, such as 'rows'.
+        """
+        record = {'stage': name, 'rows': None}
+        before = self.stats.snapshot()
+        start_peak = peak_rss_mb()
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield record
+        finally:
+            record['wall_seconds'] = round(time.perf_counter() - start_wall, 4)
+            record['cpu_seconds'] = round(time.process_time() - start_cpu, 4)
+            # ru_maxrss only ever grows: the process-wide high-water mark so
+            # far, and how much this stage raised it
+            peak = peak_rss_mb()
+            record['process_peak_rss_mb'] = round(peak, 1) if peak is not None else None
+            record['peak_rss_growth_mb'] = round(peak - start_peak, 1) if peak is not None else None
+            after = self.stats.snapshot()
+            for field in NetworkStats.FIELDS:
+                record[field] = after[field] - before[field]
+            self.stages.append(record)
+
+    def add_phase(self, name, wall_seconds, rows=None):
+        """
+        Record a background phase as a stage of its own
+
+        Its wall time overlapped the foreground stages, so it is left out of
+        the total; CPU time and memory are process-wide and stay with the
+        foreground stages that were running.
+
+        Args:
+            name (str): Phase name used with NetworkStats.phase
+            wall_seconds (float): How long the phase ran
+            rows (int): Rows it produced (optional)
+        """
+        record = {'stage': f'{name} (background)', 'background': True, 'rows': rows,
+                  'wall_seconds': round(wall_seconds, 4), 'cpu_seconds': None,
+                  'process_peak_rss_mb': None, 'peak_rss_growth_mb': None}
+        record.update(self.stats.snapshot(name))
+        self.stages.append(record)
+
+    def to_dict(self):
+        foreground = [s for s in self.stages if not s.get('background')]
+        totals = {
+            'wall_seconds': round(sum(s['wall_seconds'] for s in foreground), 4),
+            'cpu_seconds': round(sum(s['cpu_seconds'] for s in foreground), 4),
+            'process_peak_rss_mb': max((s['process_peak_rss_mb'] or 0 for s in self.stages), default=None),
+            'peak_rss_growth_mb': round(sum(s['peak_rss_growth_mb'] or 0 for s in self.stages), 1),
+        }
+        for field in NetworkStats.FIELDS:
+            totals[field] = sum(s[field] for s in self.stages)
+        report = {
+            'started': self.started.strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'stages': self.stages,
+            'totals': totals,
+        }
+        if self.http_stats is not None:
+            report['http_endpoints'] = self.http_stats.summary()
+        return report
+
+    def write_json(self, filename):
+        """Write the report as JSON"""
+        with open(filename, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def print_table(self):
+        """Print the report as a plain-text table"""
+        header = (f"{'Stage':<28}{'Wall s':>9}{'CPU s':>9}{'Peak +MB':>10}"
+                  f"{'Calls':>7}{'KB in':>10}{'Retry':>7}{'Rows':>8}")
+        print(header)
+        print('-' * len(header))
+        report = self.to_dict()
+        for s in report['stages'] + [dict(report['totals'], stage='TOTAL', rows=None)]:
+            growth = f"{s['peak_rss_growth_mb']:.0f}" if s['peak_rss_growth_mb'] is not None else '-'
+            cpu = f"{s['cpu_seconds']:.2f}" if s['cpu_seconds'] is not None else '-'
+            rows = s['rows'] if s['rows'] is not None else '-'
+            print(f"{s['stage']:<28}{s['wall_seconds']:>9.2f}{cpu:>9}{growth:>10}"
+                  f"{s['provider_calls']:>7}{s['bytes_received'] / 1024:>10.1f}{s['retries']:>7}{rows:>8}")
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Portfolio weighting strategies for the AI Shocks Portfolio Monitor
+
+A strategy maps a StrategyContext (one shared price/return matrix for the
+whole universe) to portfolio weights: either one constant weight per
+ticker, or a days x tickers matrix of weights held at the start of each
+day. run_strategies() evaluates any number of registered strategies
+against the same matrices, so each extra strategy costs one matrix
+product rather than another download and pipeline run.
+
+Built-in strategies:
+
+  fixed               base-date market-cap weights, held constant
+  market_cap          reweighted daily by previous close x base-date shares
+  equal               1/N
+  capped_market_cap   daily market-cap weights, no ticker above 10%
+  inverse_vol         weights proportional to 1 / trailing 63-day volatility
+
+New strategies are added with the register_strategy decorator:
+
+    @register_strategy('momentum', 'Momentum (12-1)', lookback=252)
+    def momentum(context):
+        ...
+        return weight_matrix
+
+A strategy's lookback is how many earlier rows a day's weights depend on,
+so an incremental run can score new days from a short window of history;
+strategies registered without one are always given the whole history.
+"""
+
+import numpy as np
+import pandas as pd
+
+from risk_analytics import window_sums
+
+STRATEGIES = {}
+
+
+def register_strategy(name, label=None, lookback=None):
+    """
+    Register a weighting function under name
+
+    The function takes a StrategyContext and returns a 1-D array of constant
+    weights (one per ticker) or a 2-D array of daily weights (days x tickers).
+
+    Args:
+        name (str): Strategy key used in dataset columns, e.g. strategy_{name}_value
+        label (str): Display name for charts (defaults to name)
+        lookback (int): Rows before a day that its weights depend on (None
+            if they depend on the whole history, e.g. on the first day)
+    """
+    def decorator(func):
+        STRATEGIES[name] = {'label': label or name, 'weights': func, 'lookback': lookback}
+        return func
+    return decorator
+
+
+def history_needed(names):
+    """
+    Rows of history the named strategies need before the first day scored
+
+    Returns:
+        int: Largest lookback, or None if any strategy needs the whole history
+    """
+    lookbacks = [STRATEGIES[name]['lookback'] for name in names]
+    return None if None in lookbacks else max(lookbacks, default=0)
+
+
+class StrategyContext:
+    """Shared inputs every strategy reads; built once per batch"""
+
+    def __init__(self, prices, returns, base_weights, shares):
+        """
+        Args:
+            prices (DataFrame): Prices, one column per ticker
+            returns (DataFrame): Daily returns for the days being scored
+            base_weights (dict): Ticker -> base-date weight (defines the universe)
+            shares (dict): Ticker -> shares outstanding on the base date
+        """
+        self.tickers = list(base_weights.keys())
+        self.index = returns.index
+        self.base_weights = np.array([base_weights[t] for t in self.tickers], dtype=float)
+        self.shares = np.array([shares.get(t, np.nan) for t in self.tickers], dtype=float)
+
+        returns = returns.reindex(columns=self.tickers).to_numpy(dtype=float)
+        self.valid = ~np.isnan(returns)
+        self.returns = np.where(self.valid, returns, 0.0)
+
+        # Prices on the previous row of the return index (known at the open)
+        price_matrix = prices.reindex(index=self.index, columns=self.tickers).to_numpy(dtype=float)
+        self.prev_prices = np.vstack([np.full((1, len(self.tickers)), np.nan), price_matrix[:-1]])
+
+    def normalize(self, raw):
+        """Scale non-negative raw scores to weights summing to 1 per row (0 where all missing)"""
+        raw = np.where(np.isfinite(raw) & (raw > 0), raw, 0.0)
+        total = raw.sum(axis=-1, keepdims=True)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(total > 0, raw / total, 0.0)
+
+
+def cap_weights(weights, max_weight):
+    """
+    Cap every weight at max_weight, spreading the excess pro rata over the rest
+
+    Args:
+        weights (ndarray): Weights summing to 1 along the last axis
+        max_weight (float): Largest allowed weight
+
+    Returns:
+        ndarray: Capped weights, same shape
+    """
+    weights = np.array(weights, dtype=float)
+    for _ in range(weights.shape[-1]):
+        excess = np.maximum(weights - max_weight, 0).sum(axis=-1, keepdims=True)
+        if not (excess > 1e-12).any():
+            break
+        weights = np.minimum(weights, max_weight)
+        room = np.where(weights < max_weight, weights, 0.0)
+        room_total = room.sum(axis=-1, keepdims=True)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weights = weights + np.where(room_total > 0, excess * room / room_total, 0.0)
+    return weights
+
+
+@register_strategy('fixed', 'Fixed Base-Date Weights', lookback=0)
+def fixed(context):
+    return context.base_weights
+
+
+@register_strategy('market_cap', 'Daily Market-Cap Weights', lookback=1)
+def market_cap(context):
+    weights = context.normalize(context.prev_prices * context.shares)
+    if len(weights):
+        weights[0] = context.base_weights
+    return weights
+
+
+@register_strategy('equal', 'Equal Weight', lookback=0)
+def equal(context):
+    return np.full(len(context.tickers), 1.0 / len(context.tickers))
+
+
+@register_strategy('capped_market_cap', 'Capped Market-Cap (10%)', lookback=1)
+def capped_market_cap(context, max_weight=0.10):
+    return cap_weights(market_cap(context), max_weight)
+
+
+@register_strategy('inverse_vol', 'Inverse Volatility (63d)', lookback=63)
+def inverse_vol(context, window=63):
+    # Trailing volatility up to the previous day, so there is no look-ahead
+    returns = np.vstack([np.zeros((1, len(context.tickers))), context.returns[:-1]])
+    valid = np.vstack([np.zeros((1, len(context.tickers)), dtype=bool), context.valid[:-1]])
+    s1 = window_sums(returns, window)
+    s2 = window_sums(returns ** 2, window)
+    std = np.sqrt(np.maximum(s2 - s1 ** 2 / window, 0) / (window - 1))
+    std = np.where(window_sums(valid, window) == window, std, np.nan)
+
+    with np.errstate(divide='ignore'):
+        weights = context.normalize(1 / std)
+    # Equal weight until a full window of history exists
+    weights[weights.sum(axis=1) == 0] = 1.0 / len(context.tickers)
+    return weights
+
+
+def run_strategies(prices, returns, base_weights, shares, names=None):
+    """
+    Daily returns of several strategies from one shared return matrix
+
+    Constant-weight strategies are stacked into one weight matrix and scored
+    with a single matrix product; daily-weight strategies take one row-wise
+    product each. Missing returns contribute nothing on that day.
+
+    Args:
+        prices (DataFrame): Prices, one column per ticker
+        returns (DataFrame): Daily returns for the days being scored
+        base_weights (dict): Ticker -> base-date weight
+        shares (dict): Ticker -> base-date shares outstanding
+        names (list): Registered strategy names (defaults to all)
+
+    Returns:
+        DataFrame: Daily returns, one column per strategy, indexed like returns
+    """
+    names = list(STRATEGIES) if names is None else list(names)
+    unknown = [n for n in names if n not in STRATEGIES]
+    if unknown:
+        raise ValueError(f"Unknown strategies: {', '.join(unknown)} "
+                         f"(registered: {', '.join(STRATEGIES)})")
+
+    context = StrategyContext(prices, returns, base_weights, shares)
+    weights = {name: np.asarray(STRATEGIES[name]['weights'](context), dtype=float) for name in names}
+
+    results = {}
+    constant = [name for name in names if weights[name].ndim == 1]
+    if constant:
+        scored = context.returns @ np.column_stack([weights[name] for name in constant])
+        results.update(zip(constant, scored.T))
+    for name in names:
+        if weights[name].ndim == 2:
+            results[name] = np.einsum('ij,ij->i', weights[name], context.returns)
+
+    return pd.DataFrame({name: results[name] for name in names}, index=returns.index)
@@ -0,0 +1,87 @@
+"""Background network phases: traffic attribution and joining"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from market_data import LocalProvider
+from portfolio_monitor import PortfolioMonitor
+from run_report import NetworkStats, RunReport, carry_phase
+
+
+def test_phase_traffic_is_kept_out_of_foreground_stages():
+    stats = NetworkStats()
+    report = RunReport(stats)
+
+    def background():
+        with stats.phase('prices'):
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                list(pool.map(carry_phase(lambda _: stats.add('provider_calls')), range(8)))
+
+    with report.stage('get_market_caps_base_date'):
+        worker = threading.Thread(target=background)
+        worker.start()
+        stats.add('provider_calls', 3)
+        worker.join()
+    report.add_phase('prices', 1.5, rows=10)
+
+    caps, prices = report.to_dict()['stages']
+    assert caps['provider_calls'] == 3
+    assert prices['stage'] == 'prices (background)' and prices['provider_calls'] == 8
+    totals = report.to_dict()['totals']
+    assert totals['provider_calls'] == 11
+    # Background wall time overlapped the foreground stage
+    assert totals['wall_seconds'] == caps['wall_seconds']
+
+
+class SlowProvider(LocalProvider):
+    """Local data with slow downloads that records overlapping calls"""
+
+    def _set_frames(self, prices, fundamentals):
+        super()._set_frames(prices, fundamentals)
+        self.active = 0
+        self.most_active = 0
+        self.lock = threading.Lock()
+
+    def download_prices(self, tickers, start_date, end_date):
+        with self.lock:
+            self.active += 1
+            self.most_active = max(self.most_active, self.active)
+        time.sleep(0.2)
+        try:
+            return super().download_prices(tickers, start_date, end_date)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def test_fallback_waits_for_background_download(tmp_path):
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range('2022-10-25', periods=30, name='date')
+    prices = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.01, (30, 3)), axis=0)),
+                          index=dates, columns=['A', 'B', 'SPY'])
+    fundamentals = pd.DataFrame({'ticker': ['A', 'B'], 'shares_outstanding': 1e6,
+                                 'company_name': ['A', 'B']})
+    provider = SlowProvider.from_frames(prices, fundamentals)
+    monitor = PortfolioMonitor(price_cache=str(tmp_path / 'price_cache.csv'), provider=provider,
+                               metadata_cache=None, requests_per_second=None, overlap_fetch=True)
+    monitor.tickers_df = fundamentals[['ticker', 'company_name']]
+    monitor.run_report = RunReport(monitor.network_stats)
+
+    monitor.start_network_phases(names=False)
+    # The date moved on since the background download started (e.g. past midnight)
+    tomorrow = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+    loaded = monitor.load_price_history(['A', 'B', 'SPY'], '2022-10-25', tomorrow)
+
+    assert provider.most_active == 1
+    pd.testing.assert_frame_equal(loaded, prices, check_freq=False)
+
+    monitor.finish_network_phases()
+    assert monitor._background_executor is None
+    phase, = monitor.run_report.stages
+    assert phase['stage'] == 'prices (background)' and phase['rows'] == 30
+    assert phase['provider_calls'] == 1
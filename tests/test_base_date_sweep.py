@@ -0,0 +1,109 @@
+"""Base-date sweep: vectorized scoring, screening and the committed files"""
+
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from base_date_sweep import load_inputs, score_base_dates, summarize, sweep_base_dates, sweep_monitor
+from market_data import LocalProvider, synthetic_panel, write_synthetic_fixture
+
+
+def panel(n_tickers=6, n_days=120, seed=0):
+    prices, fundamentals = synthetic_panel(n_tickers=n_tickers, n_days=n_days, seed=seed)
+    shares = fundamentals.set_index('ticker')['shares_outstanding'].to_dict()
+    return prices, shares
+
+
+def brute_force(prices, shares, base_date):
+    """Fixed-weight cumulative return from base_date, one loop per day"""
+    tickers = list(shares)
+    row = prices.loc[base_date, tickers]
+    caps = {t: row[t] * shares[t] for t in tickers if not np.isnan(row[t])}
+    weights = {t: cap / sum(caps.values()) for t, cap in caps.items()}
+    wealth = 1.0
+    held = prices.loc[prices.index > base_date, tickers]
+    previous = row
+    for _, today in held.iterrows():
+        daily = sum(w * (today[t] / previous[t] - 1) for t, w in weights.items()
+                    if not np.isnan(today[t] / previous[t]))
+        wealth *= 1 + daily
+        previous = today
+    return wealth - 1
+
+
+def test_sweep_matches_brute_force():
+    prices, shares = panel()
+    sweep = sweep_base_dates(prices, shares, prices.index[0], workers=1).set_index('base_date')
+
+    for base_date in prices.index[[0, 10, 60, -2]]:
+        assert np.isclose(sweep.loc[base_date, 'cumulative_return'], brute_force(prices, shares, base_date))
+    spy = prices['SPY']
+    assert np.isclose(sweep.loc[prices.index[10], 'benchmark_return'], spy.iloc[-1] / spy.iloc[10] - 1)
+
+
+def test_worker_pool_matches_single_process():
+    prices, shares = panel()
+    single = sweep_base_dates(prices, shares, prices.index[0], workers=1, chunk_size=16)
+    pooled = sweep_base_dates(prices, shares, prices.index[0], workers=2, chunk_size=16)
+    pd.testing.assert_frame_equal(single, pooled)
+
+
+def test_base_date_without_prices_holds_nothing():
+    returns = np.array([[np.nan, np.nan], [0.1, 0.2], [0.1, -0.1]])
+    prices = np.array([[np.nan, np.nan], [1.1, 1.2], [1.21, 1.08]])
+    scores = score_base_dates(returns, prices, np.array([10.0, 5.0]), np.array([0, 1]))
+
+    assert not np.isnan(scores['cumulative_return']).any()
+    assert scores['cumulative_return'][0] == 0
+    assert scores['stocks'].tolist() == [0, 2]
+
+
+def test_bad_print_is_screened_out():
+    prices, shares = panel()
+    ticker = next(iter(shares))
+    spiked = prices.copy()
+    spiked.iloc[50, spiked.columns.get_loc(ticker)] *= 5
+
+    clean = sweep_base_dates(prices, shares, prices.index[0], workers=1)
+    screened = sweep_base_dates(spiked, shares, prices.index[0], workers=1)
+    # Only the dropped day's return is lost; a raw pct_change would add +400% then -80%
+    assert np.allclose(screened['cumulative_return'].iloc[:40], clean['cumulative_return'].iloc[:40], atol=0.05)
+
+
+def test_summary_locates_reference_date():
+    prices, shares = panel()
+    sweep = sweep_base_dates(prices, shares, prices.index[0], workers=1)
+    reference = prices.index[30].strftime('%Y-%m-%d')
+    summary = summarize(sweep, reference_date=reference)
+
+    assert summary['base_dates'] == len(prices) - 1
+    assert summary['reference']['values']['cumulative_return'] == sweep['cumulative_return'].iloc[30]
+    rank = summary['reference']['percentile_rank']['cumulative_return']
+    assert rank == (sweep['cumulative_return'] < sweep['cumulative_return'].iloc[30]).mean() * 100
+
+
+def test_sweep_leaves_committed_files_alone(tmp_path, monkeypatch):
+    fixture = tmp_path / 'fixture'
+    write_synthetic_fixture(str(fixture), n_tickers=4, n_days=60, start_date='2022-10-03')
+    monkeypatch.chdir(tmp_path)
+    shutil.copyfile(fixture / 'tickerlist.txt', 'tickerlist.txt')
+    os.makedirs('files')
+    # Committed cache starts at the base date, so an earlier --start rebuilds it
+    cached = pd.read_csv(fixture / 'prices.csv', index_col=0, parse_dates=True).loc['2022-10-25':]
+    cached.to_csv('files/price_cache.csv', date_format='%Y-%m-%d')
+    with open('files/base_snapshot.json', 'w') as f:
+        f.write('{}')
+    committed = {name: open(os.path.join('files', name), 'rb').read() for name in os.listdir('files')}
+
+    workdir = tmp_path / 'scratch'
+    workdir.mkdir()
+    monitor = sweep_monitor('yfinance', str(workdir))
+    monitor._provider = LocalProvider(str(fixture / 'prices.csv'), str(fixture / 'fundamentals.csv'))
+    prices, shares = load_inputs(monitor, '2022-10-03')
+
+    assert prices.index[0] == pd.Timestamp('2022-10-03')
+    assert len(shares) == 4
+    assert {name: open(os.path.join('files', name), 'rb').read() for name in os.listdir('files')} == committed
+    assert os.path.getsize(workdir / 'base_snapshot.json') > 2
@@ -0,0 +1,82 @@
+"""Base-date snapshot: frozen market caps are reused, estimated ones are not"""
+
+import json
+
+from market_data import LocalProvider, synthetic_panel, write_synthetic_fixture
+from portfolio_monitor import PortfolioMonitor
+
+
+class FlakyShares(LocalProvider):
+    """Fails one ticker's shares-outstanding request until healed"""
+
+    def __init__(self, provider, ticker):
+        self.__dict__.update(provider.__dict__)
+        self.flaky_ticker = ticker
+        self.healed = False
+        self.share_requests = []
+
+    def get_shares_outstanding(self, ticker):
+        self.share_requests.append(ticker)
+        if ticker == self.flaky_ticker and not self.healed:
+            raise ConnectionError('timed out')
+        return super().get_shares_outstanding(ticker)
+
+
+def run(tmp_path, provider):
+    monitor = PortfolioMonitor(ticker_file=str(tmp_path / 'fixture' / 'tickerlist.txt'), provider=provider,
+                               base_snapshot=str(tmp_path / 'base_snapshot.json'), price_cache=None,
+                               metadata_cache=None, overlap_fetch=False, max_retries=0,
+                               requests_per_second=None)
+    monitor.load_ticker_list()
+    monitor.get_market_caps_base_date()
+    monitor.calculate_weights()
+    return monitor
+
+
+def test_estimated_market_cap_is_refetched(tmp_path):
+    write_synthetic_fixture(str(tmp_path / 'fixture'), n_tickers=5, n_days=30)
+    _, fundamentals = synthetic_panel(n_tickers=5, n_days=30)
+    provider = FlakyShares(LocalProvider(str(tmp_path / 'fixture' / 'prices.csv'),
+                                         str(tmp_path / 'fixture' / 'fundamentals.csv')), 'T0002')
+
+    first = run(tmp_path, provider)
+    assert first.market_caps['T0002']['estimated']
+    with open(tmp_path / 'base_snapshot.json') as f:
+        snapshot = json.load(f)
+    assert 'T0002' not in snapshot['tickers']
+    assert set(snapshot['tickers']) == {'T0001', 'T0003', 'T0004', 'T0005'}
+
+    # The next run reads the frozen tickers from disk and fetches only the estimate again
+    provider.healed = True
+    provider.share_requests.clear()
+    second = run(tmp_path, provider)
+    assert provider.share_requests == ['T0002']
+    assert not second.market_caps['T0002']['estimated']
+    shares = fundamentals.set_index('ticker')['shares_outstanding']
+    entry = second.market_caps['T0002']
+    assert entry['market_cap'] == entry['price'] * shares['T0002']
+    with open(tmp_path / 'base_snapshot.json') as f:
+        assert 'T0002' in json.load(f)['tickers']
+
+
+def test_edited_ticker_line_is_refetched(tmp_path):
+    write_synthetic_fixture(str(tmp_path / 'fixture'), n_tickers=4, n_days=30)
+    provider = FlakyShares(LocalProvider(str(tmp_path / 'fixture' / 'prices.csv'),
+                                         str(tmp_path / 'fixture' / 'fundamentals.csv')), None)
+    run(tmp_path, provider)
+
+    # Unchanged list: everything comes from the snapshot
+    provider.share_requests.clear()
+    run(tmp_path, provider)
+    assert provider.share_requests == []
+
+    # With one line dropped and one edited (share class), only the edited line is fetched
+    tickerlist = tmp_path / 'fixture' / 'tickerlist.txt'
+    lines = tickerlist.read_text().splitlines(keepends=True)[1:]
+    tickerlist.write_text(''.join(lines).replace(
+        'SYNTHETIC COMPANY T0003 INC', 'SYNTHETIC COMPANY T0003 INC CLASS B'))
+    provider.share_requests.clear()
+    third = run(tmp_path, provider)
+    assert provider.share_requests == ['T0003']
+    assert list(third.market_caps) == ['T0002', 'T0003', 'T0004']
+    assert third.market_caps['T0003']['company_name'] == 'SYNTHETIC COMPANY T0003 INC CLASS B'
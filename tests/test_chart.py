@@ -0,0 +1,57 @@
+"""Lean chart output and LTTB downsampling"""
+
+import json
+
+import numpy as np
+
+from market_data import LocalProvider, synthetic_panel
+from portfolio_monitor import PortfolioMonitor, lttb_indices
+
+
+def test_lttb_keeps_endpoints_and_threshold():
+    rng = np.random.default_rng(0)
+    values = np.cumsum(rng.normal(0, 1, 5000))
+    keep = lttb_indices(values, 300)
+    assert len(keep) == 300
+    assert keep[0] == 0 and keep[-1] == len(values) - 1
+    assert (np.diff(keep) > 0).all()
+
+
+def test_lttb_keeps_extremes():
+    values = np.zeros(1000)
+    values[437], values[612] = 50.0, -50.0
+    keep = lttb_indices(values, 20)
+    assert 437 in keep and 612 in keep
+
+
+def test_lttb_short_input_passes_through():
+    values = np.arange(10.0)
+    assert lttb_indices(values, 10).tolist() == list(range(10))
+    assert lttb_indices(values, 50).tolist() == list(range(10))
+    assert lttb_indices(values, None).tolist() == list(range(10))
+
+
+def test_lean_chart_downsamples_lines_only(tmp_path):
+    prices, fundamentals = synthetic_panel(n_tickers=4, n_days=400, seed=1)
+    fundamentals[['ticker', 'company_name']].to_csv(tmp_path / 'tickerlist.txt', sep='\t',
+                                                    header=False, index=False)
+    monitor = PortfolioMonitor(ticker_file=str(tmp_path / 'tickerlist.txt'),
+                               base_date=prices.index[0].strftime('%Y-%m-%d'), price_cache=None,
+                               base_snapshot=None, metadata_cache=None, requests_per_second=None,
+                               overlap_fetch=False, lean_chart=True, chart_max_points=100,
+                               provider=LocalProvider.from_frames(prices, fundamentals))
+    monitor.load_ticker_list()
+    monitor.get_market_caps_base_date()
+    monitor.calculate_weights()
+    monitor.fetch_portfolio_data(end_date='2030-01-01')
+    monitor.create_interactive_chart(str(tmp_path / 'chart.html'))
+
+    with open(tmp_path / 'chart_data.json') as f:
+        traces = json.load(f)['traces']
+    days = len(monitor.portfolio_data)
+    lines = [t for t in traces if t['colors'] is None]
+    bars = [t for t in traces if t['colors'] is not None]
+    assert len(lines) == 3 and len(bars) == 2
+    assert all(len(t['sample']) == 100 for t in lines)
+    assert all(t['sample'] == list(range(days)) for t in bars)
+    assert 'var window' not in (tmp_path / 'chart.html').read_text()
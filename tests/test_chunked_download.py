@@ -0,0 +1,51 @@
+"""Chunked downloads resume from the chunks already on disk"""
+
+import pandas as pd
+import pytest
+
+from market_data import LocalProvider, synthetic_panel
+from portfolio_monitor import PortfolioMonitor
+
+
+class Interrupted(BaseException):
+    """Stands in for the run being killed (not caught like a provider error)"""
+
+
+class InterruptingProvider(LocalProvider):
+    """Interrupts the run on a given download request, then behaves normally"""
+
+    def __init__(self, provider, interrupt_at):
+        self.__dict__.update(provider.__dict__)
+        self.interrupt_at = interrupt_at
+        self.requests = []
+
+    def download_prices(self, tickers, start_date, end_date):
+        self.requests.append(list(tickers))
+        if len(self.requests) == self.interrupt_at:
+            raise Interrupted()
+        return super().download_prices(tickers, start_date, end_date)
+
+
+def test_interrupted_download_resumes_to_same_panel(tmp_path):
+    prices, fundamentals = synthetic_panel(n_tickers=10, n_days=30)
+    one_shot = LocalProvider.from_frames(prices, fundamentals)
+    provider = InterruptingProvider(one_shot, interrupt_at=3)
+    monitor = PortfolioMonitor(provider=provider, price_cache=str(tmp_path / 'price_cache.csv'),
+                               metadata_cache=None, overlap_fetch=False, requests_per_second=None,
+                               max_retries=0, download_chunk_size=3, max_workers=1)
+    tickers = list(prices.columns)
+    start, end = '2022-10-25', '2022-12-31'
+    chunks = [tickers[i:i + 3] for i in range(0, len(tickers), 3)]
+
+    # Killed on the third of four chunks: the first two are already on disk
+    with pytest.raises(Interrupted):
+        monitor._download_prices(tickers, start, end)
+    progress = tmp_path / 'download_progress'
+    assert len(list(progress.iterdir())) == 2
+
+    provider.requests.clear()
+    resumed = monitor._download_prices(tickers, start, end)
+    assert provider.requests == chunks[2:]
+    pd.testing.assert_frame_equal(resumed, one_shot.download_prices(tickers, start, end), check_freq=False)
+    # The chunk files are removed once the panel is complete
+    assert not progress.exists()
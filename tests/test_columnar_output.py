@@ -0,0 +1,56 @@
+"""Parquet and Feather copies of the dataset read back like the CSV"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from market_data import LocalProvider, write_synthetic_fixture
+from portfolio_monitor import PortfolioMonitor
+
+pytest.importorskip('pyarrow')
+
+
+@pytest.fixture
+def saved(tmp_path, monkeypatch):
+    """Dataset saved with both columnar formats from a synthetic fixture"""
+    write_synthetic_fixture(str(tmp_path / 'fixture'), n_tickers=5, n_days=60)
+    monkeypatch.chdir(tmp_path)
+    monitor = PortfolioMonitor(ticker_file='fixture/tickerlist.txt',
+                               provider=LocalProvider.from_directory('fixture'),
+                               price_cache=None, base_snapshot=None, metadata_cache=None,
+                               requests_per_second=None, overlap_fetch=False,
+                               output_formats=('parquet', 'feather'))
+    assert monitor.run_stages({'portfolio', 'save'}, report_file=None)
+    return monitor, tmp_path
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'feather'])
+def test_wide_table_round_trips(saved, fmt):
+    monitor, tmp_path = saved
+    read = getattr(pd, f'read_{fmt}')
+    wide = read(tmp_path / f'ai_portfolio_data.{fmt}')
+
+    pd.testing.assert_frame_equal(wide, monitor.portfolio_data, check_dtype=False)
+    # The CSV carries the same values
+    csv = pd.read_csv(tmp_path / 'ai_portfolio_data.csv', parse_dates=['date'])
+    np.testing.assert_allclose(wide['T0003_price'], csv['T0003_price'])
+    # Single columns load without the rest of the table
+    assert list(read(tmp_path / f'ai_portfolio_data.{fmt}', columns=['date', 'T0003_price']).columns) \
+        == ['date', 'T0003_price']
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'feather'])
+def test_long_table_pivots_back_to_wide(saved, fmt):
+    monitor, tmp_path = saved
+    long = getattr(pd, f'read_{fmt}')(tmp_path / f'ai_portfolio_data_long.{fmt}')
+    tickers = list(monitor.weights)
+
+    assert list(long.columns) == ['date', 'ticker', 'price', 'return']
+    assert isinstance(long['ticker'].dtype, pd.CategoricalDtype)
+    assert len(long) == len(monitor.portfolio_data) * len(tickers)
+
+    data = monitor.portfolio_data.set_index('date')
+    for field in ('price', 'return'):
+        wide = long.pivot(index='date', columns='ticker', values=field)[tickers]
+        expected = data[[f'{t}_{field}' for t in tickers]].set_axis(tickers, axis=1)
+        np.testing.assert_array_equal(wide.to_numpy(), expected.to_numpy())
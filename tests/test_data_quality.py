@@ -0,0 +1,68 @@
+"""Data-quality screening flags"""
+
+import numpy as np
+import pandas as pd
+
+from data_quality import merge_reports, quality_report, screen_prices
+
+
+def panel(moves):
+    """Two tickers: A follows the given daily moves, B a quiet random walk"""
+    rng = np.random.default_rng(7)
+    dates = pd.bdate_range('2024-01-02', periods=len(moves) + 1)
+    a = 100 * np.cumprod(np.append(1.0, 1 + np.asarray(moves)))
+    b = 50 * np.exp(np.cumsum(rng.normal(0, 0.01, len(dates))))
+    return pd.DataFrame({'A': a, 'B': b}, index=dates)
+
+
+def test_split_moves_are_flagged_in_both_directions():
+    prices = panel([0.01, -0.5, 0.01, 1.02, 0.0, 0.01])
+    flags = screen_prices(prices)['flags']
+    assert flags['split']['A'].tolist() == [False, False, True, False, True, False, False]
+    assert not flags['extreme']['A'].any()
+
+
+def test_split_requires_a_large_move():
+    # With a higher move threshold a halving is no longer large enough to be a split
+    prices = panel([0.01, -0.5, 0.01, 0.01])
+    screened = screen_prices(prices, max_abs_return=1.5)
+    assert not screened['flags']['split'].to_numpy().any()
+    assert not np.isnan(screened['returns']['A'].iloc[1])
+
+
+def test_report_since_and_merge():
+    prices = panel([0.01, 0.0, 0.0, 0.0, 0.0, 0.0, 0.01, 2.0, -0.66, 0.01])
+    screened = screen_prices(prices)
+    full = quality_report(screened)
+    cut = prices.index[4]
+
+    stored = quality_report(screen_prices(prices.loc[:cut]))
+    update = quality_report(screened, since=cut)
+    assert update['days'] == len(prices) - 5
+    assert all(event['date'] > cut.strftime('%Y-%m-%d') for event in update['events'])
+
+    merged = merge_reports(stored, update)
+    assert merged['days'] == full['days']
+    # The stale run straddles the cut: the stored part only had three unchanged days
+    assert full['totals']['stale'] == 5
+    assert merged['totals']['stale'] == stored['totals']['stale'] + 2 == 2
+    assert merged['totals']['spike'] == full['totals']['spike'] == 1
+    assert merged['events'][-1] == full['events'][-1]
+
+
+def test_merge_keeps_latest_events():
+    prices = panel([0.0] * 12)
+    report = quality_report(screen_prices(prices), max_events=5)
+    assert report['events_truncated']
+    assert report['events'][-1]['date'] == prices.index[-1].strftime('%Y-%m-%d')
+    merged = merge_reports(report, report, max_events=5)
+    assert len(merged['events']) == 5 and merged['events_truncated']
+
+
+def test_stale_needs_stale_days_unchanged_moves():
+    # Four zero-return days (five identical prices) are not yet stale
+    flags = screen_prices(panel([0.01] + [0.0] * 4 + [0.01]))['flags']
+    assert not flags['stale']['A'].any()
+    # Five zero-return days are, and every one of them is flagged
+    flags = screen_prices(panel([0.01] + [0.0] * 5 + [0.01]))['flags']
+    assert flags['stale']['A'].tolist() == [False, False] + [True] * 5 + [False]
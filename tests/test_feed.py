@@ -0,0 +1,38 @@
+"""The JSON data feed stays valid JSON for browsers"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from portfolio_monitor import PortfolioMonitor
+
+
+def strict_load(path):
+    """json.load that rejects NaN and Infinity, like JSON.parse"""
+    def reject(constant):
+        raise ValueError(f'invalid JSON constant {constant}')
+    with open(path) as f:
+        return json.load(f, parse_constant=reject)
+
+
+def test_single_row_feed_has_no_nan(tmp_path):
+    monitor = PortfolioMonitor()
+    monitor.weights = {'A': 1.0}
+    monitor.portfolio_data = pd.DataFrame({
+        'date': pd.to_datetime(['2022-10-26']),
+        'daily_return': [0.01], 'portfolio_value': [101.0],
+        'daily_weighted_return': [0.01], 'daily_weighted_value': [101.0],
+        'spy_daily_return': [np.nan], 'spy_value': [np.inf]
+    })
+
+    monitor.save_feed(str(tmp_path / 'feed.json'))
+    feed = strict_load(tmp_path / 'feed.json')
+
+    # One return has no standard deviation; SPY has no values at all
+    assert feed['summary']['portfolio_vol_pct'] is None
+    assert feed['summary']['spy_return_pct'] is None
+    assert feed['summary']['portfolio_return_pct'] == 1.0
+    assert feed['summary']['stocks'] == 1
+    assert feed['series']['spy_value'] == [None]
+    assert feed['series']['spy_daily_return'] == [None]
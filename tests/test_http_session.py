@@ -0,0 +1,131 @@
+"""Managed HTTP session against a stub server on localhost"""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from http_session import CircuitOpenError, create_session
+from run_report import NetworkStats
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Echoes the path; ?status=<code> (or server.status) sets the status code"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        code = int(parse_qs(parts.query).get('status', [self.server.status])[0])
+        body = json.dumps({'path': self.path}).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Set-Cookie', f'seen={parts.path.rsplit("/", 1)[-1]}; Path=/')
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    httpd.status = 200
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def url(server, path):
+    return f'http://127.0.0.1:{server.server_port}{path}'
+
+
+def test_throttling_and_server_errors_open_the_circuit(server):
+    stats = NetworkStats()
+    session = create_session(requests_per_second=None, failure_threshold=3, reset_timeout=0.2,
+                             network_stats=stats, backend='requests')
+
+    # Not found is an answer, not a failure
+    for _ in range(3):
+        assert session.get(url(server, '/v8/finance/chart/A?status=404')).status_code == 404
+    # Throttling and server errors are
+    assert session.get(url(server, '/v8/finance/chart/A?status=429')).status_code == 429
+    assert session.get(url(server, '/v8/finance/chart/A?status=503')).status_code == 503
+    assert session.get(url(server, '/v8/finance/chart/A?status=500')).status_code == 500
+    with pytest.raises(CircuitOpenError):
+        session.get(url(server, '/v8/finance/chart/B'))
+    # Other endpoints are unaffected
+    assert session.get(url(server, '/v10/finance/quoteSummary/A')).status_code == 200
+
+    counts = stats.snapshot()
+    assert counts['http_requests'] == 7
+    assert counts['http_failures'] == 3
+    assert counts['circuit_rejections'] == 1
+    summary = session.stats.summary()
+    chart = summary[f'127.0.0.1:{server.server_port}/v8/finance/chart']
+    assert chart['requests'] == 6 and chart['failures'] == 3 and chart['rejected'] == 1
+
+
+def test_circuit_recovers_after_trial_request(server):
+    session = create_session(requests_per_second=None, failure_threshold=2, reset_timeout=0.2,
+                             backend='requests')
+    endpoint = f'127.0.0.1:{server.server_port}/v8/finance/chart'
+    server.status = 502
+    for _ in range(2):
+        session.get(url(server, '/v8/finance/chart/A'))
+    assert session.breaker(endpoint).state == 'open'
+
+    # A failed trial opens it again straight away
+    time.sleep(0.25)
+    session.get(url(server, '/v8/finance/chart/A'))
+    with pytest.raises(CircuitOpenError):
+        session.get(url(server, '/v8/finance/chart/A'))
+
+    server.status = 200
+    time.sleep(0.25)
+    assert session.get(url(server, '/v8/finance/chart/A')).status_code == 200
+    assert session.breaker(endpoint).state == 'closed'
+    assert session.get(url(server, '/v8/finance/chart/B')).status_code == 200
+
+
+def test_token_bucket_throttles_after_burst(server):
+    session = create_session(requests_per_second=50, burst=5, backend='requests')
+    start = time.perf_counter()
+    for i in range(20):
+        session.get(url(server, f'/v8/finance/chart/T{i}'))
+    elapsed = time.perf_counter() - start
+    # Five requests go straight through, the other fifteen at 50 per second
+    assert elapsed >= 15 / 50 * 0.9
+
+
+def test_shared_session_across_threads(server):
+    stats = NetworkStats()
+    session = create_session(requests_per_second=None, network_stats=stats, backend='requests')
+
+    def fetch(worker):
+        results = []
+        for i in range(25):
+            path = f'/v8/finance/chart/W{worker}-{i}'
+            response = session.get(url(server, path))
+            results.append((path, response.status_code, response.json()['path']))
+        return results
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = [r for worker in pool.map(fetch, range(8)) for r in worker]
+
+    # Every response belongs to its own request, none lost or mixed up
+    assert len(results) == 200
+    assert all(status == 200 and echoed == path for path, status, echoed in results)
+    summary = session.stats.summary()[f'127.0.0.1:{server.server_port}/v8/finance/chart']
+    assert summary['requests'] == 200 and summary['failures'] == 0
+    expected_bytes = sum(len(json.dumps({'path': path}).encode()) for path, _, _ in results)
+    assert summary['bytes'] == stats.snapshot()['bytes_received'] == expected_bytes
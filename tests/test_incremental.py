@@ -0,0 +1,168 @@
+"""Incremental dataset updates match a full rebuild"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from market_data import LocalProvider
+from portfolio_monitor import PortfolioMonitor
+
+TICKERS = [f'T{i}' for i in range(6)]
+
+
+@pytest.fixture
+def market(tmp_path, monkeypatch):
+    """Seeded prices served by a LocalProvider, run from a scratch directory"""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'files').mkdir()
+    rng = np.random.default_rng(3)
+    dates = pd.bdate_range('2022-10-25', periods=160)
+    prices = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.02, (160, 7)), axis=0)),
+                          index=dates, columns=TICKERS + ['SPY'])
+    prices.index.name = 'date'
+    prices.iloc[50:53, 2] = np.nan
+    fundamentals = pd.DataFrame({'ticker': TICKERS + ['SPY'], 'shares_outstanding': 1e6,
+                                 'company_name': TICKERS + ['SPY']})
+    market_caps = {t: {'market_cap': rng.uniform(1e9, 1e11), 'price': rng.uniform(10, 200),
+                       'date': dates[0], 'company_name': t} for t in TICKERS}
+    return LocalProvider.from_frames(prices, fundamentals), market_caps, dates
+
+
+def build(market, incremental, end, filename, **kwargs):
+    provider, market_caps, dates = market
+    monitor = PortfolioMonitor(incremental=incremental, provider=provider, metadata_cache=None,
+                               overlap_fetch=False, requests_per_second=None, **kwargs)
+    total = sum(v['market_cap'] for v in market_caps.values())
+    monitor.weights = {t: market_caps[t]['market_cap'] / total for t in TICKERS}
+    monitor.market_caps = dict(market_caps)
+    monitor.fetch_portfolio_data(end_date=(dates[end] + pd.Timedelta(days=1)).strftime('%Y-%m-%d'))
+    monitor.save_dataset(filename)
+    return monitor
+
+
+@pytest.mark.parametrize('layout', ['single', 'year'])
+@pytest.mark.parametrize('legacy_state', [False, True])
+def test_incremental_matches_full(market, layout, legacy_state):
+    build(market, True, 100, 'files/ai_portfolio_data.csv', dataset_layout=layout)
+    if legacy_state:
+        # States written before the last row was recorded read it from the dataset
+        with open('files/ai_portfolio_data_state.json') as f:
+            state = json.load(f)
+        del state['last_row'], state['last_prices']
+        with open('files/ai_portfolio_data_state.json', 'w') as f:
+            json.dump(state, f)
+
+    monitor = build(market, True, 159, 'ai_portfolio_data.csv', dataset_layout=layout)
+    assert monitor.rows_on_disk == 100
+    incremental = monitor.portfolio_data
+
+    full = build(market, False, 159, 'full.csv', dataset_layout=layout).portfolio_data
+    pd.testing.assert_frame_equal(incremental, full, rtol=1e-10)
+
+
+def test_state_records_last_row(market):
+    monitor = build(market, True, 100, 'files/ai_portfolio_data.csv')
+    with open('files/ai_portfolio_data_state.json') as f:
+        state = json.load(f)
+    last = monitor.portfolio_data.iloc[-1]
+    assert state['last_row']['date'] == last['date'].strftime('%Y-%m-%d')
+    assert state['last_row']['cumulative_return'] == last['cumulative_return']
+    assert state['last_prices'] == {t: last[f'{t}_price'] for t in TICKERS}
+
+
+def test_incremental_appends_attribution(market):
+    build(market, True, 100, 'files/ai_portfolio_data.csv', attribution=True)
+    with open('files/ai_portfolio_data_attribution.csv.gz', 'rb') as f:
+        stored = f.read()
+    with open('files/ai_portfolio_data_attribution_top.jsonl') as f:
+        stored_top = f.read()
+
+    build(market, True, 159, 'ai_portfolio_data.csv', attribution=True)
+    build(market, False, 159, 'full.csv', attribution=True)
+
+    # The stored bytes are kept and only the new days are added
+    with open('ai_portfolio_data_attribution.csv.gz', 'rb') as f:
+        assert f.read().startswith(stored)
+    with open('ai_portfolio_data_attribution_top.jsonl') as f:
+        top = f.read()
+    assert top.startswith(stored_top)
+    assert len(top.splitlines()) == 159
+    with open('full_attribution_top.jsonl') as f:
+        assert top == f.read()
+    pd.testing.assert_frame_equal(pd.read_csv('ai_portfolio_data_attribution.csv.gz'),
+                                  pd.read_csv('full_attribution.csv.gz'))
+
+
+class RecordingProvider(LocalProvider):
+    """Records the tickers and start date of every price download"""
+
+    def __init__(self, provider):
+        self.__dict__.update(provider.__dict__)
+        self.downloads = []
+
+    def download_prices(self, tickers, start_date, end_date):
+        self.downloads.append((list(tickers), start_date))
+        return super().download_prices(tickers, start_date, end_date)
+
+
+def test_dividend_readjustment_keeps_stored_rows(market):
+    provider, market_caps, dates = market
+    build(market, True, 100, 'files/ai_portfolio_data.csv')
+    with open('files/ai_portfolio_data.csv', 'rb') as f:
+        stored = f.read()
+
+    # An ex-dividend day after the stored rows scales T1's whole earlier history
+    adjusted = provider.prices.copy()
+    adjusted.loc[adjusted.index < dates[130], 'T1'] *= 0.99
+    readjusted = RecordingProvider(provider)
+    readjusted.prices = adjusted
+    market = (readjusted, market_caps, dates)
+
+    monitor = build(market, True, 159, 'ai_portfolio_data.csv')
+    assert monitor.rows_on_disk == 100
+    # The cache re-downloads T1's history only, and the dataset is appended to
+    assert [tickers for tickers, _ in readjusted.downloads].count(['T1']) == 1
+    assert all(tickers == ['T1'] or start >= dates[100].strftime('%Y-%m-%d')
+               for tickers, start in readjusted.downloads)
+    with open('ai_portfolio_data.csv', 'rb') as f:
+        assert f.read().startswith(stored)
+    with open('ai_portfolio_data_state.json') as f:
+        state = json.load(f)
+    (recorded,) = state['price_adjustments']['T1']
+    assert recorded['through'] == dates[100].strftime('%Y-%m-%d')
+    assert recorded['factor'] == pytest.approx(0.99)
+
+    # Stored T1 prices times the recorded factor are the re-adjusted history,
+    # and the new days match a rebuild from it
+    full = build(market, False, 159, 'full.csv').portfolio_data
+    incremental = monitor.portfolio_data
+    np.testing.assert_allclose(incremental['T1_price'][:100] * monitor._adjustment_factor('T1', dates[100]),
+                               full['T1_price'][:100], rtol=1e-10)
+    columns = [c for c in full.columns if c.endswith(('_return', '_price'))]
+    pd.testing.assert_frame_equal(incremental.loc[100:, columns], full.loc[100:, columns], rtol=1e-10)
+
+    # A later run does not record the same re-adjustment again
+    build(market, True, 159, 'again.csv')
+    with open('again_state.json') as f:
+        assert json.load(f)['price_adjustments'] == state['price_adjustments']
+
+
+def test_incremental_strategies_and_rebalancing_use_lookback(market):
+    provider, market_caps, dates = market
+    options = dict(strategies=('equal', 'inverse_vol'), rebalance_targets=('fixed', 'inverse_vol'),
+                   rebalance_schedules=('monthly', 'threshold5'), rebalance_cost_bps=10.0)
+    build(market, True, 100, 'files/ai_portfolio_data.csv', **options)
+
+    recording = RecordingProvider(provider)
+    monitor = build((recording, market_caps, dates), True, 159, 'ai_portfolio_data.csv', **options)
+    assert monitor.rows_on_disk == 100
+    # No request goes back to the base date
+    assert min(start for _, start in recording.downloads) > dates[0].strftime('%Y-%m-%d')
+
+    full = build(market, False, 159, 'full.csv', **options)
+    pd.testing.assert_frame_equal(monitor.portfolio_data, full.portfolio_data, rtol=1e-10)
+    assert monitor.rebalance_summary.keys() == full.rebalance_summary.keys()
+    for name, summary in full.rebalance_summary.items():
+        assert monitor.rebalance_summary[name] == pytest.approx(summary, rel=1e-9, abs=1e-9)
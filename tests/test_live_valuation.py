@@ -0,0 +1,104 @@
+"""Intraday valuation from the daily run's baseline"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from live_valuation import (BENCHMARK, LiveValuation, QuoteSource, SimulatedQuoteSource,
+                            build_baseline, run_live)
+from market_data import LocalProvider, synthetic_panel
+from portfolio_monitor import PortfolioMonitor
+
+
+class ReplayQuoteSource(QuoteSource):
+    """Serves a fixed list of quote dicts, one per poll"""
+
+    name = 'replay'
+
+    def __init__(self, ticks):
+        self.ticks = list(ticks)
+
+    def get_quotes(self, tickers):
+        return self.ticks.pop(0)
+
+
+def make_monitor(tmp_path, prices, fundamentals):
+    fundamentals[['ticker', 'company_name']].to_csv(tmp_path / 'tickerlist.txt', sep='\t',
+                                                    header=False, index=False)
+    monitor = PortfolioMonitor(ticker_file=str(tmp_path / 'tickerlist.txt'),
+                               base_date=prices.index[0].strftime('%Y-%m-%d'),
+                               price_cache=None, dataset_file=str(tmp_path / 'data.csv'),
+                               requests_per_second=None, base_snapshot=None, metadata_cache=None,
+                               overlap_fetch=False,
+                               provider=LocalProvider.from_frames(prices, fundamentals))
+    monitor.load_ticker_list()
+    monitor.get_market_caps_base_date()
+    monitor.calculate_weights()
+    return monitor
+
+
+def end_after(date):
+    return (date + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+
+
+def test_simulated_ticks_match_baseline(tmp_path):
+    prices, fundamentals = synthetic_panel(n_tickers=6, n_days=40, seed=2)
+    monitor = make_monitor(tmp_path, prices, fundamentals)
+    monitor.fetch_portfolio_data(end_date=end_after(prices.index[-1]))
+    baseline = build_baseline(monitor.weights, monitor.market_caps,
+                              monitor.portfolio_data.iloc[-1], monitor.last_close)
+
+    output = tmp_path / 'live.json'
+    polls = run_live(LiveValuation(baseline), SimulatedQuoteSource(baseline['prev_close'], seed=5),
+                     str(output), interval=0, polls=4)
+    assert polls == 4
+
+    # The same feed again, valued directly from the baseline
+    replay = SimulatedQuoteSource(baseline['prev_close'], seed=5)
+    tickers = baseline['tickers']
+    prev_close = np.array([baseline['prev_close'][t] for t in tickers])
+    caps = prev_close * np.array(baseline['shares'])
+    start = baseline['start_values']
+    with open(output) as f:
+        points = json.load(f)['points']
+    assert len(points) == 4
+
+    for point in points:
+        quotes = replay.get_quotes(tickers + [BENCHMARK])
+        change = np.array([quotes[t] for t in tickers]) / prev_close - 1
+        fixed = np.dot(baseline['weights'], change)
+        daily = np.dot(caps / caps.sum(), change)
+        spy = quotes[BENCHMARK] / baseline['prev_close'][BENCHMARK] - 1
+        assert abs(point['portfolio_value'] - 100 * start['portfolio'] * (1 + fixed)) < 1e-3
+        assert abs(point['daily_weighted_value'] - 100 * start['daily_weighted'] * (1 + daily)) < 1e-3
+        assert abs(point['spy_value'] - 100 * start['spy'] * (1 + spy)) < 1e-3
+        assert point['quoted'] == len(tickers)
+
+
+def test_closing_quotes_reproduce_the_next_daily_row(tmp_path):
+    prices, fundamentals = synthetic_panel(n_tickers=6, n_days=40, seed=4)
+    prices.iloc[10:14, 2] = np.nan
+    day = prices.index[-1]
+
+    # Daily run up to the previous close writes the baseline next to the dataset
+    previous = make_monitor(tmp_path, prices, fundamentals)
+    previous.fetch_portfolio_data(end_date=end_after(prices.index[-2]))
+    previous.save_dataset(str(tmp_path / 'data.csv'))
+    full = make_monitor(tmp_path, prices, fundamentals)
+    full.fetch_portfolio_data(end_date=end_after(day))
+    row = full.portfolio_data.set_index('date').loc[day]
+
+    valuation = LiveValuation.from_file(str(tmp_path / 'data_live_baseline.json'))
+    closes = prices.loc[day].to_dict()
+    first_half = {t: closes[t] * 1.05 for t in list(closes)[:3]}
+    source = ReplayQuoteSource([first_half, {}, closes])
+    assert run_live(valuation, source, str(tmp_path / 'live.json'), interval=0, polls=3) == 3
+
+    with open(tmp_path / 'live.json') as f:
+        snapshot = json.load(f)
+    # The empty poll records no point
+    assert len(snapshot['points']) == 2
+    latest = snapshot['latest']
+    for column in ('portfolio_value', 'daily_weighted_value', 'spy_value'):
+        assert abs(latest[column] - row[column]) < 1e-3
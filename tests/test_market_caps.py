@@ -0,0 +1,44 @@
+"""Concurrent base-date market caps match a one-by-one fetch"""
+
+import time
+
+import pandas as pd
+
+from market_data import LocalProvider, synthetic_panel
+from portfolio_monitor import PortfolioMonitor
+
+
+class SlowFirstTickers(LocalProvider):
+    """Per-ticker requests only (no batch download); earlier tickers answer last"""
+
+    def __init__(self, provider):
+        self.__dict__.update(provider.__dict__)
+        self.order = list(self.shares)
+
+    def download_prices(self, tickers, start_date, end_date):
+        return None
+
+    def get_shares_outstanding(self, ticker):
+        time.sleep(0.002 * (len(self.order) - self.order.index(ticker)))
+        return super().get_shares_outstanding(ticker)
+
+
+def market_caps(provider, max_workers):
+    monitor = PortfolioMonitor(provider=provider, max_workers=max_workers, max_retries=0,
+                               base_snapshot=None, price_cache=None, metadata_cache=None,
+                               overlap_fetch=False)
+    monitor.tickers_df = pd.DataFrame({'ticker': provider.order,
+                                       'company_name': [f'{t} Inc' for t in provider.order]})
+    assert monitor.get_market_caps_base_date() == provider.order
+    return monitor.market_caps
+
+
+def test_concurrent_fetch_preserves_order_and_results():
+    prices, fundamentals = synthetic_panel(n_tickers=12, n_days=10)
+    provider = SlowFirstTickers(LocalProvider.from_frames(prices.drop(columns='SPY'), fundamentals))
+
+    sequential = market_caps(provider, max_workers=1)
+    concurrent = market_caps(provider, max_workers=8)
+
+    assert list(concurrent) == list(sequential) == provider.order
+    assert concurrent == sequential
@@ -0,0 +1,95 @@
+"""Company-name normalisation, the metadata cache and the change log"""
+
+import json
+import shutil
+
+import pandas as pd
+import pytest
+
+import portfolio_monitor
+from market_data import LocalProvider, write_synthetic_fixture
+from portfolio_monitor import PortfolioMonitor, normalize_company_name
+
+
+@pytest.mark.parametrize('name, expected', [
+    ('Arista Networks, Inc.', 'ARISTA NETWORKS'),
+    ('ARISTA NETWORKS INC', 'ARISTA NETWORKS'),
+    ('Alphabet Inc. Class A', 'ALPHABET'),
+    ('Alphabet Inc Cl C', 'ALPHABET'),
+    ('The Walt Disney Company', 'WALT DISNEY'),
+    ('Taiwan Semiconductor Manufacturing Company Limited ADR', 'TAIWAN SEMICONDUCTOR MANUFACTURING'),
+    ('Procter & Gamble Co', 'PROCTER AND GAMBLE'),
+    # A suffix is never stripped down to nothing
+    ('Holdings', 'HOLDINGS'),
+])
+def test_normalize_company_name(name, expected):
+    assert normalize_company_name(name) == expected
+
+
+class CountingNames(LocalProvider):
+    """Counts company-name requests"""
+
+    def __init__(self, provider):
+        self.__dict__.update(provider.__dict__)
+        self.name_requests = []
+
+    def get_company_name(self, ticker):
+        self.name_requests.append(ticker)
+        return super().get_company_name(ticker)
+
+
+def test_metadata_cache_refreshes_only_expired_entries(tmp_path):
+    provider = CountingNames(write_synthetic_fixture(str(tmp_path / 'fixture'), n_tickers=3, n_days=5))
+    cache_file = tmp_path / 'company_metadata.json'
+    monitor = PortfolioMonitor(provider=provider, metadata_cache=str(cache_file), metadata_ttl_days=7,
+                               requests_per_second=None, overlap_fetch=False)
+    tickers = ['T0001', 'T0002', 'T0003']
+
+    assert monitor.refresh_company_metadata(tickers)['T0002'] == 'SYNTHETIC COMPANY T0002 INC'
+    assert sorted(provider.name_requests) == tickers
+
+    # Within the TTL every name is served from the cache
+    provider.name_requests.clear()
+    monitor.refresh_company_metadata(tickers)
+    assert provider.name_requests == []
+
+    # Only the expired entry is fetched again
+    with open(cache_file) as f:
+        cache = json.load(f)
+    cache['T0003']['expires_at'] = '2000-01-01T00:00:00'
+    with open(cache_file, 'w') as f:
+        json.dump(cache, f)
+    monitor.refresh_company_metadata(tickers)
+    assert provider.name_requests == ['T0003']
+    with open(cache_file) as f:
+        assert json.load(f)['T0003']['expires_at'] > '2000-01-01T00:00:00'
+
+
+def test_name_change_is_logged_once_across_runs(tmp_path, monkeypatch):
+    fixtures = tmp_path / 'fixtures'
+    write_synthetic_fixture(str(fixtures), n_tickers=4, n_days=40)
+    # The universe file still carries T0002's old name
+    tickerlist = (fixtures / 'tickerlist.txt').read_text().replace(
+        'SYNTHETIC COMPANY T0002 INC', 'OLD NAME T0002 CORP')
+    (fixtures / 'tickerlist.txt').write_text(tickerlist)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv('PORTFOLIO_UNIVERSE', raising=False)
+
+    def run():
+        portfolio_monitor.main(['save', '--provider', 'local', '--fixtures', str(fixtures)])
+        # Outputs move into files/ between runs, as in the scheduled workflow
+        (tmp_path / 'files').mkdir(exist_ok=True)
+        for output in tmp_path.glob('ai_portfolio_data*'):
+            shutil.move(str(output), str(tmp_path / 'files' / output.name))
+        return pd.read_csv(tmp_path / 'files' / 'ai_portfolio_data_changes.csv')
+
+    first = run()
+    assert first['ticker'].tolist() == ['T0002']
+    assert first['current_name'].tolist() == ['SYNTHETIC COMPANY T0002 INC']
+
+    # Re-running, even with the new name formatted differently, adds no entry
+    assert run().equals(first)
+    fundamentals = pd.read_csv(fixtures / 'fundamentals.csv')
+    fundamentals.loc[fundamentals['ticker'] == 'T0002', 'company_name'] = 'Synthetic Company T0002, Inc.'
+    fundamentals.to_csv(fixtures / 'fundamentals.csv', index=False)
+    assert run().equals(first)
@@ -0,0 +1,81 @@
+"""The main entry point runs offline against fixture files"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import portfolio_monitor
+from market_data import LocalProvider, write_synthetic_fixture
+
+
+def test_main_runs_on_local_fixtures(tmp_path, monkeypatch, capsys):
+    write_synthetic_fixture(str(tmp_path / 'fixtures'), n_tickers=8, n_days=300)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv('PORTFOLIO_UNIVERSE', raising=False)
+
+    portfolio_monitor.main(['save', '--provider', 'local', '--fixtures', str(tmp_path / 'fixtures')])
+
+    data = pd.read_csv(tmp_path / 'ai_portfolio_data.csv')
+    assert len(data) == 299
+    assert [c for c in data.columns if c.endswith('_price')] == [f'T{i:04d}_price' for i in range(1, 9)]
+    with open(tmp_path / 'ai_portfolio_run_report.json') as f:
+        assert json.load(f)['stages']
+    # Nothing from the live setup is written
+    assert not (tmp_path / 'files' / 'price_cache.csv').exists()
+    assert not (tmp_path / 'files' / 'base_snapshot.json').exists()
+    assert 'price_cache.csv' not in capsys.readouterr().out
+
+
+def test_provider_from_environment(tmp_path, monkeypatch):
+    write_synthetic_fixture(str(tmp_path / 'fixtures'), n_tickers=3, n_days=20)
+    monkeypatch.setenv('PORTFOLIO_PROVIDER', 'local')
+    monkeypatch.setenv('PORTFOLIO_FIXTURES', str(tmp_path / 'fixtures'))
+    monkeypatch.delenv('PORTFOLIO_UNIVERSE', raising=False)
+
+    monitor = portfolio_monitor.build_monitor()
+    assert monitor.provider.name == 'local'
+    assert monitor.ticker_file == str(tmp_path / 'fixtures' / 'tickerlist.txt')
+    assert monitor.price_cache is None
+
+
+def test_run_full_analysis_runs_every_stage(tmp_path, monkeypatch):
+    write_synthetic_fixture(str(tmp_path / 'fixtures'), n_tickers=4, n_days=60)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv('PORTFOLIO_UNIVERSE', raising=False)
+
+    monitor = portfolio_monitor.build_monitor('local', str(tmp_path / 'fixtures'))
+    assert monitor.run_full_analysis(report_file=None)
+    stages = [s['stage'] for s in monitor.run_report.stages]
+    assert stages == ['load_ticker_list', 'get_market_caps_base_date', 'calculate_weights',
+                      'fetch_portfolio_data', 'save_dataset', 'create_interactive_chart', 'save_feed',
+                      'prices (background)', 'names (background)']
+    assert (tmp_path / 'ai_portfolio_chart.html').exists()
+
+
+def test_provider_from_dataset_seeds_late_listing(tmp_path):
+    dates = pd.bdate_range('2022-10-26', periods=4)
+    pd.DataFrame({
+        'date': dates,
+        'AAA_price': [110.0, 121.0, 108.9, 114.345],
+        'AAA_return': [0.10, 0.10, -0.10, 0.05],
+        # Lists on the second day: no price, then a first day without a return
+        'NEW_price': [np.nan, 50.0, 55.0, 44.0],
+        'NEW_return': [np.nan, np.nan, 0.10, -0.20],
+        'spy_value': [101.0, 102.0, 101.0, 103.0]
+    }).to_csv(tmp_path / 'data.csv', index=False)
+    pd.DataFrame({'ticker': ['AAA', 'NEW'], 'weight': [0.75, 0.25],
+                  'company_name': ['Alpha', 'Newco']}).to_csv(tmp_path / 'data_weights.csv', index=False)
+
+    provider = LocalProvider.from_dataset(str(tmp_path / 'data.csv'))
+    # Kept in memory: no fixture files are written
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['data.csv', 'data_weights.csv']
+
+    base_date = pd.Timestamp('2022-10-25')
+    assert provider.prices.loc[base_date, 'AAA'] == pytest.approx(100.0)
+    assert np.isnan(provider.prices.loc[base_date, 'NEW'])
+    assert provider.prices['NEW'].tolist()[2:] == [50.0, 55.0, 44.0]
+    # Shares come from the first valid price, so the late listing is not NaN
+    assert provider.get_shares_outstanding('AAA') == pytest.approx(0.75e12 / 100.0)
+    assert provider.get_shares_outstanding('NEW') == pytest.approx(0.25e12 / 50.0)
@@ -0,0 +1,106 @@
+"""Golden-output checks of the vectorized return engines against the original loops"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from portfolio_monitor import fixed_weight_returns, market_cap_weighted_returns
+
+
+def loop_fixed_weight_returns(returns, weights):
+    """The original per-date, per-ticker fixed-weight loop"""
+    portfolio_returns = pd.Series(index=returns.index, dtype=float)
+    for date in returns.index:
+        daily_return = 0
+        for ticker in weights:
+            if ticker in returns.columns and not pd.isna(returns.loc[date, ticker]):
+                daily_return += weights[ticker] * returns.loc[date, ticker]
+        portfolio_returns[date] = daily_return
+    return portfolio_returns
+
+
+def loop_market_cap_weighted_returns(prices, returns, weights, market_caps):
+    """The original daily-rebalanced loop, weighting by the previous row's market caps"""
+    tickers_list = list(weights.keys())
+    daily_weighted_returns = pd.Series(index=returns.index, dtype=float)
+    daily_weights = {}
+    for i, date in enumerate(returns.index):
+        if i == 0:
+            current_weights = weights.copy()
+        else:
+            prev_date = returns.index[i - 1]
+            total_market_cap = 0
+            ticker_market_caps = {}
+            for ticker in tickers_list:
+                if ticker in prices.columns and not pd.isna(prices.loc[prev_date, ticker]):
+                    prev_price = prices.loc[prev_date, ticker]
+                    if ticker in market_caps:
+                        shares_outstanding = market_caps[ticker]['market_cap'] / market_caps[ticker]['price']
+                        current_market_cap = prev_price * shares_outstanding
+                    else:
+                        current_market_cap = prev_price * 1_000_000
+                    ticker_market_caps[ticker] = current_market_cap
+                    total_market_cap += current_market_cap
+            current_weights = {}
+            for ticker in tickers_list:
+                if ticker in ticker_market_caps:
+                    current_weights[ticker] = ticker_market_caps[ticker] / total_market_cap
+                else:
+                    current_weights[ticker] = 0
+        daily_weights[date] = current_weights.copy()
+
+        daily_return = 0
+        for ticker in tickers_list:
+            if ticker in returns.columns and not pd.isna(returns.loc[date, ticker]) and ticker in current_weights:
+                daily_return += current_weights[ticker] * returns.loc[date, ticker]
+        daily_weighted_returns[date] = daily_return
+    return daily_weighted_returns, pd.DataFrame.from_dict(daily_weights, orient='index')
+
+
+@pytest.fixture
+def panel():
+    """Seeded prices with gaps, a ticker missing from the download and one without base data"""
+    rng = np.random.default_rng(42)
+    dates = pd.bdate_range('2022-10-25', periods=120)
+    tickers = [f'T{i}' for i in range(10)]
+    prices = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.02, (len(dates), 10)), axis=0)),
+                          index=dates, columns=tickers)
+    prices.iloc[10:15, 2] = np.nan      # multi-day gap
+    prices.iloc[40, 5] = np.nan         # single missing print
+    prices.iloc[:30, 7] = np.nan        # listed late
+    prices = prices.drop(columns='T9')  # never downloaded
+
+    market_caps = {t: {'market_cap': rng.uniform(1e9, 1e11), 'price': rng.uniform(10, 200)}
+                   for t in tickers if t != 'T8'}  # T8 falls back to 1M shares
+    total = sum(v['market_cap'] for v in market_caps.values())
+    weights = {t: market_caps[t]['market_cap'] / total if t in market_caps else 0.01 for t in tickers}
+
+    # Returns keep NaN rows for gaps, as the data-quality stage produces
+    returns = prices.pct_change().iloc[1:]
+    return prices, returns, weights, market_caps
+
+
+def test_fixed_weight_returns_match_loop(panel):
+    prices, returns, weights, market_caps = panel
+    expected = loop_fixed_weight_returns(returns, weights)
+    pd.testing.assert_series_equal(fixed_weight_returns(returns, weights), expected, rtol=1e-12, atol=1e-15)
+
+
+def test_market_cap_weighted_returns_match_loop(panel):
+    prices, returns, weights, market_caps = panel
+    expected_returns, expected_weights = loop_market_cap_weighted_returns(prices, returns, weights, market_caps)
+    daily_returns, daily_weights = market_cap_weighted_returns(prices, returns, weights, market_caps)
+    pd.testing.assert_series_equal(daily_returns, expected_returns, rtol=1e-12, atol=1e-15)
+    pd.testing.assert_frame_equal(daily_weights, expected_weights[daily_weights.columns],
+                                  rtol=1e-12, atol=1e-15, check_freq=False)
+
+
+def test_dropna_returns_match_loop(panel):
+    """With quality checks off every date with a missing return is dropped first"""
+    prices, returns, weights, market_caps = panel
+    returns = prices.pct_change().dropna()
+    expected_returns, _ = loop_market_cap_weighted_returns(prices, returns, weights, market_caps)
+    daily_returns, _ = market_cap_weighted_returns(prices, returns, weights, market_caps)
+    pd.testing.assert_series_equal(daily_returns, expected_returns, rtol=1e-12, atol=1e-15)
+    pd.testing.assert_series_equal(fixed_weight_returns(returns, weights),
+                                   loop_fixed_weight_returns(returns, weights), rtol=1e-12, atol=1e-15)
@@ -0,0 +1,54 @@
+"""Price cache top-ups append new bars instead of rewriting the file"""
+
+import numpy as np
+import pandas as pd
+
+from market_data import LocalProvider
+from portfolio_monitor import PortfolioMonitor
+
+
+def make_monitor(tmp_path, prices, **kwargs):
+    fundamentals = pd.DataFrame({'ticker': list(prices.columns), 'shares_outstanding': 1e6,
+                                 'company_name': list(prices.columns)})
+    provider = LocalProvider.from_frames(prices, fundamentals)
+    return PortfolioMonitor(price_cache=str(tmp_path / 'price_cache.csv'), provider=provider,
+                            metadata_cache=None, overlap_fetch=False, **kwargs), provider
+
+
+def end_after(dates, i):
+    return (dates[i] + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+
+
+def test_top_up_appends_rows(tmp_path):
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range('2022-10-25', periods=40)
+    prices = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.01, (40, 3)), axis=0)),
+                          index=dates, columns=['A', 'B', 'SPY'])
+    prices.index.name = 'date'
+    monitor, _ = make_monitor(tmp_path, prices, csv_float_precision=8)
+
+    monitor.load_price_history(['A', 'B', 'SPY'], '2022-10-25', end_after(dates, 29))
+    before = (tmp_path / 'price_cache.csv').read_text()
+    loaded = monitor.load_price_history(['A', 'B', 'SPY'], '2022-10-25', end_after(dates, 39))
+    after = (tmp_path / 'price_cache.csv').read_text()
+
+    assert after.startswith(before)
+    assert len(after.splitlines()) == len(before.splitlines()) + 10
+    # Values are written at csv_float_precision significant digits
+    assert all(len(v.replace('.', '').lstrip('0')) <= 8 for v in after.splitlines()[-1].split(',')[1:])
+    pd.testing.assert_frame_equal(loaded, prices, rtol=1e-7, check_freq=False)
+
+
+def test_adjusted_history_rewrites_cache(tmp_path):
+    dates = pd.bdate_range('2022-10-25', periods=20)
+    prices = pd.DataFrame({'A': np.linspace(100, 120, 20), 'SPY': np.linspace(400, 420, 20)}, index=dates)
+    prices.index.name = 'date'
+    monitor, provider = make_monitor(tmp_path, prices)
+
+    monitor.load_price_history(['A', 'SPY'], '2022-10-25', end_after(dates, 9))
+    provider.prices['A'] *= 0.5  # a split re-adjusts the whole history
+    loaded = monitor.load_price_history(['A', 'SPY'], '2022-10-25', end_after(dates, 19))
+
+    cached = pd.read_csv(tmp_path / 'price_cache.csv', index_col='date', parse_dates=['date'])
+    np.testing.assert_allclose(cached['A'], prices['A'] * 0.5)
+    np.testing.assert_allclose(loaded['A'], prices['A'] * 0.5)
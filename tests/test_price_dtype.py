@@ -0,0 +1,49 @@
+"""float32 ticker columns stay within the documented tolerance of float64"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from market_data import LocalProvider, write_synthetic_fixture
+from portfolio_monitor import PortfolioMonitor
+
+# Documented in PortfolioMonitor's price_dtype argument
+FLOAT32_RTOL = 1e-6
+
+
+def build(tmp_path, price_dtype):
+    monitor = PortfolioMonitor(ticker_file=str(tmp_path / 'fixture' / 'tickerlist.txt'),
+                               provider=LocalProvider.from_directory(str(tmp_path / 'fixture')),
+                               price_cache=None, base_snapshot=None, metadata_cache=None,
+                               requests_per_second=None, overlap_fetch=False, price_dtype=price_dtype)
+    assert monitor.run_stages({'portfolio'}, report_file=None)
+    return monitor
+
+
+@pytest.fixture
+def datasets(tmp_path):
+    write_synthetic_fixture(str(tmp_path / 'fixture'), n_tickers=8, n_days=250)
+    return build(tmp_path, 'float64'), build(tmp_path, 'float32')
+
+
+def test_float32_ticker_columns_within_tolerance(datasets):
+    full, single = datasets
+    ticker_columns = [c for c in full.portfolio_data.columns
+                      if c.endswith(('_price', '_return')) and c[:c.rindex('_')] in full.weights]
+
+    assert (single.portfolio_data[ticker_columns].dtypes == np.float32).all()
+    expected = full.portfolio_data[ticker_columns].to_numpy()
+    actual = single.portfolio_data[ticker_columns].to_numpy(dtype=float)
+    np.testing.assert_allclose(actual, expected, rtol=FLOAT32_RTOL)
+    # Returns recomputed from the stored float32 prices are off by rounding only
+    prices = single.portfolio_data[[c for c in ticker_columns if c.endswith('_price')]]
+    recomputed = prices.astype(float).pct_change().to_numpy()[1:]
+    stored = expected[1:, 1::2]
+    np.testing.assert_allclose(recomputed, stored, rtol=0, atol=FLOAT32_RTOL)
+
+
+def test_float32_leaves_portfolio_series_unchanged(datasets):
+    full, single = datasets
+    portfolio_columns = ['daily_return', 'portfolio_value', 'daily_weighted_value', 'spy_value']
+    pd.testing.assert_frame_equal(single.portfolio_data[portfolio_columns],
+                                  full.portfolio_data[portfolio_columns])
@@ -0,0 +1,112 @@
+"""Rebalancing schedules: drift, trigger days, turnover and costs"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rebalancing import (calendar_flags, evaluate_schedules, merge_totals, run_rebalancing, schedule_totals,
+                         summarize_totals, threshold_flags)
+
+
+def two_tickers(days=40, drift=0.02):
+    """Ticker A gains drift every day, B is flat; both start at 50%"""
+    returns = np.column_stack([np.full(days, drift), np.zeros(days)])
+    targets = np.full((days, 2), 0.5)
+    return returns, targets
+
+
+def test_weights_drift_between_rebalances():
+    returns, targets = two_tickers(days=10)
+    flags = np.zeros((1, 10), dtype=bool)
+    flags[0, 0] = True
+    results = evaluate_schedules(returns, targets, flags)
+
+    # With no rebalance, day d earns the weights drifted over days 0..d-1
+    for day in range(10):
+        weight_a = 1.02 ** day / (1.02 ** day + 1)
+        assert results['gross_return'][0, day] == pytest.approx(weight_a * 0.02)
+    assert results['turnover'][0].sum() == 0
+    # Buy and hold compounds to the average of the two tickers' growth
+    assert np.prod(1 + results['return'][0]) == pytest.approx((1.02 ** 10 + 1) / 2)
+
+
+def test_threshold_triggers_when_drift_exceeds_it():
+    returns, targets = two_tickers()
+    log_wealth = np.cumsum(np.log1p(returns), axis=0)
+    flags = threshold_flags(targets, log_wealth, 0.05, block=4)
+
+    # A's weight passes 55% after k days with 1.02^k > 0.55 / 0.45, i.e. k = 11
+    assert np.flatnonzero(flags).tolist() == [0, 11, 22, 33]
+    # A larger first block finds the same days
+    assert (threshold_flags(targets, log_wealth, 0.05, block=64) == flags).all()
+
+
+def test_turnover_and_cost_on_rebalance_days():
+    returns, targets = two_tickers()
+    log_wealth = np.cumsum(np.log1p(returns), axis=0)
+    flags = threshold_flags(targets, log_wealth, 0.05)[None]
+    results = evaluate_schedules(returns, targets, flags, cost_bps=25)
+
+    drifted_a = 1.02 ** 11 / (1.02 ** 11 + 1)
+    turnover = results['turnover'][0]
+    # Half the absolute weight change: selling A back to 50% buys as much B
+    assert turnover[11] == pytest.approx(drifted_a - 0.5)
+    assert turnover[0] == 0 and np.count_nonzero(turnover) == 3
+    # A rebalance day starts from target weights and pays the cost on the value traded
+    assert results['gross_return'][0, 11] == pytest.approx(0.5 * 0.02)
+    cost = 2 * (drifted_a - 0.5) * 25 / 10_000
+    assert results['return'][0, 11] == pytest.approx((1 + 0.01) * (1 - cost) - 1)
+    untraded = ~flags[0] | (np.arange(40) == 0)
+    np.testing.assert_allclose(results['return'][0, untraded], results['gross_return'][0, untraded])
+
+
+def test_calendar_schedules_trade_on_first_day_of_period():
+    dates = pd.bdate_range('2024-01-29', periods=30)
+    weekly = calendar_flags(dates, 'weekly')
+    monthly = calendar_flags(dates, 'monthly')
+    assert (dates[weekly].dayofweek[1:] == 0).all() and weekly[0]
+    assert dates[monthly].strftime('%Y-%m-%d').tolist() == ['2024-01-29', '2024-02-01', '2024-03-01']
+    assert calendar_flags(dates, 'daily').all()
+
+
+def test_run_rebalancing_daily_matches_fixed_weights():
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range('2024-01-02', periods=60)
+    returns = pd.DataFrame(rng.normal(0, 0.01, (60, 3)), index=dates, columns=['A', 'B', 'C'])
+    prices = 100 * (1 + returns).cumprod()
+    weights = {'A': 0.5, 'B': 0.3, 'C': 0.2}
+    shares = {t: 1e6 for t in weights}
+
+    results, summary = run_rebalancing(prices, returns, weights, shares, ['fixed'],
+                                       ['daily', 'monthly'], cost_bps=10)
+    # Trading back to target every day is the fixed-weight portfolio, before costs
+    np.testing.assert_allclose(results['fixed_daily_gross_return'], returns @ np.array([0.5, 0.3, 0.2]))
+    assert summary['fixed_monthly']['rebalances'] == 3
+    assert summary['fixed_daily']['cost_drag'] > summary['fixed_monthly']['cost_drag'] > 0
+
+    with pytest.raises(ValueError):
+        run_rebalancing(prices, returns, weights, shares, ['fixed'], ['fortnightly'])
+
+
+def test_resuming_from_last_rebalance_matches_full_run():
+    rng = np.random.default_rng(1)
+    dates = pd.bdate_range('2024-01-02', periods=120)
+    returns = pd.DataFrame(rng.normal(0, 0.02, (120, 3)), index=dates, columns=['A', 'B', 'C'])
+    prices = 100 * (1 + returns).cumprod()
+    weights = {'A': 0.5, 'B': 0.3, 'C': 0.2}
+    shares = {t: 1e6 for t in weights}
+    schedules = ['monthly', 'threshold5']
+    full, summary = run_rebalancing(prices, returns, weights, shares, ['fixed'], schedules, cost_bps=10)
+
+    # A first run through day 80, then a resumed run over a window starting mid-way
+    first, _ = run_rebalancing(prices[:81], returns[:81], weights, shares, ['fixed'], schedules, cost_bps=10)
+    stored = {name: schedule_totals(first, name) for name in summary}
+    window = slice(min(pd.Timestamp(t['last_rebalance']) for t in stored.values()) - pd.Timedelta(days=7), None)
+    resumed, _ = run_rebalancing(prices[window], returns[window], weights, shares, ['fixed'], schedules,
+                                 cost_bps=10, last_rebalance={n: t['last_rebalance'] for n, t in stored.items()})
+
+    new = resumed.index > dates[80]
+    pd.testing.assert_frame_equal(resumed[new], full[81:], check_freq=False)
+    for name in summary:
+        totals = merge_totals(stored[name], schedule_totals(resumed, name, new))
+        assert summarize_totals(totals) == pytest.approx(summary[name])
@@ -0,0 +1,76 @@
+"""Rolling risk statistics match direct window calculations"""
+
+import numpy as np
+import pandas as pd
+
+from risk_analytics import drawdowns, latest_snapshot, rolling_risk, window_sums
+
+
+def sample(days=120, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range('2023-01-02', periods=days)
+    benchmark = pd.Series(rng.normal(0.0005, 0.01, days), index=index)
+    returns = pd.DataFrame({
+        'portfolio': 1.2 * benchmark + rng.normal(0, 0.01, days),
+        'T1': rng.normal(0, 0.02, days)
+    }, index=index)
+    return returns, benchmark
+
+
+def test_window_sums():
+    values = np.arange(1.0, 7.0)[:, None]
+    sums = window_sums(values, 3)
+    assert np.isnan(sums[:2]).all()
+    assert sums[2:, 0].tolist() == [6.0, 9.0, 12.0, 15.0]
+    assert np.isnan(window_sums(values, 10)).all()
+
+
+def test_rolling_statistics_match_pandas():
+    returns, benchmark = sample()
+    risk_free = 0.02
+    risk = rolling_risk(returns, benchmark=benchmark, windows=(21, 63), risk_free_rate=risk_free)
+
+    for name in returns:
+        series = returns[name]
+        for window in (21, 63):
+            rolling = series.rolling(window)
+            excess = series - risk_free / 252
+            downside = np.sqrt((np.minimum(excess, 0) ** 2).rolling(window).mean())
+            expected = {
+                'vol': rolling.std() * np.sqrt(252),
+                'beta': rolling.cov(benchmark) / benchmark.rolling(window).var(),
+                'corr': rolling.corr(benchmark),
+                'sharpe': excess.rolling(window).mean() / rolling.std() * np.sqrt(252),
+                'sortino': excess.rolling(window).mean() / downside * np.sqrt(252)
+            }
+            for metric, values in expected.items():
+                pd.testing.assert_series_equal(risk[f'{name}_{metric}_{window}d'], values,
+                                               check_names=False, rtol=1e-8, atol=1e-10)
+            assert risk[f'{name}_vol_{window}d'].iloc[:window - 1].isna().all()
+
+
+def test_windows_need_full_valid_observations():
+    returns, benchmark = sample(days=60)
+    returns.iloc[30, 1] = np.nan
+    risk = rolling_risk(returns, benchmark=benchmark, windows=(21,))
+    vol = risk['T1_vol_21d']
+    # Every window containing the missing day is unreported
+    assert vol.iloc[30:51].isna().all()
+    assert vol.iloc[29] > 0 and vol.iloc[51] > 0
+    assert risk['portfolio_vol_21d'].iloc[20:].notna().all()
+
+
+def test_drawdowns():
+    returns = pd.DataFrame({'a': [0.1, -0.5, 0.2, 1.0, -0.1]})
+    drawdown, max_drawdown = drawdowns(returns)
+    np.testing.assert_allclose(drawdown[:, 0], [0.0, -0.5, -0.4, 0.0, -0.1])
+    np.testing.assert_allclose(max_drawdown[:, 0], [0.0, -0.5, -0.5, -0.5, -0.5])
+
+
+def test_latest_snapshot():
+    returns, benchmark = sample()
+    risk = rolling_risk(returns, benchmark=benchmark, windows=(21,))
+    snapshot = latest_snapshot(risk, ['T1'])
+    assert list(snapshot.index) == ['T1']
+    assert snapshot.loc['T1', 'vol_21d'] == risk['T1_vol_21d'].iloc[-1]
+    assert snapshot.loc['T1', 'max_drawdown'] == risk['T1_max_drawdown'].iloc[-1]
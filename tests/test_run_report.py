@@ -0,0 +1,42 @@
+"""Per-stage run report counters"""
+
+from http_session import SessionStats
+from run_report import NetworkStats, RunReport
+
+
+def test_stage_counts_http_bytes():
+    stats = NetworkStats()
+    session_stats = SessionStats(stats)
+    report = RunReport(stats)
+
+    with report.stage('download') as stage:
+        session_stats.record('example.com/v8/finance/chart', 0.05, True, received=2048)
+        session_stats.record('example.com/v8/finance/chart', 0.07, False, received=100)
+        stats.add('provider_calls')
+        stats.add('payload_bytes', 50_000)
+        stage['rows'] = 2
+    with report.stage('compute'):
+        pass
+
+    download, compute = report.to_dict()['stages']
+    assert download['bytes_received'] == 2148
+    assert download['http_requests'] == 2 and download['http_failures'] == 1
+    assert download['payload_bytes'] == 50_000
+    assert compute['bytes_received'] == 0
+    assert session_stats.summary()['example.com/v8/finance/chart']['bytes'] == 2148
+
+
+def test_peak_rss_growth_is_per_stage():
+    report = RunReport()
+    with report.stage('allocate'):
+        block = bytearray(256 * 1024 * 1024)
+        block[::4096] = b'x' * len(block[::4096])
+    with report.stage('idle'):
+        pass
+
+    allocate, idle = report.to_dict()['stages']
+    if allocate['process_peak_rss_mb'] is None:
+        return  # no resource module on this platform
+    assert allocate['peak_rss_growth_mb'] >= 128
+    assert idle['peak_rss_growth_mb'] == 0
+    assert idle['process_peak_rss_mb'] >= allocate['process_peak_rss_mb']
@@ -0,0 +1,86 @@
+"""Weighting strategies over one shared return matrix"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from strategies import STRATEGIES, StrategyContext, cap_weights, history_needed, register_strategy, run_strategies
+
+TICKERS = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L']
+
+
+def universe(days=100, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range('2023-01-02', periods=days)
+    # Volatility grows with the ticker number, so inverse_vol has an order to find
+    vols = np.linspace(0.005, 0.04, len(TICKERS))
+    returns = pd.DataFrame(rng.normal(0, 1, (days, len(TICKERS))) * vols, index=index, columns=TICKERS)
+    prices = 100 * (1 + returns).cumprod()
+    caps = np.linspace(1, 30, len(TICKERS)) ** 2
+    base_weights = dict(zip(TICKERS, caps / caps.sum()))
+    shares = {t: base_weights[t] * 1e9 / prices[t].iloc[0] for t in TICKERS}
+    return prices, returns, base_weights, shares
+
+
+def weights_of(name, prices, returns, base_weights, shares):
+    context = StrategyContext(prices, returns, base_weights, shares)
+    return np.asarray(STRATEGIES[name]['weights'](context))
+
+
+def test_equal_weights_sum_to_one():
+    weights = weights_of('equal', *universe())
+    assert weights.shape == (len(TICKERS),)
+    assert weights.sum() == pytest.approx(1.0)
+    assert np.allclose(weights, weights[0])
+
+
+def test_capped_market_cap_respects_cap():
+    weights = weights_of('capped_market_cap', *universe())
+    assert weights.ndim == 2
+    assert (weights <= 0.10 + 1e-12).all()
+    np.testing.assert_allclose(weights.sum(axis=1), 1.0)
+    # The uncapped weights are concentrated, so the cap binds
+    assert weights_of('market_cap', *universe()).max() > 0.10
+
+
+def test_cap_weights_spreads_excess_pro_rata():
+    capped = cap_weights(np.array([0.7, 0.2, 0.1]), 0.5)
+    np.testing.assert_allclose(capped, [0.5, 0.2 + 0.2 * 2 / 3, 0.1 + 0.2 / 3])
+
+
+def test_inverse_vol_skips_missing_tickers():
+    prices, returns, base_weights, shares = universe(days=160)
+    returns.iloc[70:80, 0] = np.nan
+    weights = weights_of('inverse_vol', prices, returns, base_weights, shares)
+
+    # Equal weight before a full window, then lower weight for higher volatility
+    np.testing.assert_allclose(weights[:63], 1 / len(TICKERS))
+    assert weights[64, 1] > weights[64, 6] > weights[64, 11]
+    # A ticker with missing returns in its trailing window gets no weight
+    assert (weights[71:80 + 63, 0] == 0).all()
+    assert weights[70, 0] > 0 and weights[80 + 63, 0] > 0
+    np.testing.assert_allclose(weights.sum(axis=1), 1.0)
+
+
+def test_run_strategies_matches_weighted_sums():
+    prices, returns, base_weights, shares = universe()
+    results = run_strategies(prices, returns, base_weights, shares, names=['fixed', 'equal', 'market_cap'])
+    assert list(results.columns) == ['fixed', 'equal', 'market_cap']
+    np.testing.assert_allclose(results['equal'], returns.mean(axis=1))
+    np.testing.assert_allclose(results['fixed'], returns.to_numpy() @ np.array(list(base_weights.values())))
+
+    with pytest.raises(ValueError):
+        run_strategies(prices, returns, base_weights, shares, names=['nope'])
+
+
+def test_history_needed_is_longest_lookback():
+    assert history_needed(['fixed', 'equal']) == 0
+    assert history_needed(['market_cap', 'inverse_vol']) == 63
+    assert history_needed([]) == 0
+
+    # A strategy without a declared lookback needs the whole history
+    register_strategy('unbounded')(lambda context: STRATEGIES['equal']['weights'](context))
+    try:
+        assert history_needed(['equal', 'unbounded']) is None
+    finally:
+        del STRATEGIES['unbounded']